@@ -29,7 +29,9 @@ import re
 
 import click
 
-from sls_utils.ipam import next_free_ipv4_address
+from sls_utils.ipam import allocate_many
+from sls_utils.diff import diff_networks
+from sls_utils.json_utils import write_sls_document
 from sls_utils.Managers import NetworkManager
 from sls_utils.Reservations import Reservation
 
@@ -70,11 +72,20 @@ NOTE:  Typically you will want a NAT device instead of running this, unless a ve
     type=click.File("w"),
     default="chn_with_computes_added_sls_file.json",
 )
+@click.option(
+    "--sls-diff-file",
+    required=False,
+    help="Also write the changes made to the SLS Networks to this JSON file, as "
+    "sls_utils.diff.diff_networks gives them.",
+    type=click.File("w"),
+    default=None,
+)
 @click.pass_context
 def main(
     ctx,
     sls_input_file,
     sls_output_file,
+    sls_diff_file,
 ):
     """Upgrade a system SLS file to work with CHN.
 
@@ -82,6 +93,7 @@ def main(
         ctx: Click context
         sls_input_file (str): Name of the SLS input file
         sls_output_file (str): Name of the updated SLS output file
+        sls_diff_file (file|None): File to write the changes made to the SLS Networks to
 
     """
     click.secho("Loading SLS JSON file.", fg="bright_white")
@@ -216,6 +228,7 @@ def main(
             )
             del chn_subnet.reservations()[xname]
 
+    new_names = []
     for hsn_reservation in hsn_reservations:
         new_name = hsn_reservation.name()
         if not xname_pattern.match(new_name):
@@ -229,8 +242,11 @@ def main(
                 f"    Skipping {new_name} because it is already in the CHN", fg="white"
             )
             continue
+        new_names.append(new_name)
 
-        new_ipv4_address = next_free_ipv4_address(chn_subnet)
+    # Allocate all of the new addresses at once
+    new_ipv4_addresses = allocate_many(chn_subnet, len(new_names))
+    for new_name, new_ipv4_address in zip(new_names, new_ipv4_addresses):
         click.secho(f"    Adding Reservation {new_name} {new_ipv4_address}", fg="white")
         chn_subnet.reservations().update(
             {
@@ -254,10 +270,15 @@ def main(
     )
 
     if sls_output_file:
-        sls_json.pop("Networks")
-        sls_json.update({"Networks": networks.to_sls()})
-        new_json = json.dumps(sls_json, indent=2, sort_keys=True)
-        click.echo(new_json, file=sls_output_file)
+        write_sls_document(sls_json, sls_output_file, networks=networks)
+
+    if sls_diff_file:
+        click.secho(
+            f"Writing the changes to the SLS Networks to {sls_diff_file.name}",
+            fg="bright_white",
+        )
+        changes = diff_networks(sls_json["Networks"], networks)
+        click.echo(json.dumps(changes, indent=2, sort_keys=True), file=sls_diff_file)
 
 
 if __name__ == "__main__":
@@ -28,7 +28,7 @@ import sys
 
 import click
 from sls_utils.ipam import (
-    free_ipv4_addresses,
+    allocate_many,
     free_ipv4_subnets,
     hosts_from_prefixlength,
     last_free_ipv4_address,
@@ -150,7 +150,7 @@ def create_chn_network(
     # Clone CAN subnets for structure
     for can_subnet in networks.get("CAN").subnets().values():
         chn.subnets().update(
-            {can_subnet.name(): Subnet.subnet_from_sls_data(can_subnet.to_sls())},
+            {can_subnet.name(): can_subnet.copy()},
         )
 
     # Clean up subnet naming
@@ -195,7 +195,7 @@ def create_chn_network(
     bootstrap.ipv4_address(f"{hold_ipv4.network_address}/{hold_ipv4.prefixlen+1}")
 
     dhcp_start = next_free_ipv4_address(bootstrap)
-    dhcp_end = sorted(free_ipv4_addresses(bootstrap))[-1]
+    dhcp_end = last_free_ipv4_address(bootstrap)
     click.echo(f"    Updating DHCP start-end IPv4 addresses {dhcp_start}-{dhcp_end}")
     bootstrap.dhcp_start_address(dhcp_start)
     bootstrap.dhcp_end_address(dhcp_end)
@@ -332,7 +332,7 @@ def clone_subnet_and_pivot(
         #
         # Clone the old subnet and change naming
         #
-        new_subnet = Subnet.subnet_from_sls_data(old_subnet.to_sls())
+        new_subnet = old_subnet.copy()
         if old_subnet.full_name().find("HMN") != -1:
             new_subnet.full_name(
                 old_subnet.full_name().replace("HMN", f"{destination_network_name}"),
@@ -447,26 +447,27 @@ def clone_subnet_and_pivot(
             click.echo(
                 f"        Adding IPs for {len(old_reservations.values())} Reservations",
             )
-            for old in old_reservations.values():
-                try:
-                    new_subnet.reservations().update(
-                        {
-                            old.name(): Reservation(
-                                old.name(),
-                                next_free_ipv4_address(new_subnet),
-                                list(old.aliases()),
-                                old.comment(),
-                            ),
-                        },
-                    )
-                except IndexError:
-                    click.secho(
-                        "        HALTING: Insufficient IPv4 addresses to create Reservations "
-                        f"- {devices} devices in a subnet supporting {total_hosts_in_prefixlen} devices.\n"
-                        "             Expert mode --<can|cmn>-subnet-override must be used to change this behavior.",
-                        fg="bright_yellow",
-                    )
-                    exit(1)
+            try:
+                new_ipv4_addresses = allocate_many(new_subnet, len(old_reservations))
+            except IndexError:
+                click.secho(
+                    "        HALTING: Insufficient IPv4 addresses to create Reservations "
+                    f"- {devices} devices in a subnet supporting {total_hosts_in_prefixlen} devices.\n"
+                    "             Expert mode --<can|cmn>-subnet-override must be used to change this behavior.",
+                    fg="bright_yellow",
+                )
+                exit(1)
+            for old, new_ipv4_address in zip(old_reservations.values(), new_ipv4_addresses):
+                new_subnet.reservations().update(
+                    {
+                        old.name(): Reservation(
+                            old.name(),
+                            new_ipv4_address,
+                            list(old.aliases()),
+                            old.comment(),
+                        ),
+                    },
+                )
 
             # DHCP Ranges to appropriate networks
             try:
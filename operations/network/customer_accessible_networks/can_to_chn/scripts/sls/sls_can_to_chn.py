@@ -32,6 +32,8 @@ import click
 from csm_can_to_chn.sls_updates import create_chn_network
 from csm_can_to_chn.sls_updates import sls_and_input_data_checks
 from csm_can_to_chn.sls_updates import remove_uai_nmn_dhcp_ranges
+from sls_utils.diff import diff_networks
+from sls_utils.json_utils import write_sls_document
 from sls_utils.Managers import NetworkManager
 
 
@@ -84,6 +86,14 @@ help = """Upgrade a system SLS file to use the CHN.
     help="Allow specification of the number of edge switches.  Typically a dev-only option.",
     type=click.IntRange(0, 2),
 )
+@click.option(
+    "--sls-diff-file",
+    required=False,
+    help="Also write the changes made to the SLS Networks to this JSON file, as "
+    "sls_utils.diff.diff_networks gives them.",
+    type=click.File("w"),
+    default=None,
+)
 @click.pass_context
 def main(
     ctx,
@@ -93,6 +103,7 @@ def main(
     bgp_asn,
     bgp_chn_asn,
     number_of_chn_edge_switches,
+    sls_diff_file,
 ):
     """Upgrade an SLS file from using the CAN to the CHN.
 
@@ -100,6 +111,7 @@ def main(
         ctx: Click context
         sls_input_file (str): Name of the SLS input file
         sls_output_file (str): Name of the updated SLS output file
+        sls_diff_file (file|None): File to write the changes made to the SLS Networks to
         bican_user_network_name (str): Name of the BiCAN user network [CAN, CHN]
         customer_highspeed_network (int, ipaddress.IPv4Network): VLAN and IPv4 CIDR of the CHN
         bgp_asn (int): Remote peer ASN
@@ -158,10 +170,15 @@ def main(
     )
 
     if sls_output_file:
-        sls_json.pop("Networks")
-        sls_json.update({"Networks": networks.to_sls()})
-        new_json = json.dumps(sls_json, indent=2, sort_keys=True)
-        click.echo(new_json, file=sls_output_file)
+        write_sls_document(sls_json, sls_output_file, networks=networks)
+
+    if sls_diff_file:
+        click.secho(
+            f"Writing the changes to the SLS Networks to {sls_diff_file.name}",
+            fg="bright_white",
+        )
+        changes = diff_networks(sls_json["Networks"], networks)
+        click.echo(json.dumps(changes, indent=2, sort_keys=True), file=sls_diff_file)
 
 
 if __name__ == "__main__":
@@ -29,6 +29,8 @@ import sys
 import click
 
 from csm_can_to_chn.sls_updates import delete_can_network
+from sls_utils.diff import diff_networks
+from sls_utils.json_utils import write_sls_document
 from sls_utils.Managers import NetworkManager
 
 
@@ -48,11 +50,20 @@ help = "Delete CAN entries from SLS."
     type=click.File("w"),
     default="migrated_sls_file.json",
 )
+@click.option(
+    "--sls-diff-file",
+    required=False,
+    help="Also write the changes made to the SLS Networks to this JSON file, as "
+    "sls_utils.diff.diff_networks gives them.",
+    type=click.File("w"),
+    default=None,
+)
 @click.pass_context
 def main(
     ctx,
     sls_input_file,
     sls_output_file,
+    sls_diff_file,
 ):
     """Upgrade an SLS file from using the CAN to the CHN.
 
@@ -60,6 +71,7 @@ def main(
         ctx: Click context
         sls_input_file (str): Name of the SLS input file
         sls_output_file (str): Name of the updated SLS output file
+        sls_diff_file (file|None): File to write the changes made to the SLS Networks to
     """
     click.confirm(
         "\n  You are deleting the CAN network data structure from SLS.\n  This script should only be used when upgrading from the CAN to the CHN.\n  Do you want to continue?",
@@ -85,10 +97,15 @@ def main(
     delete_can_network(networks)
 
     if sls_output_file:
-        sls_json.pop("Networks")
-        sls_json.update({"Networks": networks.to_sls()})
-        new_json = json.dumps(sls_json, indent=2, sort_keys=True)
-        click.echo(new_json, file=sls_output_file)
+        write_sls_document(sls_json, sls_output_file, networks=networks)
+
+    if sls_diff_file:
+        click.secho(
+            f"Writing the changes to the SLS Networks to {sls_diff_file.name}",
+            fg="bright_white",
+        )
+        changes = diff_networks(sls_json["Networks"], networks)
+        click.echo(json.dumps(changes, indent=2, sort_keys=True), file=sls_diff_file)
 
 
 if __name__ == "__main__":
@@ -22,22 +22,280 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 #
 """Wrapper Classes to manage SLS Networks and Subnets as dictionaries."""
+import abc
 from collections import UserDict
 import ipaddress
 import os
 
 from sls_utils.json_utils import validate as validate_sls_json
 from sls_utils.Networks import Network, Subnet
+from sls_utils.radix import IPv4PrefixTrie
 
 
-class NetworkManager(UserDict):
+def _ipv4_host_network(ipv4_address):
+    """Return the /32 network of an IPv4 address, without formatting and parsing a parsed one.
+
+    Args:
+        ipv4_address (str|ipaddress.IPv4Address): The address
+
+    Returns:
+        ipv4_network (ipaddress.IPv4Network): The network of just the address
+    """
+    if isinstance(ipv4_address, ipaddress.IPv4Address):
+        return ipaddress.IPv4Network((int(ipv4_address), 32))
+    return ipaddress.IPv4Network(ipv4_address)
+
+
+class IPv4IndexedDict(UserDict):
+    """A dictionary whose values own IPv4 networks, indexed by a prefix trie.
+
+    The index is built on first use and kept up to date as items are set or deleted.  Items hold
+    other items in plain dictionaries (Subnets in Networks, Reservations in Subnets), which can be
+    changed in place, so the index watches the objects of each item (see radix.Watched).  Setting
+    an address, or getting the Subnets or Reservations dictionary through its getter, marks the
+    group of index entries the object is in as changed, and only changed groups are reindexed
+    before the next lookup.  A group is an item on its own, or one of the collections inside it
+    (for example a Subnet of a Network with its Reservations).
+
+    Index entries hold names rather than objects, and the owners of the entries a lookup finds are
+    got from the live items, so Reservations are only parsed for the Subnets a lookup returns them
+    from.  A dictionary kept from before a lookup and changed after it is not noticed: call
+    reindex(name) for the item after such a change.  The lookup is rerun on a fresh index if any
+    entry it finds no longer matches the live items.
+    """
+
+    _ipv4_index = None
+
+    @abc.abstractmethod
+    def _ipv4_groups(self, name, item):
+        """Return the groups of index entries of an item.
+
+        Args:
+            name (str): Name of the item in the dictionary
+            item: The item
+
+        Returns:
+            groups (list): (group key, head) tuples, where group keys are tuples starting with
+                (name,) for the item itself, and head is the object the group's entries are in
+        """
+
+    @abc.abstractmethod
+    def _ipv4_entries(self, group, head):
+        """Return the IPv4 networks of a group.
+
+        Args:
+            group (tuple): Key of the group
+            head: The object the group's entries are in
+
+        Returns:
+            entries (list): (ipaddress.IPv4Network, key, object) tuples, where key is a tuple of
+                the names leading to the owner, and object is the owner to watch for changes, or
+                None if it is not parsed yet
+        """
+
+    @abc.abstractmethod
+    def _ipv4_owner(self, ipv4_network, key):
+        """Return the owner of an index entry from the live items.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network): The network the entry was indexed under
+            key (tuple): Names leading to the owner
+
+        Returns:
+            owner (tuple): Objects leading to the owner, or None if the owner is no longer in the
+                dictionary or no longer owns the network
+        """
+
+    def __setitem__(self, name, item):
+        """Set an item, updating the IPv4 index."""
+        if name in self.data:
+            self.__unindex(name)
+        self.data[name] = item
+        self.__index(name, item)
+
+    def __delitem__(self, name):
+        """Delete an item, updating the IPv4 index."""
+        del self.data[name]
+        self.__unindex(name)
+
+    def __index(self, name, item):
+        if self._ipv4_index is None:
+            return
+        for group, head in self._ipv4_groups(name, item):
+            self.__index_group(group, head)
+
+    def __unindex(self, name):
+        if self._ipv4_index is None:
+            return
+        for group in list(self._ipv4_index[1].get(name, {})):
+            self.__unindex_group(group)
+
+    def __index_group(self, group, head):
+        """Index the entries of a group, changing only those which differ from its indexed ones."""
+        index, groups, changed = self._ipv4_index
+        _, indexed_entries, indexed_watched = groups.get(group[0], {}).get(group, (None, [], []))
+        entries = []
+        watched = []
+        for ipv4_network, key, owner in self._ipv4_entries(group, head):
+            entries.append((ipv4_network, key))
+            if owner is not None:
+                watched.append(owner)
+
+        if indexed_entries:
+            current = set(entries)
+            for ipv4_network, key in indexed_entries:
+                if (ipv4_network, key) not in current:
+                    index.remove(ipv4_network, key)
+        indexed = set(indexed_entries)
+        for ipv4_network, key in entries:
+            if (ipv4_network, key) not in indexed:
+                index.insert(ipv4_network, key, key)
+        for owner in indexed_watched:
+            owner.unwatch(changed, group)
+        for owner in watched:
+            owner.watch(changed, group)
+        groups.setdefault(group[0], {})[group] = (head, entries, watched)
+
+    def __unindex_group(self, group):
+        index, groups, changed = self._ipv4_index
+        _, entries, watched = groups[group[0]].pop(group)
+        if not groups[group[0]]:
+            del groups[group[0]]
+        for ipv4_network, key in entries:
+            index.remove(ipv4_network, key)
+        for owner in watched:
+            owner.unwatch(changed, group)
+
+    def reindex(self, name=None):
+        """Update the IPv4 index from the current items.
+
+        This is only needed after changing a dictionary of an item which was got before the last
+        lookup.  Other changes are noticed by the index.
+
+        Args:
+            name (str): Name of the item to reindex, or None to rebuild the whole index
+        """
+        if name is not None:
+            if self._ipv4_index is not None:
+                self.__unindex(name)
+                if name in self.data:
+                    self.__index(name, self.data[name])
+            return
+        if self._ipv4_index is not None:
+            for indexed_name in list(self._ipv4_index[1]):
+                self.__unindex(indexed_name)
+        self._ipv4_index = (IPv4PrefixTrie(), {}, set())
+        for item_name, item in self.data.items():
+            self.__index(item_name, item)
+
+    def __update_changed(self):
+        """Reindex the groups which were marked as changed since the last lookup."""
+        groups, changed = self._ipv4_index[1:]
+        while changed:
+            group = changed.pop()
+            name = group[0]
+            indexed = groups.get(name, {})
+            if name not in self.data or group not in indexed:
+                continue
+            if len(group) > 1:
+                self.__index_group(group, indexed[group][0])
+                continue
+            # The item itself changed: reindex it, and the groups inside it which were added,
+            # removed or replaced.  Groups whose head is the same are watched on their own.
+            current = dict(self._ipv4_groups(name, self.data[name]))
+            for indexed_group in list(indexed):
+                if indexed_group not in current:
+                    self.__unindex_group(indexed_group)
+            for current_group, head in current.items():
+                indexed_head = indexed.get(current_group, (None,))[0]
+                if current_group == group or indexed_head is not head:
+                    self.__index_group(current_group, head)
+
+    def __ipv4_lookup(self, lookup):
+        """Run a lookup on the IPv4 index.
+
+        Args:
+            lookup (function): Called with the IPv4PrefixTrie, returns a list of its entries
+
+        Returns:
+            entries (list): (ipaddress.IPv4Network, owner) tuples
+        """
+        if self._ipv4_index is None:
+            self.reindex()
+        self.__update_changed()
+        entries = lookup(self._ipv4_index[0])
+        owners = [self._ipv4_owner(ipv4_network, key) for ipv4_network, key in entries]
+        if any(owner is None for owner in owners):
+            self.reindex()
+            entries = lookup(self._ipv4_index[0])
+            owners = [self._ipv4_owner(ipv4_network, key) for ipv4_network, key in entries]
+        return [
+            (ipv4_network, owner)
+            for (ipv4_network, _), owner in zip(entries, owners)
+            if owner is not None
+        ]
+
+    def ipv4_owner(self, ipv4_address):
+        """Find the most specific owner of an IPv4 address.
+
+        Args:
+            ipv4_address (str|ipaddress.IPv4Address): The address to find
+
+        Returns:
+            owner (tuple): Objects leading to the owner with the longest matching prefix, the most
+                deeply nested owner winning ties.  None if nothing owns the address.
+        """
+        try:
+            ipv4_address = ipaddress.IPv4Address(ipv4_address)
+        except ValueError:
+            return None
+
+        entries = self.__ipv4_lookup(lambda index: index.matches(ipv4_address))
+        if not entries:
+            return None
+        _, owner = max(
+            entries,
+            key=lambda entry: (
+                entry[0].prefixlen,
+                sum(x is not None for x in entry[1]),
+            ),
+        )
+        return owner
+
+    def ipv4_overlapping(self, ipv4_network):
+        """Find every owner of an IPv4 network which overlaps the given one.
+
+        Args:
+            ipv4_network (str|ipaddress.IPv4Network): The network to check
+
+        Returns:
+            owners (list): (ipaddress.IPv4Network, owner) tuples, outermost networks first
+        """
+        ipv4_network = ipaddress.IPv4Network(ipv4_network)
+        return self.__ipv4_lookup(lambda index: index.overlapping(ipv4_network))
+
+    def _ipv4_exact(self, ipv4_network):
+        """Find the owners of exactly the given IPv4 network.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network): The network
+
+        Returns:
+            owners (list): Owners of the network in index order
+        """
+        return [owner for _, owner in self.__ipv4_lookup(lambda index: index.exact(ipv4_network))]
+
+
+class NetworkManager(IPv4IndexedDict):
     """Provide a means to search and set SLS Network info."""
 
-    def __init__(self, network_dict=[]):
+    def __init__(self, network_dict=[], validate=True):
         """Create a Network Manager.
 
         Args:
             network_dict (dict): A dictionary of networks to manage
+            validate (bool): Schema validate the networks (False if already validated, for example
+                by json_utils.validate_sls_document)
 
         Raises:
             TypeError: When subnet_dict is not a dictionary
@@ -47,7 +305,8 @@ class NetworkManager(UserDict):
                 "SLSNetworkManager requires an SLS Networks dictionary for initialization.",
             )
 
-        self.__validate(network_dict)
+        if validate:
+            self.__validate(network_dict)
         # TODO: if instance is network do a deep copy!
         self.data = {
             name: (
@@ -87,12 +346,71 @@ class NetworkManager(UserDict):
         except ValueError:
             return value
 
-        for network in self.data.values():
-            if network.ipv4_address() == ipv4_key:
+        for network, subnet, _ in self._ipv4_exact(ipv4_key.network):
+            if subnet is None and network.ipv4_address() == ipv4_key:
                 value = network
                 break
         return value
 
+    def _ipv4_groups(self, name, item):
+        """Return the groups of index entries of a Network: itself, and each of its Subnets.
+
+        Args:
+            name (str): Name of the Network in the dictionary
+            item (sls_utils.Network): The Network
+
+        Returns:
+            groups (list): ((network name,), Network) and ((network name, subnet name), Subnet)
+                tuples
+        """
+        return [((name,), item)] + [
+            ((name, subnet_name), subnet) for subnet_name, subnet in item._parsed_subnets().items()
+        ]
+
+    def _ipv4_entries(self, group, head):
+        """Return the IPv4 network of a Network, or those of a Subnet and its Reservations.
+
+        Args:
+            group (tuple): Name of the Network, and of the Subnet if the group is a Subnet
+            head (sls_utils.Network): The Network or Subnet
+
+        Returns:
+            entries (list): (ipaddress.IPv4Network, key, object) tuples
+        """
+        entries = [(head.ipv4_network(), group, head)]
+        if len(group) == 1:
+            return entries
+        for reservation_name, ipv4_address, reservation in head._reservation_ipv4_addresses():
+            entries.append(
+                (_ipv4_host_network(ipv4_address), group + (reservation_name,), reservation),
+            )
+        return entries
+
+    def _ipv4_owner(self, ipv4_network, key):
+        """Return the owner of an index entry from the live Networks.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network): The network the entry was indexed under
+            key (tuple): Names of the Network, Subnet and Reservation
+
+        Returns:
+            owner (tuple): The Network, Subnet and Reservation, or None if the entry is stale
+        """
+        network = self.data.get(key[0])
+        if network is None:
+            return None
+        if len(key) == 1:
+            return (network, None, None) if network.ipv4_network() == ipv4_network else None
+        subnet = network._parsed_subnets().get(key[1])
+        if subnet is None:
+            return None
+        if len(key) == 2:
+            return (network, subnet, None) if subnet.ipv4_network() == ipv4_network else None
+        reservation = subnet._parsed_reservations().get(key[2])
+        if reservation is None or reservation.ipv4_address() != ipv4_network.network_address:
+            return None
+        return (network, subnet, reservation)
+
     def to_sls(self):
         """Return full SLS Networks Schema-validated JSON.
 
@@ -103,6 +421,18 @@ class NetworkManager(UserDict):
         self.__validate(sls)
         return sls
 
+    def iter_sls(self):
+        """Return Schema-validated SLS data for each Network one at a time, for streaming it out.
+
+        The networks are validated together, since the schema requires some of them, before the
+        first is returned.
+
+        Returns:
+            sls (generator): (name, SLS data) pairs, sorted by name
+        """
+        sls = self.to_sls()
+        return ((name, sls[name]) for name in sorted(sls))
+
     def __validate(self, sls_data):
         """Validate SLS Networks with JSON schema.
 
@@ -116,7 +446,7 @@ class NetworkManager(UserDict):
         validate_sls_json(schema_file=schema_file, sls_data=sls_data)
 
 
-class SubnetManager(UserDict):
+class SubnetManager(IPv4IndexedDict):
     """A SubnetManager is a convenience wrapper around Subnets."""
 
     def __init__(self, subnet_dict=[]):
@@ -170,12 +500,61 @@ class SubnetManager(UserDict):
         except ValueError:
             return value
 
-        for subnet in self.data.values():
-            if subnet.ipv4_address() == ipv4_key:
+        for subnet, reservation in self._ipv4_exact(ipv4_key.network):
+            if reservation is None and subnet.ipv4_address() == ipv4_key:
                 value = subnet
                 break
         return value
 
+    def _ipv4_groups(self, name, item):
+        """Return the groups of index entries of a Subnet: one, with the Subnet and Reservations.
+
+        Args:
+            name (str): Name of the Subnet in the dictionary
+            item (sls_utils.Subnet): The Subnet
+
+        Returns:
+            groups (list): The ((subnet name,), Subnet) tuple
+        """
+        return [((name,), item)]
+
+    def _ipv4_entries(self, group, head):
+        """Return the IPv4 networks of a Subnet and its Reservations.
+
+        Args:
+            group (tuple): Name of the Subnet
+            head (sls_utils.Subnet): The Subnet
+
+        Returns:
+            entries (list): (ipaddress.IPv4Network, key, object) tuples
+        """
+        entries = [(head.ipv4_network(), group, head)]
+        for reservation_name, ipv4_address, reservation in head._reservation_ipv4_addresses():
+            entries.append(
+                (_ipv4_host_network(ipv4_address), group + (reservation_name,), reservation),
+            )
+        return entries
+
+    def _ipv4_owner(self, ipv4_network, key):
+        """Return the owner of an index entry from the live Subnets.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network): The network the entry was indexed under
+            key (tuple): Names of the Subnet and Reservation
+
+        Returns:
+            owner (tuple): The Subnet and Reservation, or None if the entry is stale
+        """
+        subnet = self.data.get(key[0])
+        if subnet is None:
+            return None
+        if len(key) == 1:
+            return (subnet, None) if subnet.ipv4_network() == ipv4_network else None
+        reservation = subnet._parsed_reservations().get(key[1])
+        if reservation is None or reservation.ipv4_address() != ipv4_network.network_address:
+            return None
+        return (subnet, reservation)
+
     def to_sls(self):
         """Return full SLS Networks JSON.
 
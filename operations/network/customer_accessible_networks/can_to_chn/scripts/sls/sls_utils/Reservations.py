@@ -22,11 +22,25 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 #
 """Class for managing SLS Reservations."""
+import copy
 import ipaddress
+import re
 
+from .radix import Watched
 
-class Reservation:
-    """Name, IPv4 address and list of aliases to create A Records and CNAMEs."""
+# IPv4 addresses exactly as str(ipaddress.IPv4Address) writes them
+_IPV4_OCTET = r"(?:25[0-5]|2[0-4]\d|1\d\d|[1-9]?\d)"
+_IPV4_ADDRESS_RE = re.compile(rf"(?:{_IPV4_OCTET}\.){{3}}{_IPV4_OCTET}")
+_SLS_KEYS = frozenset(["Name", "IPAddress", "Aliases", "Comment"])
+
+
+class Reservation(Watched):
+    """Name, IPv4 address and list of aliases to create A Records and CNAMEs.
+
+    Indexes watching a Reservation are told it may have changed when its address is set.
+    """
+
+    __slots__ = ("__name", "__ipv4_address", "__aliases", "__comment")
 
     def __init__(self, name, ipv4_address, aliases=list, comment=""):
         """Create a Reservation class.
@@ -42,6 +56,61 @@ class Reservation:
         self.__aliases = aliases
         self.__comment = comment
 
+    @classmethod
+    def reservation_from_sls_data(cls, sls_data):
+        """Create a Reservation from SLS data via a factory method.
+
+        Args:
+            sls_data (dict): Dictionary of Reservation SLS data
+
+        Returns:
+            cls (sls_utils.Reservation): Reservation constructed from SLS data
+        """
+        return cls(
+            name=sls_data.get("Name"),
+            ipv4_address=sls_data.get("IPAddress"),
+            aliases=list(sls_data.get("Aliases", [])),
+            comment=sls_data.get("Comment"),
+        )
+
+    @staticmethod
+    def sls_is_canonical(sls_data):
+        """Whether SLS data is exactly what to_sls() gives for the Reservation it describes.
+
+        This is checked without constructing the Reservation.
+
+        Args:
+            sls_data (dict): Dictionary of Reservation SLS data
+
+        Returns:
+            canonical (bool): True if the SLS data is in the form to_sls() gives it
+        """
+        if "Name" not in sls_data or not sls_data.keys() <= _SLS_KEYS:
+            return False
+        ipv4_address = sls_data.get("IPAddress")
+        if type(ipv4_address) is not str or not _IPV4_ADDRESS_RE.fullmatch(ipv4_address):
+            return False
+        if "Aliases" in sls_data:
+            aliases = sls_data["Aliases"]
+            if type(aliases) is not list or not aliases:
+                return False
+            if not all(type(alias) is str for alias in aliases):
+                return False
+        return "Comment" not in sls_data or type(sls_data["Comment"]) is str
+
+    def copy(self):
+        """Copy the Reservation without re-parsing its address.
+
+        Returns:
+            copy (sls_utils.Reservation): A copy of the Reservation with its own list of aliases
+        """
+        new_reservation = self.__class__.__new__(self.__class__)
+        new_reservation.__name = self.__name
+        new_reservation.__ipv4_address = self.__ipv4_address
+        new_reservation.__aliases = copy.copy(self.__aliases)
+        new_reservation.__comment = self.__comment
+        return new_reservation
+
     def name(self, reservation_name=None):
         """Hostname or A Record name.
 
@@ -66,6 +135,7 @@ class Reservation:
         """
         if reservation_ipv4_address:
             self.__ipv4_address = ipaddress.IPv4Address(reservation_ipv4_address)
+            self._changed()
         return self.__ipv4_address
 
     def comment(self, reservation_comment=None):
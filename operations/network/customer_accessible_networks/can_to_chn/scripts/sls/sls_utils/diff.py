@@ -0,0 +1,377 @@
+#
+# MIT License
+#
+# (C) Copyright 2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""Minimal differences between two sets of SLS Networks, and applying them.
+
+Changes are plain JSON data, nested network -> subnet -> reservation.  Each level records only
+what differs:
+
+    {
+        "added": {network name: SLS network data},
+        "removed": [network names],
+        "changed": {
+            network name: {
+                "fields": {key: new value},
+                "removed_fields": [keys],
+                "extra_properties": {"fields": {...}, "removed_fields": [...]},
+                "subnets": {
+                    "added": [SLS subnet data],
+                    "removed": [subnet names],
+                    "changed": {
+                        subnet name: {
+                            "fields": {...},
+                            "removed_fields": [...],
+                            "reservations": {"added": [...], "removed": [...], "changed": {...}},
+                        },
+                    },
+                    "order": [subnet names],
+                },
+            },
+        },
+    }
+
+Empty sections are left out, so no changes at all is an empty dictionary.  "order" is only
+present when the new list is not the old order with additions at the end.
+
+Networks are compared and patched as the sls_utils model writes them, so fields which it does not
+keep (for example the LastUpdated and LastUpdatedTime fields which SLS adds) and fields which it
+recomputes (for example VlanRange) do not show up as changes when one side is SLS data as it was
+loaded.  Data which is already in that form is used as it is, so this is cheap for snapshots.
+"""
+from sls_utils.Networks import Network
+
+
+def snapshot_networks(networks):
+    """Return the SLS data of networks, to later diff against.
+
+    Networks which have not been changed since they were loaded share their SLS data rather than
+    copying it, so this is cheap to call before making changes.
+
+    Args:
+        networks (dict): Network name to sls_utils.Networks.Network, e.g. a NetworkManager
+
+    Returns:
+        snapshot (dict): Network name to SLS network data
+    """
+    return {name: network.to_sls() for name, network in networks.items()}
+
+
+def diff_networks(old_networks, new_networks):
+    """Return the changed networks, subnets and reservations between two sets of networks.
+
+    Args:
+        old_networks (dict): Network name to sls_utils.Networks.Network or SLS network data
+        new_networks (dict): Network name to sls_utils.Networks.Network or SLS network data
+
+    Returns:
+        changes (dict): Changes as described in the module documentation
+    """
+    old_networks = {name: _sls(network) for name, network in old_networks.items()}
+    new_networks = {name: _sls(network) for name, network in new_networks.items()}
+
+    changes = {}
+    added = {name: new for name, new in new_networks.items() if name not in old_networks}
+    if added:
+        changes["added"] = added
+    removed = [name for name in old_networks if name not in new_networks]
+    if removed:
+        changes["removed"] = removed
+
+    changed = {}
+    for name, new in new_networks.items():
+        old = old_networks.get(name)
+        if old is None or old is new:
+            continue
+        network_changes = _diff_network(old, new)
+        if network_changes:
+            changed[name] = network_changes
+    if changed:
+        changes["changed"] = changed
+    return changes
+
+
+def updated_network_names(changes):
+    """Return the names of the networks which were added or changed.
+
+    These are the networks to PUT to SLS.  Removed networks are in changes["removed"].
+
+    Args:
+        changes (dict): Changes from diff_networks
+
+    Returns:
+        names (list): Network names
+    """
+    return list(changes.get("added", {})) + list(changes.get("changed", {}))
+
+
+def patch_networks(networks, changes):
+    """Apply changes from diff_networks to SLS Networks data.
+
+    The networks are patched as the model writes them, as they were diffed, so the result is the
+    new networks as the model writes them.  The input is not modified, and unchanged networks,
+    subnets and reservations which are already in that form are shared with it.
+
+    Args:
+        networks (dict): Network name to sls_utils.Networks.Network or SLS network data, such as
+            the old networks given to diff_networks
+        changes (dict): Changes from diff_networks
+
+    Returns:
+        networks (dict): Network name to SLS network data with the changes applied
+    """
+    patched = {
+        name: _sls(network)
+        for name, network in networks.items()
+        if name not in changes.get("removed", [])
+    }
+    for name, network_changes in changes.get("changed", {}).items():
+        patched[name] = _patch_network(patched[name], network_changes)
+    patched.update(changes.get("added", {}))
+    return patched
+
+
+def describe_changes(changes):
+    """Return a human readable line for each change, for logging.
+
+    Args:
+        changes (dict): Changes from diff_networks
+
+    Returns:
+        lines (list): One string per added, removed or changed item
+    """
+    lines = [f"Added network {name}" for name in changes.get("added", {})]
+    lines += [f"Removed network {name}" for name in changes.get("removed", [])]
+    for name, network_changes in changes.get("changed", {}).items():
+        prefix = f"Network {name}"
+        lines += _describe_fields(prefix, network_changes)
+        lines += _describe_fields(prefix, network_changes.get("extra_properties", {}))
+        subnets = network_changes.get("subnets", {})
+        lines += _describe_list(prefix, "subnet", subnets)
+        for subnet_name, subnet_changes in subnets.get("changed", {}).items():
+            subnet_prefix = f"{prefix} subnet {subnet_name}"
+            lines += _describe_fields(subnet_prefix, subnet_changes)
+            reservations = subnet_changes.get("reservations", {})
+            lines += _describe_list(subnet_prefix, "reservation", reservations)
+            for reservation_name, reservation_changes in reservations.get("changed", {}).items():
+                lines += _describe_fields(
+                    f"{subnet_prefix} reservation {reservation_name}",
+                    reservation_changes,
+                )
+    return lines
+
+
+def _sls(network):
+    """Return the SLS data of a Network or of SLS network data, as the model writes it.
+
+    Args:
+        network (sls_utils.Networks.Network|dict): Network or SLS network data
+
+    Returns:
+        sls_network (dict): SLS network data, which is the argument if it is already in that form
+    """
+    if not isinstance(network, Network):
+        network = Network.network_from_sls_data(network)
+    return network.to_sls()
+
+
+def _diff_fields(old, new, skip=()):
+    """Return the changed and removed keys of two dictionaries, ignoring some keys.
+
+    Args:
+        old (dict): Old data
+        new (dict): New data
+        skip (tuple): Keys handled elsewhere
+
+    Returns:
+        changes (dict): "fields" and "removed_fields" entries, if there are any
+    """
+    changes = {}
+    fields = {
+        key: value
+        for key, value in new.items()
+        if key not in skip and (key not in old or old[key] != value)
+    }
+    if fields:
+        changes["fields"] = fields
+    removed_fields = [key for key in old if key not in skip and key not in new]
+    if removed_fields:
+        changes["removed_fields"] = removed_fields
+    return changes
+
+
+def _patch_fields(data, changes):
+    """Return a copy of a dictionary with changes from _diff_fields applied."""
+    patched = dict(data)
+    patched.update(changes.get("fields", {}))
+    for key in changes.get("removed_fields", []):
+        patched.pop(key, None)
+    return patched
+
+
+def _diff_list(old_items, new_items, diff_item):
+    """Return the changes between two lists of named SLS items.
+
+    Args:
+        old_items (list): Old SLS items, each with a "Name"
+        new_items (list): New SLS items, each with a "Name"
+        diff_item (function): Returns the changes between an old and new item of the same name
+
+    Returns:
+        changes (dict): "added", "removed", "changed" and "order" entries, if there are any
+    """
+    old_items = {item["Name"]: item for item in old_items}
+    new_items = {item["Name"]: item for item in new_items}
+
+    changes = {}
+    added = [item for name, item in new_items.items() if name not in old_items]
+    if added:
+        changes["added"] = added
+    removed = [name for name in old_items if name not in new_items]
+    if removed:
+        changes["removed"] = removed
+
+    changed = {}
+    for name, new in new_items.items():
+        old = old_items.get(name)
+        if old is None or old is new:
+            continue
+        item_changes = diff_item(old, new)
+        if item_changes:
+            changed[name] = item_changes
+    if changed:
+        changes["changed"] = changed
+
+    order = [name for name in old_items if name in new_items] + [item["Name"] for item in added]
+    if order != list(new_items):
+        changes["order"] = list(new_items)
+    return changes
+
+
+def _patch_list(items, changes, patch_item):
+    """Return a copy of a list of named SLS items with changes from _diff_list applied."""
+    removed = changes.get("removed", [])
+    changed = changes.get("changed", {})
+    patched = {}
+    for item in items:
+        name = item["Name"]
+        if name in removed:
+            continue
+        patched[name] = patch_item(item, changed[name]) if name in changed else item
+    for item in changes.get("added", []):
+        patched[item["Name"]] = item
+
+    if "order" in changes:
+        return [patched[name] for name in changes["order"]]
+    return list(patched.values())
+
+
+def _diff_child_list(old, new, key, diff_item):
+    """Return the changes to a list held under a key, or None if it is not a list on both sides.
+
+    A list which is missing or null on one side is compared as an ordinary field instead.
+    """
+    if not isinstance(old.get(key), list) or not isinstance(new.get(key), list):
+        return None
+    return _diff_list(old[key], new[key], diff_item)
+
+
+def _diff_reservation(old, new):
+    """Return the changes between two SLS reservations."""
+    return _diff_fields(old, new)
+
+
+def _diff_subnet(old, new):
+    """Return the changes between two SLS subnets."""
+    reservations = _diff_child_list(old, new, "IPReservations", _diff_reservation)
+    if reservations is None:
+        return _diff_fields(old, new)
+
+    changes = _diff_fields(old, new, skip=("IPReservations",))
+    if reservations:
+        changes["reservations"] = reservations
+    return changes
+
+
+def _patch_subnet(subnet, changes):
+    """Return a copy of an SLS subnet with changes from _diff_subnet applied."""
+    patched = _patch_fields(subnet, changes)
+    if "reservations" in changes:
+        patched["IPReservations"] = _patch_list(
+            subnet["IPReservations"],
+            changes["reservations"],
+            _patch_fields,
+        )
+    return patched
+
+
+def _diff_network(old, new):
+    """Return the changes between two SLS networks."""
+    old_extra = old.get("ExtraProperties")
+    new_extra = new.get("ExtraProperties")
+    if not isinstance(old_extra, dict) or not isinstance(new_extra, dict):
+        return _diff_fields(old, new)
+
+    changes = _diff_fields(old, new, skip=("ExtraProperties",))
+    subnets = _diff_child_list(old_extra, new_extra, "Subnets", _diff_subnet)
+    if subnets is None:
+        extra_properties = _diff_fields(old_extra, new_extra)
+    else:
+        extra_properties = _diff_fields(old_extra, new_extra, skip=("Subnets",))
+    if extra_properties:
+        changes["extra_properties"] = extra_properties
+    if subnets:
+        changes["subnets"] = subnets
+    return changes
+
+
+def _patch_network(network, changes):
+    """Return a copy of an SLS network with changes from _diff_network applied."""
+    patched = _patch_fields(network, changes)
+    if "extra_properties" in changes or "subnets" in changes:
+        extra = _patch_fields(network["ExtraProperties"], changes.get("extra_properties", {}))
+        if "subnets" in changes:
+            extra["Subnets"] = _patch_list(
+                network["ExtraProperties"]["Subnets"],
+                changes["subnets"],
+                _patch_subnet,
+            )
+        patched["ExtraProperties"] = extra
+    return patched
+
+
+def _describe_fields(prefix, changes):
+    """Return log lines for changes from _diff_fields."""
+    lines = [
+        f"{prefix}: {key} set to {value}" for key, value in changes.get("fields", {}).items()
+    ]
+    lines += [f"{prefix}: {key} removed" for key in changes.get("removed_fields", [])]
+    return lines
+
+
+def _describe_list(prefix, kind, changes):
+    """Return log lines for the additions and removals in changes from _diff_list."""
+    lines = [f"{prefix}: added {kind} {item['Name']}" for item in changes.get("added", [])]
+    lines += [f"{prefix}: removed {kind} {name}" for name in changes.get("removed", [])]
+    if "order" in changes:
+        lines.append(f"{prefix}: {kind}s reordered")
+    return lines
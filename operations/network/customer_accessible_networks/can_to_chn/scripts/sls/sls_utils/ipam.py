@@ -22,6 +22,7 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 #
 """Extremely rudimentary and purpose-driven IPAM."""
+import bisect
 import ipaddress
 import math
 
@@ -31,38 +32,30 @@ from sls_utils.Networks import Network, Subnet
 DEBUG = False
 
 
-def free_ipv4_subnets(network):
-    """Return available subnets not currently in used by the network.
+def _used_ipv4_intervals(network):
+    """Return the address intervals of a network used by its subnets.
 
-    WARNING:  Use only in and around the CAN.  Other networks have untested corner cases!
+    Each interval carries the position at which its subnet is carved out of the network, smallest
+    subnets first, which is the order free_ipv4_subnets has always allocated in.
 
     Args:
         network (sls_utils.Network): SLS Networks object
 
     Returns:
-        free_subnets (list): Remaining subnets not used out of the network
+        used_intervals (list): Sorted, disjoint (first, last, order) tuples of integer addresses
 
     Raises:
-        ValueError: If input is not a Network
-        Exception: If subnets overlap or intersections are not found
+        Exception: If subnets overlap or are outside the network
     """
-    if not isinstance(network, Network):
-        raise ValueError(f"{free_ipv4_subnets.__name__} argument must be a Network")
-
-    subnets = network.subnets()
-    if subnets is None:
-        return None
-
+    network_ipv4 = ipaddress.IPv4Network(network.ipv4_network())
     if DEBUG:
-        print("NETWORK: ", network.name(), network.ipv4_network())
-    available_subnets = [ipaddress.IPv4Network(network.ipv4_network())]
+        print("NETWORK: ", network.name(), network_ipv4)
 
     # Ensure smallest sized subnets are first (and thus first matched)
-    subnets = sorted(subnets.values(), key=prefixlength, reverse=True)
-    if DEBUG:
-        print("SORTED SUBNETS: ", [x.ipv4_network() for x in subnets])
+    subnets = sorted(network.subnets().values(), key=prefixlength, reverse=True)
 
-    for subnet in subnets:
+    used_intervals = []
+    for order, subnet in enumerate(subnets):
         used_subnet = subnet.ipv4_network()
 
         temp_subnet = is_supernet_hacked(network.ipv4_network(), subnet)
@@ -77,47 +70,301 @@ def free_ipv4_subnets(network):
                 subnet.ipv4_address(),
                 subnet.ipv4_network(),
             )
+        used_intervals.append(
+            (int(used_subnet.network_address), int(used_subnet.broadcast_address), order),
+        )
+    used_intervals.sort()
 
-        found = False
-        for i in range(len((available_subnets))):
-            try:
-                if not used_subnet.subnet_of(available_subnets[i]):
-                    found = False
-                    continue
-            except AttributeError:
-                if not temp_is_subnet_of(used_subnet, available_subnets[i]):
-                    found = False
-                    continue
-
-            found = True
-            if DEBUG:
-                print("FOUND:  ", used_subnet, "is subnet of", available_subnets[i])
-            new_subnets = list(available_subnets[i].address_exclude(used_subnet))
-            if DEBUG:
-                print("    new_subnets: ", new_subnets)
-            available_subnets.pop(i)
-            available_subnets += new_subnets
-            available_subnets.sort(
-                key=prefixlength,
-                reverse=True,
-            )  # Use the smallest block possible
-            if DEBUG:
-                print("    final:  ", available_subnets)
-            break
-        if not found:
+    next_free = int(network_ipv4.network_address)
+    for used_first, used_last, _ in used_intervals:
+        if used_first < next_free or used_last > int(network_ipv4.broadcast_address):
             raise Exception(
                 "An appropriate subnet could not be found. "
                 "Often this is overlapping subnets or a subnet outside the network.",
             )
+        next_free = used_last + 1
+
+    return used_intervals
+
+
+def free_ipv4_intervals(network):
+    """Return the address intervals of a network not currently used by its subnets.
+
+    WARNING:  Use only in and around the CAN.  Other networks have untested corner cases!
+
+    The used subnets are sorted by address and swept once, so the cost is
+    O(subnets * log(subnets)) regardless of the size of the network.
+
+    Args:
+        network (sls_utils.Network): SLS Networks object
+
+    Returns:
+        free_intervals (list): Sorted, disjoint (first, last) tuples of integer addresses, or None
+            if the network has no subnets
+
+    Raises:
+        ValueError: If input is not a Network
+        Exception: If subnets overlap or are outside the network
+    """
+    if not isinstance(network, Network):
+        raise ValueError(f"{free_ipv4_intervals.__name__} argument must be a Network")
+
+    if network.subnets() is None:
+        return None
+
+    network_ipv4 = ipaddress.IPv4Network(network.ipv4_network())
+    free_intervals = []
+    next_free = int(network_ipv4.network_address)
+    for used_first, used_last, _ in _used_ipv4_intervals(network):
+        if used_first > next_free:
+            free_intervals.append((next_free, used_first - 1))
+        next_free = used_last + 1
+    if next_free <= int(network_ipv4.broadcast_address):
+        free_intervals.append((next_free, int(network_ipv4.broadcast_address)))
+
+    if DEBUG:
+        print("Free intervals: ", free_intervals)
+
+    return free_intervals
+
+
+def free_ipv4_subnets(network):
+    """Return available subnets not currently in used by the network.
+
+    WARNING:  Use only in and around the CAN.  Other networks have untested corner cases!
+
+    Each free interval is split into its largest aligned CIDR blocks, so candidate subnets are
+    never enumerated.  Blocks of the same size are ordered by when carving the subnets out of the
+    network would first have split them off: a block is split off by the first carved subnet
+    inside its parent block.  This keeps the allocation order of earlier releases.
+
+    Args:
+        network (sls_utils.Network): SLS Networks object
+
+    Returns:
+        free_subnets (list): Remaining subnets not used out of the network, smallest first
+
+    Raises:
+        ValueError: If input is not a Network
+        Exception: If subnets overlap or intersections are not found
+    """
+    if not isinstance(network, Network):
+        raise ValueError(f"{free_ipv4_subnets.__name__} argument must be a Network")
+
+    free_intervals = free_ipv4_intervals(network)
+    if free_intervals is None:
+        return None
 
+    network_ipv4 = ipaddress.IPv4Network(network.ipv4_network())
+    used_intervals = _used_ipv4_intervals(network)
+    used_firsts = [used_first for used_first, _, _ in used_intervals]
+
+    available_subnets = []
+    for first, last in free_intervals:
+        for block in ipaddress.summarize_address_range(
+            ipaddress.IPv4Address(first),
+            ipaddress.IPv4Address(last),
+        ):
+            order = -1
+            if block != network_ipv4:
+                parent = block.supernet()
+                lo = bisect.bisect_left(used_firsts, int(parent.network_address))
+                hi = bisect.bisect_right(used_firsts, int(parent.broadcast_address))
+                order = min(used_order for _, _, used_order in used_intervals[lo:hi])
+            available_subnets.append((block, order))
+
+    # Ensure smallest sized subnets are first (and thus first matched)
+    available_subnets.sort(key=lambda x: (-x[0].prefixlen, x[1]))
+    available_subnets = [block for block, _ in available_subnets]
     if DEBUG:
         print("Remaining: ", available_subnets)
 
     return available_subnets
 
 
-def free_ipv4_addresses(subnet):
-    """Return a set of available IPv4 addresses not currently used in a subnet.
+def first_free_ipv4_subnet(network, prefixlen):
+    """Return the lowest aligned subnet of a given size not currently used by the network.
+
+    WARNING:  Use only in and around the CAN.  Other networks have untested corner cases!
+
+    Args:
+        network (sls_utils.Network): SLS Networks object
+        prefixlen (int): Prefix length of the subnet to find
+
+    Returns:
+        subnet (ipaddress.IPv4Network): The first free subnet, or None if there is no room for one
+
+    Raises:
+        ValueError: If input is not a Network or the prefix length is not valid
+        Exception: If subnets overlap or are outside the network
+    """
+    if not isinstance(network, Network):
+        raise ValueError(f"{first_free_ipv4_subnet.__name__} argument must be a Network")
+    if not network.ipv4_network().prefixlen <= prefixlen <= 32:
+        raise ValueError(f"Prefix length {prefixlen} does not fit in {network.ipv4_network()}")
+
+    free_intervals = free_ipv4_intervals(network)
+    if free_intervals is None:
+        free_intervals = [
+            (
+                int(network.ipv4_network().network_address),
+                int(network.ipv4_network().broadcast_address),
+            ),
+        ]
+
+    block_size = 1 << (32 - prefixlen)
+    for first, last in free_intervals:
+        # Round up to the next block boundary
+        aligned = -(-first // block_size) * block_size
+        if aligned + block_size - 1 <= last:
+            return ipaddress.IPv4Network((aligned, prefixlen))
+
+    return None
+
+
+class FreeIPv4Addresses:
+    """Allocator of the free IPv4 addresses in a network, backed by sorted free intervals.
+
+    The free addresses are stored as sorted, disjoint, inclusive intervals of integer addresses,
+    so address ranges are never expanded.  Finding the first or last free address is O(1), and
+    testing or reserving an address is O(log n) in the number of intervals.
+    """
+
+    def __init__(self, ipv4_network, used_ipv4_addresses=()):
+        """Create the allocator.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network whose host addresses are allocated
+            used_ipv4_addresses (iterable): IPv4 addresses which are not free. None values, and
+                addresses outside of the network, are ignored.
+        """
+        ipv4_network = ipaddress.IPv4Network(ipv4_network)
+        first = int(ipv4_network.network_address)
+        last = int(ipv4_network.broadcast_address)
+        # Same host addresses as ipaddress.IPv4Network.hosts()
+        if ipv4_network.prefixlen < 31:
+            first += 1
+            last -= 1
+        self.__starts = [first] if first <= last else []
+        self.__ends = [last] if first <= last else []
+        self.__count = last - first + 1 if first <= last else 0
+        for used_ipv4_address in used_ipv4_addresses:
+            if used_ipv4_address is not None:
+                self.reserve(used_ipv4_address)
+
+    def __len__(self):
+        return self.__count
+
+    def __bool__(self):
+        return self.__count > 0
+
+    def __find(self, address):
+        """Return the index of the interval containing the integer address, or -1."""
+        i = bisect.bisect_right(self.__starts, address) - 1
+        if i >= 0 and address <= self.__ends[i]:
+            return i
+        return -1
+
+    def __contains__(self, ipv4_address):
+        return self.__find(int(ipaddress.IPv4Address(ipv4_address))) >= 0
+
+    def __iter__(self):
+        """Yield the free addresses in ascending order, without expanding them all at once."""
+        for start, end in zip(self.__starts, self.__ends):
+            for address in range(start, end + 1):
+                yield ipaddress.IPv4Address(address)
+
+    def intervals(self):
+        """Return the free addresses as a list of (first, last) ipaddress.IPv4Address tuples."""
+        return [
+            (ipaddress.IPv4Address(start), ipaddress.IPv4Address(end))
+            for start, end in zip(self.__starts, self.__ends)
+        ]
+
+    def first(self):
+        """Return the lowest free address (ipaddress.IPv4Address), or None if there are none."""
+        if not self.__starts:
+            return None
+        return ipaddress.IPv4Address(self.__starts[0])
+
+    def last(self):
+        """Return the highest free address (ipaddress.IPv4Address), or None if there are none."""
+        if not self.__ends:
+            return None
+        return ipaddress.IPv4Address(self.__ends[-1])
+
+    def reserve(self, ipv4_address):
+        """Remove an address from the free addresses.
+
+        Args:
+            ipv4_address (ipaddress.IPv4Address|str): The address to reserve
+
+        Returns:
+            True if the address was free, False if it was already reserved or not in the network
+        """
+        address = int(ipaddress.IPv4Address(ipv4_address))
+        i = self.__find(address)
+        if i < 0:
+            return False
+        start, end = self.__starts[i], self.__ends[i]
+        if start == end:
+            del self.__starts[i]
+            del self.__ends[i]
+        elif address == start:
+            self.__starts[i] = address + 1
+        elif address == end:
+            self.__ends[i] = address - 1
+        else:
+            self.__ends[i] = address - 1
+            self.__starts.insert(i + 1, address + 1)
+            self.__ends.insert(i + 1, end)
+        self.__count -= 1
+        return True
+
+    def pop_first(self):
+        """Reserve and return the lowest free address, or None if there are none."""
+        first = self.first()
+        if first is not None:
+            self.reserve(first)
+        return first
+
+    def pop_last(self):
+        """Reserve and return the highest free address, or None if there are none."""
+        last = self.last()
+        if last is not None:
+            self.reserve(last)
+        return last
+
+    def pop_many(self, count):
+        """Reserve and return the lowest count free addresses, in a single pass.
+
+        Args:
+            count (int): Number of addresses to reserve
+
+        Returns:
+            addresses (list): The reserved ipaddress.IPv4Address objects, in ascending order
+
+        Raises:
+            IndexError: If fewer than count addresses are free (nothing is reserved in that case)
+        """
+        if count > self.__count:
+            raise IndexError(f"Requested {count} IPv4 addresses but only {self.__count} are free")
+        addresses = []
+        while len(addresses) < count:
+            start, end = self.__starts[0], self.__ends[0]
+            take = min(count - len(addresses), end - start + 1)
+            addresses.extend(ipaddress.IPv4Address(a) for a in range(start, start + take))
+            if start + take > end:
+                del self.__starts[0]
+                del self.__ends[0]
+            else:
+                self.__starts[0] = start + take
+        self.__count -= count
+        return addresses
+
+
+def free_ipv4_address_allocator(subnet):
+    """Return an allocator of the IPv4 addresses not currently used in a subnet.
 
     NOTICE:  This function ignores DHCP Ranges / Pools in the subnet which likely
              need recalculation.
@@ -126,7 +373,7 @@ def free_ipv4_addresses(subnet):
         subnet (sls_utils.Subnet): SLS Subnet object
 
     Returns:
-        free_ips (set): Remaining IP addresses not used in the network (unordered)
+        free_ips (FreeIPv4Addresses): Remaining IP addresses not used in the network
 
     Raises:
         ValueError: If input is not a Subnet
@@ -134,21 +381,60 @@ def free_ipv4_addresses(subnet):
     if not isinstance(subnet, Subnet):
         raise ValueError(f"{__name__} argument must be a Subnet")
 
-    subnet_ipv4_network = subnet.ipv4_network()
+    # All the IPv4 addresses used in the subnet by Reservations, and the gateway
+    used_ipv4_addresses = [r.ipv4_address() for r in subnet.reservations().values()]
+    used_ipv4_addresses.append(subnet.ipv4_gateway())
+
+    return FreeIPv4Addresses(subnet.ipv4_network(), used_ipv4_addresses)
+
+
+def allocate_many(subnet, count, reserved=None):
+    """Return the lowest count IPv4 addresses not currently used in a subnet, in a single pass.
+
+    The addresses are recorded as reserved as they are handed out, so no address is returned
+    twice, and the subnet is only examined once no matter how many addresses are requested.
 
-    # Every available IPv4 address in the subnet
-    all_hosts_in_subnet = list(subnet_ipv4_network.hosts())
-    all_hosts_in_subnet = set(all_hosts_in_subnet)
+    Args:
+        subnet (sls_utils.Subnet): SLS Subnet object
+        count (int): Number of addresses to allocate
+        reserved (iterable): Additional IPv4 addresses which must not be allocated
+
+    Returns:
+        addresses (list): ipaddress.IPv4Address objects, in ascending order
+
+    Raises:
+        ValueError: If input is not a Subnet
+        IndexError: If the subnet does not have count free addresses
+    """
+    free_ips = free_ipv4_address_allocator(subnet)
+    for reserved_ipv4_address in reserved or ():
+        if reserved_ipv4_address is not None:
+            free_ips.reserve(reserved_ipv4_address)
+    try:
+        return free_ips.pop_many(count)
+    except IndexError as err:
+        raise IndexError(f"Insufficient free IPv4 addresses in subnet {subnet.name()}: {err}") from err
+
+
+def free_ipv4_addresses(subnet):
+    """Return a set of available IPv4 addresses not currently used in a subnet.
 
-    # All the IPv4 addresses used in the subnet by Reservations
-    reservations = subnet.reservations().values()
-    all_used_hosts_in_subnet = set({r.ipv4_address() for r in reservations})
-    all_used_hosts_in_subnet.add(subnet.ipv4_gateway())
+    NOTICE:  This function ignores DHCP Ranges / Pools in the subnet which likely
+             need recalculation.
 
-    # Available IPv4 addresses in the subnet
-    unused_hosts_in_subnet = all_hosts_in_subnet.difference(all_used_hosts_in_subnet)
+    Args:
+        subnet (sls_utils.Subnet): SLS Subnet object
+
+    Returns:
+        free_ips (set): Remaining IP addresses not used in the network (unordered)
+
+    Raises:
+        ValueError: If input is not a Subnet
+    """
+    if not isinstance(subnet, Subnet):
+        raise ValueError(f"{__name__} argument must be a Subnet")
 
-    return unused_hosts_in_subnet
+    return set(free_ipv4_address_allocator(subnet))
 
 
 def next_free_ipv4_address(subnet, requested_ipv4_address=None):
@@ -171,11 +457,12 @@ def next_free_ipv4_address(subnet, requested_ipv4_address=None):
         requested_ipv4_address = ipaddress.IPv4Address(requested_ipv4_address)
 
     next_free_ip = None
-    free_ips = free_ipv4_addresses(subnet)
     if requested_ipv4_address is not None:
         pass
     else:
-        next_free_ip = sorted(free_ips)[0]
+        next_free_ip = free_ipv4_address_allocator(subnet).first()
+        if next_free_ip is None:
+            raise IndexError(f"No free IPv4 addresses in subnet {subnet.name()}")
 
     return next_free_ip
 
@@ -200,11 +487,12 @@ def last_free_ipv4_address(subnet, requested_ipv4_address=None):
         requested_ipv4_address = ipaddress.IPv4Address(requested_ipv4_address)
 
     last_free_ip = None
-    free_ips = free_ipv4_addresses(subnet)
     if requested_ipv4_address is not None:
         pass
     else:
-        last_free_ip = sorted(free_ips)[-1]
+        last_free_ip = free_ipv4_address_allocator(subnet).last()
+        if last_free_ip is None:
+            raise IndexError(f"No free IPv4 addresses in subnet {subnet.name()}")
 
     return last_free_ip
 
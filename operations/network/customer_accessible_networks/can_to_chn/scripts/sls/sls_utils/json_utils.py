@@ -23,18 +23,40 @@
 #
 """Functions to manage input/output of SLS data as JSON."""
 import json
+import os
 import sys
+from types import GeneratorType
 
 import jsonschema
 
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "schemas")
 
-def validate(schema_file, sls_data):
-    """Validate SLS Networks with JSON schema.
+# Sections of a full SLS document which have a schema
+SLS_DOCUMENT_SCHEMAS = {
+    "Networks": "sls_networks_schema.json",
+}
+
+# Compiled validators, by real path of the schema file
+_validators = {}
+
+
+def validator(schema_file):
+    """Return the compiled validator for a JSON schema file.
+
+    The schema is loaded, checked and compiled the first time it is used, and cached for the rest
+    of the process.
 
     Args:
         schema_file (str): Name of the SLS schema file
-        sls_data (dict): Dictionary of the SLS Networks structure
+
+    Returns:
+        validator (jsonschema.Draft4Validator): Validator for the schema
     """
+    schema_file = os.path.realpath(schema_file)
+    cached = _validators.get(schema_file)
+    if cached is not None:
+        return cached
+
     with open(schema_file, "r") as file:
         json_schema = json.load(file)
 
@@ -62,21 +84,122 @@ def validate(schema_file, sls_data):
     # x     resolver=resolver,
     # x     format_checker=jsonschema.draft7_format_checker
     # x )
-    validator = jsonschema.Draft4Validator(
+    compiled = jsonschema.Draft4Validator(
         schema=json_schema,
         resolver=resolver,
         format_checker=jsonschema.draft4_format_checker,
     )
 
     try:
-        validator.check_schema(json_schema)
+        compiled.check_schema(json_schema)
     except jsonschema.exceptions.SchemaError as err:
         print(f"Schema {schema_file} is invalid: {[x.message for x in err.context]}\n")
         sys.exit(1)
 
-    errors = sorted(validator.iter_errors(sls_data), key=str)
+    _validators[schema_file] = compiled
+    return compiled
+
+
+def report_errors(errors):
+    """Print schema validation errors and exit if there are any.
+
+    Args:
+        errors (list): jsonschema.ValidationError objects
+    """
     if errors:
         print("SLS JSON failed schema checks:")
-        for error in errors:
+        for error in sorted(errors, key=str):
             print(f"    {error.message} in {error.absolute_path}")
         sys.exit(1)
+
+
+def validate(schema_file, sls_data):
+    """Validate SLS Networks with JSON schema.
+
+    Args:
+        schema_file (str): Name of the SLS schema file
+        sls_data (dict): Dictionary of the SLS Networks structure
+    """
+    report_errors(list(validator(schema_file).iter_errors(sls_data)))
+
+
+def validate_sls_document(sls_data):
+    """Validate every section of a full SLS document which has a schema, in one pass.
+
+    Objects built from a document validated this way do not need to validate their own data again
+    (for example NetworkManager(..., validate=False)).
+
+    Args:
+        sls_data (dict): Full SLS document, as from an SLS dumpstate
+    """
+    errors = []
+    for section, schema_file in SLS_DOCUMENT_SCHEMAS.items():
+        if section in sls_data:
+            schema_file = os.path.join(SCHEMA_DIR, schema_file)
+            errors += validator(schema_file).iter_errors(sls_data[section])
+    report_errors(errors)
+
+
+def dump_sorted(value, output_file, level=0):
+    """Write a value as json.dumps(value, indent=2, sort_keys=True) would, nested at a level.
+
+    Args:
+        value: JSON serializable value
+        output_file (file): Text file to write to
+        level (int): Nesting level of the value, which sets the indentation of its inner lines
+    """
+    text = json.dumps(value, indent=2, sort_keys=True)
+    if level:
+        # JSON strings escape newlines, so every newline in the text starts a new line of JSON
+        text = text.replace("\n", "\n" + "  " * level)
+    output_file.write(text)
+
+
+def dump_sorted_items(items, output_file, level=0, dump_value=dump_sorted):
+    """Write a JSON object an entry at a time, as json.dumps(indent=2, sort_keys=True) would.
+
+    Args:
+        items (iterable): (key, value) pairs, already sorted by key
+        output_file (file): Text file to write to
+        level (int): Nesting level of the object
+        dump_value (function): Writes a value given the value, output_file and level
+    """
+    empty = True
+    for key, value in items:
+        output_file.write("{\n" if empty else ",\n")
+        output_file.write("  " * (level + 1) + json.dumps(key) + ": ")
+        dump_value(value, output_file, level + 1)
+        empty = False
+    output_file.write("{}" if empty else "\n" + "  " * level + "}")
+
+
+def write_sls_document(sls_data, output_file, networks=None):
+    """Stream a full SLS document to a file.
+
+    Sections are written an entry at a time (each hardware component, each network), so the
+    document is never serialized in memory as a whole.  The output, including the trailing newline,
+    is byte-identical to click.echo(json.dumps(sls_data, indent=2, sort_keys=True)) after setting
+    sls_data["Networks"] = networks.to_sls(), as the scripts did before: networks are written in
+    the form the model serializes them to, whatever the form of the SLS data they were loaded from.
+
+    Args:
+        sls_data (dict): Full SLS document, as from an SLS dumpstate
+        output_file (file): Text file to write to
+        networks (sls_utils.Managers.NetworkManager): Networks to write in place of the
+            "Networks" section of sls_data
+    """
+    sections = dict(sls_data)
+    if networks is not None:
+        # Validates the networks before anything is written
+        sections["Networks"] = networks.iter_sls()
+
+    def dump_section(section, output_file, level):
+        if isinstance(section, dict):
+            section = sorted(section.items())
+        elif not isinstance(section, GeneratorType):
+            dump_sorted(section, output_file, level)
+            return
+        dump_sorted_items(section, output_file, level)
+
+    dump_sorted_items(sorted(sections.items()), output_file, dump_value=dump_section)
+    output_file.write("\n")
@@ -25,8 +25,11 @@ import requests
 import json
 import sys
 import os
+import re
 import subprocess
+import threading
 import urllib3
+from concurrent.futures import ThreadPoolExecutor
 
 urllib3.disable_warnings()
 
@@ -63,36 +66,67 @@ url = BSS_URL + "/bootparameters"
 ret = requests.request("GET", url, headers=headers, verify=False)
 data = ret.json()
 
-change = 0
-nochange = 0
-for i in data:
-  oldi = str(i)
-  for j in sub["id_maps"]["images"]:
-    if "params" in i:
-      i["params"] = i["params"].replace(j,sub["id_maps"]["images"][j])
-    if "kernel" in i:
-      i["kernel"] = i["kernel"].replace(j,sub["id_maps"]["images"][j])
-    if "initrd" in i:
-      i["initrd"] = i["initrd"].replace(j,sub["id_maps"]["images"][j])
-  for j in sub["etag_map"]:
-    if "params" in i:
-      i["params"] = i["params"].replace(j,sub["etag_map"][j])
-  if str(i) == oldi:
-    nochange+=1
-  else:
-    change+=1
-    BSS_URL="https://api-gw-service-nmn.local/apis/bss/boot/v1"
-    headers = {
-      'Content-Type': "application/json",
-      'cache-control': "no-cache",
-      'Authorization': f'Bearer {token}'
-    }
-    url = BSS_URL + "/bootparameters"
-    payload = json.dumps(i)
-    ret = requests.request("PUT", url, headers=headers, data=payload, verify=False)
-    if ret.status_code != 200:
-      print("ERROR: Return Code: " + str(ret.status_code))
-      print(ret.json())
+# Maximum number of concurrent PUT requests to BSS
+MAX_WORKERS = 16
+
+def compile_map(mapping):
+  """
+  Returns a function which replaces every occurrence of any key of the mapping in a string
+  with the corresponding value, in a single pass over the string. Longer keys are tried first,
+  so a key which contains another key is replaced as a whole.
+  """
+  if not mapping:
+    return lambda text: text
+  pattern = re.compile("|".join(re.escape(key) for key in sorted(mapping, key=len, reverse=True)))
+  return lambda text: pattern.sub(lambda match: mapping[match.group(0)], text)
+
+replace_ids = compile_map(sub["id_maps"]["images"])
+replace_etags = compile_map(sub["etag_map"])
+
+def update_entry(i):
+  """
+  Applies the image ID and etag substitutions to the bootparameters entry in place.
+  Returns True if the entry changed.
+  """
+  changed = False
+  for field in ("params", "kernel", "initrd"):
+    if field not in i:
+      continue
+    new_value = replace_ids(i[field])
+    if field == "params":
+      new_value = replace_etags(new_value)
+    if new_value != i[field]:
+      i[field] = new_value
+      changed = True
+  return changed
+
+put_headers = {
+  'Content-Type': "application/json",
+  'cache-control': "no-cache",
+  'Authorization': f'Bearer {token}'
+}
+thread_data = threading.local()
+
+def put_entry(i):
+  """
+  PUTs the bootparameters entry to BSS, reusing a connection per worker thread
+  """
+  if not hasattr(thread_data, "session"):
+    thread_data.session = requests.Session()
+    thread_data.session.verify = False
+    thread_data.session.headers.update(put_headers)
+  ret = thread_data.session.put(url, data=json.dumps(i))
+  if ret.status_code != 200:
+    print("ERROR: Return Code: " + str(ret.status_code))
+    print(ret.json())
+
+changed_entries = [ i for i in data if update_entry(i) ]
+change = len(changed_entries)
+nochange = len(data) - change
+
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+  # list() so that any exception raised in a worker is raised here
+  list(executor.map(put_entry, changed_entries))
 
 print(str(change) + " Changed")
 print(str(nochange) + " Not Changed")
@@ -0,0 +1,131 @@
+#! /usr/bin/env python3
+# MIT License
+#
+# (C) Copyright 2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+
+"""
+Take snapshots of BSS bootparameters, compare them, and restore BSS from them.
+
+  snapshot [--output <file>]            Write a compressed snapshot of BSS bootparameters
+  diff <old snapshot> [<new snapshot>]  Show the entries which differ between two snapshots
+                                        (or between a snapshot and the current BSS data)
+  restore [--delete-added] [--dry-run] <snapshot>
+                                        Write to BSS only the entries which differ from the
+                                        snapshot, concurrently
+"""
+
+import argparse
+import datetime
+import logging
+import os
+import sys
+
+from python_lib import args
+from python_lib import common
+from python_lib import logger
+from python_lib.bss_snapshot import BssDiff, BssSnapshot, default_snapshot_filename, \
+                                    diff_snapshots, restore_snapshot
+
+LOG_DIR = "/var/log/bss_snapshot"
+os.makedirs(LOG_DIR, exist_ok=True)
+
+
+def parse_args() -> argparse.Namespace:
+    """
+    Parses command-line arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Snapshot, compare, and restore BSS bootparameters")
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.required = True
+
+    snapshot_parser = subparsers.add_parser("snapshot", help="Take a snapshot of BSS bootparameters")
+    snapshot_parser.add_argument("--output", "-o", default=None,
+                                 help="Snapshot file to write (default: "
+                                      "bss-snapshot-<timestamp>.json.gz in the current directory)")
+
+    diff_parser = subparsers.add_parser(
+        "diff", help="Compare a snapshot with another snapshot or with the current BSS data")
+    diff_parser.add_argument("old", type=args.readable_file, help="Snapshot file")
+    diff_parser.add_argument("new", type=args.readable_file, nargs='?', default=None,
+                             help="Snapshot file to compare against (default: current BSS data)")
+
+    restore_parser = subparsers.add_parser(
+        "restore", help="Restore BSS bootparameters from a snapshot, writing only what differs")
+    restore_parser.add_argument("--delete-added", action='store_true',
+                                help="Also delete bootparameters entries which are in BSS but not "
+                                     "in the snapshot (by default they are left alone)")
+    restore_parser.add_argument("--dry-run", action='store_true',
+                                help="Show what would be changed, without changing it")
+    restore_parser.add_argument("snapshot", type=args.readable_file, help="Snapshot file")
+
+    return parser.parse_args()
+
+
+def log_diff(diff: BssDiff, old_label: str, new_label: str) -> None:
+    """
+    Logs the differences between the two snapshots
+    """
+    if diff.empty:
+        logging.info("No differences between %s and %s", old_label, new_label)
+        return
+    for label, keys in ((f"Only in {old_label}", diff.removed),
+                        (f"Only in {new_label}", diff.added),
+                        ("Changed", diff.changed)):
+        if keys:
+            logging.info("%s (%d): %s", label, len(keys), " ".join(keys))
+
+
+def main():
+    """ Main function """
+    parsed_args = parse_args()
+    logfile=os.path.join(LOG_DIR, datetime.datetime.now().strftime("%Y%m%d%H%M%S.log"))
+    print(f"Detailed logging will be recorded to: {logfile}")
+    logger.configure_logging(filename=logfile)
+    logging.debug("Command-line arguments: %s", sys.argv)
+    logging.debug("Parsed arguments: %s", parsed_args)
+
+    try:
+        if parsed_args.command == "snapshot":
+            output_file = parsed_args.output or default_snapshot_filename()
+            BssSnapshot.from_bss().save(output_file)
+        elif parsed_args.command == "diff":
+            old = BssSnapshot.load(parsed_args.old)
+            if parsed_args.new is None:
+                new, new_label = BssSnapshot.from_bss(), "BSS"
+            else:
+                new, new_label = BssSnapshot.load(parsed_args.new), parsed_args.new
+            log_diff(diff_snapshots(old, new), parsed_args.old, new_label)
+        else:
+            snapshot = BssSnapshot.load(parsed_args.snapshot)
+            diff = restore_snapshot(snapshot, delete_added=parsed_args.delete_added,
+                                    dry_run=parsed_args.dry_run)
+            log_diff(diff, "BSS", parsed_args.snapshot)
+        logging.info('DONE!')
+        return
+    except common.ScriptException as exc:
+        logging.error(exc)
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -27,6 +27,9 @@ Download exported IMS data from Minio into local filesystems, so it can
 be imported later
 """
 
+import argparse
+import configparser
+import contextlib
 import datetime
 import logging
 import math
@@ -37,10 +40,12 @@ import subprocess
 import sys
 import tempfile
 
-from typing import Callable, List, NamedTuple, Tuple
+from typing import Callable, Dict, Iterator, List, NamedTuple, Tuple, Union
 
+from python_lib import args
 from python_lib import common
 from python_lib import logger
+from python_lib.throttle import TransferLimits, TransferThrottle
 
 IMS_EXPORT_FS="/opt/cray/pit/ims"
 IMS_EXPORT_DIR=os.path.join(IMS_EXPORT_FS, "exported-ims-data")
@@ -177,9 +182,10 @@ class DestinationDirectory:
         self.__artifacts.append(art)
         return True
 
-    def sync_from_minio(self, folder_name: str) -> None:
+    def sync_from_minio(self, folder_name: str, throttle: TransferThrottle) -> None:
         """
-        Sync all of the assigned artifacts from minio to this directory.
+        Sync all of the assigned artifacts from minio to this directory, subject to the
+        current bandwidth limit (if any).
         If this is not the main export directory, also create symlinks in the
         main export directory for these artifacts.
         """
@@ -189,8 +195,10 @@ class DestinationDirectory:
         for art in self.artifacts:
             include_args.extend(["--include", art.path])
         logging.info("Copying selected artifacts from minio to '%s'", self.path)
-        run_aws_s3_cmd("sync", f"s3://cms/{folder_name}", self.path, "--exclude", "*",
-                       *include_args, num_retries=5, timeout=14400)
+        throttle.check_limits_file()
+        with aws_config_env(throttle.limits.max_bytes_per_second) as env:
+            run_aws_s3_cmd("sync", f"s3://cms/{folder_name}", self.path, "--exclude", "*",
+                           *include_args, num_retries=5, timeout=14400, env=env)
         if self.is_main_dir:
             return
         logging.info("Creating symbolic links in main export directory to files under '%s'",
@@ -262,12 +270,12 @@ class LocalDirList:
         logging.error("Insufficient free space to copy IMS data from minio")
         sys.exit(1)
 
-    def sync_from_minio(self, folder_name: str) -> None:
+    def sync_from_minio(self, folder_name: str, throttle: TransferThrottle) -> None:
         """
         Call sync_from_minio method on ims_export_dir and each of our local directories
         """
         for ldir in self.__local_dirs:
-            ldir.sync_from_minio(folder_name)
+            ldir.sync_from_minio(folder_name, throttle)
 
     def print_artifact_summary(self) -> None:
         """
@@ -320,6 +328,43 @@ def run_aws_s3_cmd(*aws_s3_args, **run_command_kwargs) -> bytes:
     return common.run_command(command_list, **run_command_kwargs)
 
 
+@contextlib.contextmanager
+def aws_config_env(max_bytes_per_second: Union[int, None]) -> Iterator[Union[Dict[str, str], None]]:
+    """
+    The aws CLI only allows its bandwidth to be limited through its configuration file.
+    So that the user's configuration file is not modified, this makes a temporary copy of it
+    with the s3 max_bandwidth setting added, and yields the environment variables needed to
+    point the aws CLI to the copy. If there is no bandwidth limit, yields None.
+    """
+    if max_bytes_per_second is None:
+        yield None
+        return
+    config_path = os.path.expanduser(os.environ.get("AWS_CONFIG_FILE", "~/.aws/config"))
+    config = configparser.RawConfigParser()
+    # If the file does not exist, this does nothing
+    config.read(config_path)
+    profile = os.environ.get("AWS_PROFILE", "default")
+    section = "default" if profile == "default" else f"profile {profile}"
+    if not config.has_section(section):
+        config.add_section(section)
+    # The s3 setting is a nested section, one "name = value" per line
+    s3_settings = {}
+    if config.has_option(section, "s3"):
+        for line in config.get(section, "s3").splitlines():
+            name, sep, value = line.partition("=")
+            if sep:
+                s3_settings[name.strip()] = value.strip()
+    s3_settings["max_bandwidth"] = str(max_bytes_per_second)
+    config.set(section, "s3", "\n" + "\n".join(f"{name} = {value}" for name, value in s3_settings.items()))
+    with tempfile.TemporaryDirectory(prefix="aws-config-") as tmpdir:
+        tmp_config_path = os.path.join(tmpdir, "config")
+        with open(tmp_config_path, "wt") as f:
+            config.write(f)
+        logging.debug("Limiting aws CLI bandwidth to %d bytes per second using config file '%s'",
+                      max_bytes_per_second, tmp_config_path)
+        yield { "AWS_CONFIG_FILE": tmp_config_path }
+
+
 def run_cleanup_script():
     """
     Run cleanup script, if it exists
@@ -449,18 +494,45 @@ def validate_export_dirs() -> None:
     sys.exit(1)
 
 
+def parse_args() -> argparse.Namespace:
+    """
+    Parses command-line arguments
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        '--max-bandwidth', type=args.bandwidth, default=None, metavar='BANDWIDTH',
+        help=("Limit the bandwidth used to copy from minio, in bytes per second, optionally with a "
+              "K, M, or G suffix (for example: 50M). By default there is no limit.")
+    )
+
+    parser.add_argument(
+        '--limits-file', type=str, default=None, metavar='PATH',
+        help=("JSON file with a 'max_bandwidth' field. Whenever this file is modified, the bandwidth "
+              "limit is updated from it (the new limit applies starting with the next local directory "
+              "being copied into).")
+    )
+
+    return parser.parse_args()
+
+
 def main():
     """ Main function """
+    parsed_args = parse_args()
     logfile=os.path.join(LOG_DIR, datetime.datetime.now().strftime("%Y%m%d%H%M%S.log"))
     print(f"Detailed logging will be recorded to: {logfile}")
     logger.configure_logging(filename=logfile)
+    logging.debug("Command-line arguments: %s", sys.argv)
+    logging.debug("Parsed arguments: %s", parsed_args)
+    throttle = TransferThrottle(limits=TransferLimits(max_bytes_per_second=parsed_args.max_bandwidth),
+                                limits_file=parsed_args.limits_file)
 
     validate_export_dirs()
 
     folder_name, all_artifacts = get_artifacts_list_from_minio()
     local_dir_list = create_local_directories(logfile)
     local_dir_list.assign_artifacts(all_artifacts)
-    local_dir_list.sync_from_minio(folder_name)
+    local_dir_list.sync_from_minio(folder_name, throttle)
 
     logging.info(
         "After IMS import is complete, run '%s' to clean up the IMS data from the local disks",
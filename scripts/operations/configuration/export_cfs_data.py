@@ -29,9 +29,10 @@ This script exports all CFS data to JSON files in the specified directory.
 """
 
 import argparse
+import concurrent.futures
 import json
 import os
-from typing import Union
+from typing import Iterable, Union
 
 from python_lib.args import readable_directory
 from python_lib.cfs_import_export import CFS_RESOURCE_TYPES, CfsResourceTypeData
@@ -48,18 +49,44 @@ def write_data_to_file(output_dir: str, file_name: str, data: Union[JsonDict, Js
         json.dump(data, outfile, indent=2)
 
 
+def stream_list_to_file(output_dir: str, file_name: str, items: Iterable[JsonDict]) -> int:
+    """
+    Write the specified items as a JSON list to the specified file in the specified directory,
+    writing each item as soon as it is available, rather than collecting them all in memory.
+    The file contents are identical to those written by write_data_to_file for the same list.
+    Returns the number of items written.
+    """
+    output_file = os.path.join(output_dir, file_name)
+    print(f"Writing data to {output_file}")
+    num_items = 0
+    with open(output_file, "wt") as outfile:
+        for item in items:
+            outfile.write(",\n  " if num_items else "[\n  ")
+            outfile.write(json.dumps(item, indent=2).replace("\n", "\n  "))
+            num_items += 1
+        outfile.write("\n]" if num_items else "[]")
+    return num_items
+
+
 def export_data(resource_type: str, resource_data: CfsResourceTypeData, output_dir: str) -> None:
     """
-    Get all of the data for the specified resource type from CFS, and then write it to a JSON file.
+    Get all of the data for the specified resource type from CFS, and write it to a JSON file.
+    Lists of resources are written to the file as they are received.
     """
     print(f"Reading {resource_type} data from CFS")
-    data = resource_data.list_function()
-    write_data_to_file(output_dir, resource_data.json_file_name, data)
+    if resource_data.iter_function is None:
+        data = resource_data.list_function()
+        write_data_to_file(output_dir, resource_data.json_file_name, data)
+        return
+    num_items = stream_list_to_file(output_dir, resource_data.json_file_name,
+                                    resource_data.iter_function())
+    print(f"Wrote {num_items} {resource_type} to {resource_data.json_file_name}")
 
 
 def main() -> None:
     """
-    Export the CFS data for each CFS data type and write it to JSON files
+    Export the CFS data for each CFS data type and write it to JSON files.
+    The data types are independent of each other, so they are exported concurrently.
     """
     parser = argparse.ArgumentParser(
         description="Exports all CFS data to JSON files in the specified directory")
@@ -68,8 +95,12 @@ def main() -> None:
     parsed_args = parser.parse_args()
     output_dir = parsed_args.output_directory
     print(f"Writing CFS data to following directory: {output_dir}")
-    for resource_type, resource_data in CFS_RESOURCE_TYPES.items():
-        export_data(resource_type, resource_data, output_dir)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(CFS_RESOURCE_TYPES)) as executor:
+        futures = [ executor.submit(export_data, resource_type, resource_data, output_dir)
+                    for resource_type, resource_data in CFS_RESOURCE_TYPES.items() ]
+    # Raise the first exception (if any)
+    for future in futures:
+        future.result()
     print("Successfully completed writing CFS data to JSON files")
 
 if __name__ == '__main__':
@@ -90,6 +90,30 @@ def parse_args() -> argparse.Namespace:
               "after being added to a tar archive")
     )
 
+    parser.add_argument(
+        '--max-bandwidth', type=args.bandwidth, default=None, metavar='BANDWIDTH',
+        help=("Limit the combined bandwidth of all S3 transfers, in bytes per second, optionally with a "
+              "K, M, or G suffix (for example: 50M). By default there is no limit.")
+    )
+
+    parser.add_argument(
+        '--max-requests-per-second', type=args.positive_float, default=None, metavar='RATE',
+        help="Limit the rate at which S3 artifact transfers are started. By default there is no limit."
+    )
+
+    parser.add_argument(
+        '--limits-file', type=str, default=None, metavar='PATH',
+        help=("JSON file with 'max_bandwidth' and/or 'max_requests_per_second' fields. Whenever this file "
+              "is modified, the S3 transfer limits are updated from it, even if transfers are in progress. "
+              "Limits which are not in the file keep the values given on the command line.")
+    )
+
+    parser.add_argument(
+        '--progress-interval', type=args.positive_float, default=None, metavar='SECONDS',
+        help=("How often to report the progress of S3 transfers (default: "
+              f"{ims_import_export.DEFAULT_REPORT_INTERVAL_SECONDS} seconds)")
+    )
+
     parser.add_argument(
         'target_directory', nargs='?', default=os.getcwd(), type=args.readable_directory,
         help='Directory in which to create IMS export (defaults to current directory)'
@@ -107,6 +131,11 @@ def main():
     logging.debug("Parsed arguments: %s", parsed_args)
 
     try:
+        ims_import_export.configure_transfer_progress(report_interval_seconds=parsed_args.progress_interval,
+                                                      summary_dir=LOG_DIR)
+        ims_import_export.configure_transfer_throttle(max_bytes_per_second=parsed_args.max_bandwidth,
+                                                      max_requests_per_second=parsed_args.max_requests_per_second,
+                                                      limits_file=parsed_args.limits_file)
         export_options = ims_import_export.ExportOptions(
             ignore_running_jobs=parsed_args.ignore_running_jobs,
             include_deleted=parsed_args.include_deleted,
@@ -33,22 +33,28 @@ import json
 import os
 import subprocess
 import sys
-from typing import Dict, List
+from typing import Dict, List, Union
 
+from python_lib import common
 from python_lib.bos import BosError, BosOptions, BosSessionTemplate, \
-                           delete_session, delete_session_template, \
+                           create_session_template, delete_session, delete_sessions, delete_session_template, \
                            list_options, list_sessions, \
-                           list_session_templates, update_options
+                           list_session_templates, update_options, Tenant
 from python_lib.bos import BosSessionTemplateUniqueId as TemplateUniqueId
 from python_lib.bos import BosSessionUniqueId as SessionUniqueId
-from python_lib.bos_cli import create_session_template
 
 # Mapping from template name to associated session template record
 
 SessionTemplateMap = Dict[TemplateUniqueId, BosSessionTemplate]
 
+# A list of tenants to restrict the import to, or None for all tenants
+TenantSubset = Union[List[Tenant], None]
+
 BOS_EXPORT_TOOL = "/usr/share/doc/csm/scripts/operations/configuration/export_bos_data.sh"
 
+# Maximum number of BOS requests made concurrently
+MAX_CONCURRENT_REQUESTS = 8
+
 def print_stderr(msg: str) -> None:
     """
     Outputs the specified message to stderr
@@ -206,13 +212,13 @@ def validate_json_file(file_name: str) -> None:
         raise BosError(f"Argument exists but is not a regular file: '{file_name}'")
     raise BosError(f"File does not exist: '{file_name}'")
 
-def load_current_templates() -> SessionTemplateMap:
+def load_current_templates(tenants: TenantSubset = None) -> SessionTemplateMap:
     """
-    Load current BOS session templates and return a mapping from session template name/tenant
-    to each template
+    Load current BOS session templates (of the specified tenants, if any) and return a mapping
+    from session template name/tenant to each template
     """
     template_map = {}
-    for template in list_session_templates():
+    for template in list_session_templates(tenants=tenants):
         template_id = template.unique_id
         if template_id in template_map:
             raise BosError("BOS session template listing includes multiple templates with "
@@ -257,45 +263,101 @@ def load_templates_from_import_data(file_or_dir: str) -> SessionTemplateMap:
         raise BosError(f"Contents of {json_file} not a session template or list of templates")
     return template_map
 
-def delete_all_sessions(session_ids: List[SessionUniqueId]) -> None:
+def delete_one_session(session_id: SessionUniqueId) -> None:
+    """
+    Deletes the specified session
+    """
+    print(f"Deleting session {session_id}")
+    delete_session(session_id)
+
+def delete_all_sessions(session_ids: List[SessionUniqueId], tenants: TenantSubset = None) -> None:
     """
-    Deletes the specified list of sessions, and then verifies that none remain
+    Deletes the specified list of sessions, and then verifies that none remain (for the specified
+    tenants, if any).
+
+    First the BOS bulk delete endpoint is used, which removes all completed sessions in
+    one request (per tenant). Any sessions which remain after that (because they have not completed)
+    are deleted individually, concurrently.
     """
     if not session_ids:
         return
 
-    for session_id in session_ids:
-        print(f"Deleting session {session_id}")
-        delete_session(session_id)
-
-    if list_sessions():
+    print(f"Deleting {len(session_ids)} sessions")
+    if tenants is None:
+        delete_sessions()
+    else:
+        # A bulk delete without a tenant would delete the sessions of every tenant, so the
+        # sessions with no tenant are left to be deleted individually
+        common.run_concurrently(lambda tenant: delete_sessions(tenant=tenant),
+                                [ tenant for tenant in tenants if tenant ], MAX_CONCURRENT_REQUESTS)
+    remaining_session_ids = [ session.unique_id for session in list_sessions(tenants=tenants) ]
+    if remaining_session_ids:
+        common.run_concurrently(delete_one_session, remaining_session_ids, MAX_CONCURRENT_REQUESTS)
+
+    if list_sessions(tenants=tenants):
         raise BosError("Sessions still exist after deleting all of them")
 
-def delete_all_templates(template_ids: List[TemplateUniqueId]) -> None:
+def delete_one_template(template_id: TemplateUniqueId) -> None:
+    """
+    Deletes the specified session template
+    """
+    print(f"Deleting session template {template_id}")
+    delete_session_template(template_id)
+
+def delete_all_templates(template_ids: List[TemplateUniqueId], tenants: TenantSubset = None) -> None:
     """
-    Deletes the specified list of session templates, and then verifies that none remain
+    Deletes the specified list of session templates concurrently, and then verifies that none remain
+    (for the specified tenants, if any)
     """
     if not template_ids:
         return
 
-    for template_id in template_ids:
-        print(f"Deleting session template {template_id}")
-        delete_session_template(template_id)
+    common.run_concurrently(delete_one_template, template_ids, MAX_CONCURRENT_REQUESTS)
 
-    if list_session_templates():
+    if list_session_templates(tenants=tenants):
         raise BosError("Session templates still exist after deleting all of them")
 
-def delete_all_sessions_and_templates(current_template_map: SessionTemplateMap) -> None:
+def import_template(template: BosSessionTemplate) -> None:
+    """
+    Creates the specified session template in BOS
     """
-    Deletes all BOS sessions and session templates.
+    print(f"Importing BOS v{template.version} session template {template.unique_id}")
+    create_session_template(template)
+
+def delete_all_sessions_and_templates(current_template_map: SessionTemplateMap,
+                                      tenants: TenantSubset = None) -> None:
+    """
+    Deletes all BOS sessions and session templates (of the specified tenants, if any).
     Then queries BOS to confirm that none remain.
     """
-    session_ids = [ session.unique_id for session in list_sessions() ]
+    session_ids = [ session.unique_id for session in list_sessions(tenants=tenants) ]
 
     print("Deleting all BOS sessions and session templates")
 
-    delete_all_sessions(session_ids)
-    delete_all_templates(list(current_template_map))
+    delete_all_sessions(session_ids, tenants)
+    delete_all_templates(list(current_template_map), tenants)
+
+def filter_templates_by_tenant(template_map: SessionTemplateMap,
+                               tenants: TenantSubset) -> SessionTemplateMap:
+    """
+    If a tenant subset is specified, returns the templates in the map which belong to one of
+    those tenants. Otherwise, returns the map unchanged.
+    """
+    if tenants is None:
+        return template_map
+    filtered_map = { template_id: template for template_id, template in template_map.items()
+                     if template_id.tenant in tenants }
+    num_skipped = len(template_map) - len(filtered_map)
+    if num_skipped:
+        print(f"Skipping {num_skipped} session template(s) in the import data which do not belong "
+              "to the specified tenants")
+    return filtered_map
+
+def tenant_arg(tenant_string: str) -> Tenant:
+    """
+    argparse type for tenant names. An empty string means no tenant.
+    """
+    return tenant_string if tenant_string else None
 
 def main() -> None:
     """
@@ -303,11 +365,14 @@ def main() -> None:
 
     Arguments:
     [--clear-bos]
+    [--tenant <tenant>] ...
     [--options-file <options_file.json>]
     {<session_template_directory> | <session_template_list.json> }
 
     - If --clear-bos is specified, all BOS sessions and session templates will be deleted before
       the import.
+    - If one or more tenants are specified, then only the session templates and sessions of those
+      tenants are considered (both in BOS and in the import data). An empty string means no tenant.
     - If options-file is specified, the BOS options in that file are imported onto the system
       (for those that differ from the current options)
     - If a JSON file for a single session template is specified, then that session template
@@ -328,6 +393,10 @@ def main() -> None:
         description="Reads BOS session templates and options from files and creates them in BOS")
     parser.add_argument("--clear-bos", action='store_true',
                         help="Delete BOS sessions and session templates before importing")
+    parser.add_argument("--tenant", type=tenant_arg, action='append', dest="tenants",
+                        help="Only import (and clear) session templates and sessions belonging to "
+                             "this tenant. May be specified multiple times. Specify an empty "
+                             "string for no tenant. By default, all tenants are included.")
     parser.add_argument("--options-file", type=argparse.FileType('r'), required=False,
                         help="JSON file of BOS options")
     parser.add_argument("file_or_directory",
@@ -335,7 +404,9 @@ def main() -> None:
                              "such JSON files")
     parsed_args = parser.parse_args()
 
-    exported_template_map = load_templates_from_import_data(parsed_args.file_or_directory)
+    tenants = parsed_args.tenants
+    exported_template_map = filter_templates_by_tenant(
+        load_templates_from_import_data(parsed_args.file_or_directory), tenants)
 
     if parsed_args.options_file is not None:
         print("Reading in BOS options from JSON file")
@@ -349,7 +420,7 @@ def main() -> None:
         options_to_change = None
 
     # Get list of current BOS session templates on system
-    current_template_map = load_current_templates()
+    current_template_map = load_current_templates(tenants)
 
     if parsed_args.clear_bos:
         # Take a snapshot of the BOS data before we begin.
@@ -357,7 +428,7 @@ def main() -> None:
         snapshot_bos_data()
         print("")
 
-        delete_all_sessions_and_templates(current_template_map)
+        delete_all_sessions_and_templates(current_template_map, tenants)
         current_template_map = {}
 
     template_import_map = get_templates_to_import(exported_template_map, current_template_map)
@@ -379,9 +450,7 @@ def main() -> None:
         change_options(imported_bos_options, options_to_change)
         print("")
 
-    for template_id, template in template_import_map.items():
-        print(f"Importing BOS v{template.version} session template {template_id}")
-        create_session_template(template)
+    common.run_concurrently(import_template, template_import_map.values(), MAX_CONCURRENT_REQUESTS)
 
     print("")
     # Take a snapshot of the BOS data after we're done
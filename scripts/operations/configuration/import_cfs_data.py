@@ -27,18 +27,24 @@
 This script imports CFS configurations, component desired states, and options from
 JSON files in a specified directory. If a component already has a desired state, or
 if a configuration with the same name already exists, then it is skipped.
+
+In diff mode, the import data is instead compared with CFS using content hashes, and only
+the differences are applied: configurations which are missing or whose content differs are
+written, and components whose desired state differs are updated.
 """
 
 import argparse
+import itertools
 import json
 import os
 import subprocess
 import sys
-from typing import Dict, Generator, List, NamedTuple, Union
+from typing import Dict, Generator, Iterable, Iterator, List, NamedTuple, Tuple, Union
 
-from python_lib import args, cfs
-from python_lib.cfs_import_export import CFS_RESOURCE_TYPES, list_cfs_components, \
-                                         remove_components_with_empty_ids
+from python_lib import args, cfs, common
+from python_lib.cfs_import_export import CFS_RESOURCE_TYPES, component_desired_state_hash, \
+                                         configuration_content_hash, list_cfs_components, \
+                                         remove_components_with_empty_ids, scrub_configuration
 from python_lib.common import print_err
 from python_lib.types import JsonDict, JSONDecodeError
 
@@ -50,6 +56,9 @@ CFG_JSON = CFS_RESOURCE_TYPES["configurations"].json_file_name
 CMP_JSON = CFS_RESOURCE_TYPES["components"].json_file_name
 OPT_JSON = CFS_RESOURCE_TYPES["options"].json_file_name
 
+# Maximum number of CFS requests made concurrently during the import
+MAX_CONCURRENT_REQUESTS = 8
+
 class CfsData(NamedTuple):
     """
     A collection of CFS components, CFS configurations, and CFS options.
@@ -267,6 +276,84 @@ def get_options_to_change(options_to_import: cfs.CfsOptions,
         print(", ".join(options_to_change))
     return options_to_change
 
+def get_configs_to_write_diff(configs_to_import: NameObjectMap,
+                              current_configs: NameObjectMap) -> List[str]:
+    """
+    Used in diff mode. Compare the content hashes of the configurations in the import data and on
+    the live system. Return a sorted list of configuration names that should be written (created
+    or overwritten) during the import: those which do not exist on the live system, and those
+    whose content differs from the import data.
+    """
+    configs_to_create = sorted(list(configs_to_import.keys() - current_configs.keys()))
+    configs_to_overwrite = []
+    configs_unchanged = []
+    for config_name in sorted(list(configs_to_import.keys() & current_configs.keys())):
+        if configuration_content_hash(configs_to_import[config_name]) == \
+                configuration_content_hash(current_configs[config_name]):
+            configs_unchanged.append(config_name)
+        else:
+            configs_to_overwrite.append(config_name)
+    if configs_unchanged:
+        print("Configurations with the following names already match the import data and will "
+              "not be updated:")
+        print(", ".join([ f"'{config_name}'" for config_name in configs_unchanged]))
+    if configs_to_overwrite:
+        print("Configurations with the following names differ from the import data and will be "
+              "overwritten:")
+        print(", ".join([ f"'{config_name}'" for config_name in configs_to_overwrite]))
+    if configs_to_create:
+        print("The following configurations will be imported:")
+        print(", ".join([ f"'{config_name}'" for config_name in configs_to_create]))
+    return sorted(configs_to_create + configs_to_overwrite)
+
+def get_comps_to_update_diff(comps_to_import: NameObjectMap, current_comps: NameObjectMap,
+                             current_configs: NameObjectMap,
+                             config_names_to_write: List[str]) -> List[str]:
+    """
+    Used in diff mode. Compare the hashes of the desired state of the components in the import
+    data and on the live system. Return the list of components that exist on the live system
+    and whose desired state differs from the import data. Components with no desired configuration
+    in the import data, and components whose imported desired configuration neither exists on the
+    live system nor is being imported, are not included.
+    """
+    comps_do_not_exist = sorted(list(comps_to_import.keys() - current_comps.keys()))
+    if comps_do_not_exist:
+        print("The following components do not exist in CFS and cannot be updated:")
+        print(", ".join(comps_do_not_exist))
+
+    available_config_names = current_configs.keys() | config_names_to_write
+    comps_to_update = []
+    comps_no_desired_config = []
+    num_unchanged = 0
+    for comp_id in sorted(list(comps_to_import.keys() & current_comps.keys())):
+        imported_comp = comps_to_import[comp_id]
+        if component_desired_state_hash(imported_comp) == \
+                component_desired_state_hash(current_comps[comp_id]):
+            num_unchanged += 1
+            continue
+        imported_desired_config_name = imported_comp["desired_config"]
+        if not imported_desired_config_name:
+            # As in the default mode, an empty desired configuration in the import data does not
+            # clear the desired configuration of the live component
+            comps_no_desired_config.append(comp_id)
+            continue
+        if imported_desired_config_name not in available_config_names:
+            print(f"Component {comp_id} will not be updated because its import data specifies"
+                  f" a nonexistent desired configuration: '{imported_desired_config_name}'")
+            continue
+        comps_to_update.append(comp_id)
+    if num_unchanged:
+        print(f"{num_unchanged} component(s) already have the desired state from the import data "
+              "and will not be updated")
+    if comps_no_desired_config:
+        print("The following components have no desired configurations set in the import data and "
+              "will not be updated:")
+        print(", ".join(comps_no_desired_config))
+    if comps_to_update:
+        print("The desired configuration for the following components will be imported:")
+        print(", ".join(comps_to_update))
+    return comps_to_update
+
 def change_options(option_data: cfs.CfsOptions, option_names_to_change: List[str]) -> None:
     """
     Create a dictionary mapping the specified options to be changed to the new values that
@@ -280,52 +367,46 @@ def change_options(option_data: cfs.CfsOptions, option_names_to_change: List[str
         print(f"{opt_name} = {option_updates[opt_name]}")
     cfs.update_options(option_updates)
 
-def scrub_layer(layer: JsonDict) -> None:
+def create_config(config_name: str, config_data: JsonDict) -> None:
     """
-    Check if the layer contains both "branch" and "commit" fields. It is not legal to
-    specify both for a layer when creating a configuration. In these cases, we remove the
-    "commit" field when recreating the layer, as it will be automatically populated by CFS.
-    The alternative (omitting the "branch" field) means that information is lost, since the
-    "branch" field is only present if it is specified when creating the configuration.
+    Create the specified configuration in CFS with the layers specified in its data
     """
-    if "commit" in layer and "branch" in layer:
-        del layer["commit"]
+    print(f"Importing configuration '{config_name}'")
+    scrub_configuration(config_data)
+    cfs.create_configuration(config_name, **config_data)
 
 def create_configs(configs_map: NameObjectMap, config_names_to_create: List[str]) -> None:
     """
-    Loop through the specified configuration names one at a time, and create them in CFS with
-    the layers specified in the configs map data.
+    Create the specified configurations in CFS with the layers specified in the configs map data.
+    The configurations are independent of each other, so they are created concurrently.
     """
     if not config_names_to_create:
         return
     print("")
-    for config_name in config_names_to_create:
-        print(f"Importing configuration '{config_name}'")
-        config_data = configs_map[config_name]
-        for layer in config_data["layers"]:
-            scrub_layer(layer)
-        # If an additional inventory layer is present, the same procedure must be done for it
-        if "additional_inventory" in config_data:
-            scrub_layer(config_data["additional_inventory"])
-        # When creating a CFS configuration, the 'name' and 'last_updated' fields cannot be specified
-        for field in [ 'name', 'last_updated' ]:
-            config_data.pop(field, None)
-        cfs.create_configuration(config_name, **config_data)
-
-def chunk_list(items: list, max_batch_size: int=500) -> Generator[list, None, None]:
-    """
-    Break a given list into chunks with size <= the specified maximum, and yield
-    them one at a time.
-    """
-    chunk_size = max_batch_size if max_batch_size > 0 else len(items)
-    while items:
-        yield items[:chunk_size]
-        items = items[chunk_size:]
+    common.run_concurrently(lambda config_name: create_config(config_name, configs_map[config_name]),
+                            config_names_to_create, MAX_CONCURRENT_REQUESTS)
+
+def chunk_list(items: Iterable, max_batch_size: int=500) -> Generator[list, None, None]:
+    """
+    Break a given list (or other iterable) into chunks with size <= the specified maximum,
+    and yield them one at a time.
+    """
+    item_iter = iter(items)
+    if max_batch_size <= 0:
+        chunk = list(item_iter)
+        if chunk:
+            yield chunk
+        return
+    while True:
+        chunk = list(itertools.islice(item_iter, max_batch_size))
+        if not chunk:
+            return
+        yield chunk
 
 def update_components(comps_map: NameObjectMap, comp_ids_to_update: List[str]) -> None:
     """
-    Loop through the specified component names one at a time, and update them in CFS with
-    the desired configuration specified in the components map data.
+    Group the specified components by the desired configuration specified in the components
+    map data, and update them in CFS in batches. The batches are updated concurrently.
     """
     if not comp_ids_to_update:
         return
@@ -338,24 +419,36 @@ def update_components(comps_map: NameObjectMap, comp_ids_to_update: List[str]) -
         else:
             comps_to_update_by_desired_config[desired_config_name] = [comp_id]
 
-    for desired_config_name, comp_id_list in comps_to_update_by_desired_config.items():
-        update_data = { "desired_config": desired_config_name }
-        for comp_sublist in chunk_list(comp_id_list):
-            print(f"Updating desired configuration to '{desired_config_name}' for components: {comp_sublist}")
-            cfs.update_components_by_ids(comp_ids=comp_sublist, update_data=update_data)
+    def update_batches() -> Iterator[Tuple[str, List[str]]]:
+        for desired_config_name, comp_id_list in comps_to_update_by_desired_config.items():
+            for comp_sublist in chunk_list(comp_id_list):
+                yield desired_config_name, comp_sublist
+
+    def update_batch(batch: Tuple[str, List[str]]) -> None:
+        desired_config_name, comp_sublist = batch
+        print(f"Updating desired configuration to '{desired_config_name}' for components: {comp_sublist}")
+        cfs.update_components_by_ids(comp_ids=comp_sublist,
+                                     update_data={ "desired_config": desired_config_name })
+
+    common.run_concurrently(update_batch, update_batches(), MAX_CONCURRENT_REQUESTS)
 
 def main() -> None:
     """
     Parses the command line arguments, does the stuff.
 
     Arguments:
-    [--clear-cfs] <directory containing JSON files>
+    [--clear-cfs | --diff] <directory containing JSON files>
 
     Raises CfsError if there is an error or if no data is found to import
     """
     parser = argparse.ArgumentParser(
         description="Reads CFS data from JSON files and imports the data info CFS")
-    parser.add_argument("--clear-cfs", action='store_true', help="Delete CFS configurations and clear CFS components before importing")
+    mode_group = parser.add_mutually_exclusive_group()
+    mode_group.add_argument("--clear-cfs", action='store_true', help="Delete CFS configurations and clear CFS components before importing")
+    mode_group.add_argument("--diff", action='store_true',
+                            help="Compare the import data with CFS and apply only the differences: "
+                                 "write configurations which are missing or whose content differs, "
+                                 "and update components whose desired configuration differs")
     parser.add_argument(metavar="json_directory", type=json_data_from_directory, dest="json_data",
                         help=f"Directory containing {CMP_JSON}, {CFG_JSON}, and {OPT_JSON}")
     parsed_args = parser.parse_args()
@@ -370,27 +463,42 @@ def main() -> None:
         print("Taking a snapshot of system CFS data before clearing it")
         snapshot_cfs_data()
 
-        for config_name in list(current_cfs_data.configurations):
+        def delete_config(config_name: str) -> None:
             print(f"Deleting configuration '{config_name}'")
             cfs.delete_configuration(config_name)
-            del current_cfs_data.configurations[config_name]
+
+        common.run_concurrently(delete_config, current_cfs_data.configurations, MAX_CONCURRENT_REQUESTS)
+        current_cfs_data.configurations.clear()
 
         comp_clear_data = {"error_count": 0, "state": [], "desired_config": "", "tags": {}}
-        for comp_sublist in chunk_list(list(current_cfs_data.components)):
+
+        def clear_comps(comp_sublist: List[str]) -> List[str]:
             print(f"Clearing error count, desired configuration, state, and tags for components: '{comp_sublist}'")
-            updated_comp_ids = cfs.update_components_by_ids(comp_ids=comp_sublist, update_data=comp_clear_data)['component_ids']
+            return cfs.update_components_by_ids(comp_ids=comp_sublist, update_data=comp_clear_data)['component_ids']
+
+        for updated_comp_ids in common.run_concurrently(clear_comps, chunk_list(current_cfs_data.components),
+                                                        MAX_CONCURRENT_REQUESTS):
             for comp_id in updated_comp_ids:
                 current_cfs_data.components[comp_id].update(comp_clear_data)
 
     # Determine the necessary updates
     print("\nExamining CFS configurations...")
-    configs_to_create = get_configs_to_create(cfs_data_to_import.configurations,
-                                              current_cfs_data.configurations)
+    if parsed_args.diff:
+        configs_to_create = get_configs_to_write_diff(cfs_data_to_import.configurations,
+                                                      current_cfs_data.configurations)
+    else:
+        configs_to_create = get_configs_to_create(cfs_data_to_import.configurations,
+                                                  current_cfs_data.configurations)
 
     print("\nExamining CFS components...")
-    comps_to_update = get_comps_to_update(cfs_data_to_import.components,
-                                          current_cfs_data.components,
-                                          current_cfs_data.configurations, configs_to_create)
+    if parsed_args.diff:
+        comps_to_update = get_comps_to_update_diff(cfs_data_to_import.components,
+                                                   current_cfs_data.components,
+                                                   current_cfs_data.configurations, configs_to_create)
+    else:
+        comps_to_update = get_comps_to_update(cfs_data_to_import.components,
+                                              current_cfs_data.components,
+                                              current_cfs_data.configurations, configs_to_create)
 
     print("\nExamining CFS options...")
     options_to_change = get_options_to_change(cfs_data_to_import.options, current_cfs_data.options)
@@ -33,13 +33,13 @@
 # the Python script completes, the expanded files from the archive are
 # cleaned up by this shell script, unless --no-cleanup is specified.
 #
-# Usage: import_cfs_data.sh [--clear-cfs] [--no-cleanup] <CFS export file.tgz>
+# Usage: import_cfs_data.sh [--clear-cfs | --diff] [--no-cleanup] <CFS export file.tgz>
 #
 ################################################################################
 
 CLEANUP=YES
 OUTPUT_DIR=""
-CLEAR_CFS=""
+IMPORT_MODE=""
 ARCHIVE=""
 
 cleanup() {
@@ -59,7 +59,7 @@ err_exit() {
 }
 
 usage() {
-  echo "Usage: import_cfs_data.sh [--clear-cfs] [--no-cleanup] <CFS export file.tgz>"
+  echo "Usage: import_cfs_data.sh [--clear-cfs | --diff] [--no-cleanup] <CFS export file.tgz>"
   echo
   err_exit "$@"
 }
@@ -75,7 +75,10 @@ fi
 while [[ $# -gt 0 ]]; do
   case "$1" in
     "--no-cleanup") CLEANUP="" ;;
-    "--clear-cfs") CLEAR_CFS="$1" ;;
+    "--clear-cfs" | "--diff")
+      [[ -z ${IMPORT_MODE} || ${IMPORT_MODE} == "$1" ]] || usage "--clear-cfs and --diff are mutually exclusive"
+      IMPORT_MODE="$1"
+      ;;
     *)
       [[ $# -eq 1 ]] || usage "Unrecognized argument: $1"
       ARCHIVE="$1"
@@ -113,8 +116,8 @@ for FNAME in configurations.json options.json; do
 done
 
 # Call the Python importer script on this directory
-# CLEAR_CFS is deliberately not quoted because if it is empty, we don't want to pass in an empty argument to the Python script
-run_cmd "${import_python_script}" ${CLEAR_CFS} "${JSON_DIR}"
+# IMPORT_MODE is deliberately not quoted because if it is empty, we don't want to pass in an empty argument to the Python script
+run_cmd "${import_python_script}" ${IMPORT_MODE} "${JSON_DIR}"
 
 # Call cleanup (which will clean up the output directory unless --no-cleanup was specified)
 cleanup
@@ -27,6 +27,9 @@
 Given a list of xnames, repeatedly query their status in CFS until none are in pending
 status. Periodically print a summary of their statuses. Exit with RC 0 if all are in
 configured status at the end. Otherwise exit with non-0 RC.
+
+Only the components which are still pending are queried on each poll. The time between polls
+grows while no statuses are changing, and drops back to the minimum when they do.
 """
 
 import argparse
@@ -34,11 +37,21 @@ import datetime
 import sys
 import time
 
-from typing import List, Set
+from typing import Dict, List, Set
 
-from python_lib import cfs
+from python_lib import args, cfs
 from python_lib.types import JsonDict
 
+DEFAULT_MIN_POLL_INTERVAL_SECONDS = 1.0
+DEFAULT_MAX_POLL_INTERVAL_SECONDS = 30.0
+
+# Factor by which the poll interval grows after each poll in which no statuses changed
+POLL_INTERVAL_BACKOFF_FACTOR = 2.0
+
+# How often (at most) to print the list of components which are still pending, when
+# no statuses are changing
+PENDING_REPORT_INTERVAL_SECONDS = 60.0
+
 
 def datestr(msg: str) -> str:
     """
@@ -82,7 +95,7 @@ def get_comp_status_map(id_list: List[str]) -> JsonDict:
     their config status
     """
     return {
-        comp["id"]: comp["configuration_status"] for comp in cfs.list_components(id_list=id_list) }
+        comp["id"]: comp["configuration_status"] for comp in cfs.iter_components(id_list=id_list) }
 
 
 class ComponentStatus:
@@ -106,18 +119,24 @@ class ComponentStatus:
         """
         return set(self.id_list).difference(self.comp_status_map)
 
-    def update(self) -> None:
+    def update(self) -> List[str]:
         """
-        Query CFS to update our ID -> status map.
-        Report on any IDs whose status have changed.
+        Query CFS to update our ID -> status map. Only the components which are currently
+        pending are queried, since those are the only ones whose status we are waiting on.
+        Report on any IDs whose status have changed, and return a list of them.
         """
-        new_cs_map = get_comp_status_map(self.id_list)
+        pending = self.pending
+        new_cs_map = get_comp_status_map(pending)
+        missing = set(pending).difference(new_cs_map)
+        if missing:
+            err_exit(f"At least one component not found in CFS: {missing}")
+        changed = []
         for comp, stat in new_cs_map.items():
             if self.comp_status_map[comp] != stat:
                 print_datestr(f"CFS component {comp} now has configuration status '{stat}'")
-        self.comp_status_map = new_cs_map
-        if self.missing_comps:
-            err_exit(f"At least one component not found in CFS: {self.missing_comps}")
+                changed.append(comp)
+        self.comp_status_map.update(new_cs_map)
+        return changed
 
     def comps_in_status(self, status: str) -> List[str]:
         """
@@ -168,30 +187,85 @@ class ComponentStatus:
         return self.all_statuses == ["configured"]
 
 
+class PollInterval:
+    """
+    The time to wait between polls of CFS. It backs off while nothing is changing, and
+    resets to the minimum when something does.
+    """
+
+    def __init__(self, min_seconds: float, max_seconds: float):
+        self.min_seconds = min_seconds
+        self.max_seconds = max(min_seconds, max_seconds)
+        self.seconds = min_seconds
+
+    def update(self, changed: bool) -> None:
+        """
+        Adjust the interval, based on whether or not any statuses changed in the latest poll
+        """
+        if changed:
+            self.seconds = self.min_seconds
+        else:
+            self.seconds = min(self.seconds * POLL_INTERVAL_BACKOFF_FACTOR, self.max_seconds)
+
+
+def print_pending(comp_status: ComponentStatus) -> None:
+    """
+    Print the number and list of components with pending status
+    """
+    pending = comp_status.pending
+    print_datestr(f"Number of CFS components still 'pending' is {len(pending)}:"
+                  f" {' '.join(pending)}")
+
+
+def summarize_changes(comp_status: ComponentStatus, changed: List[str]) -> None:
+    """
+    Print how many components changed status in the latest poll (grouped by their new status),
+    and how many are still pending
+    """
+    new_status_counts: Dict[str, int] = {}
+    for comp in changed:
+        status = comp_status.comp_status_map[comp]
+        new_status_counts[status] = new_status_counts.get(status, 0) + 1
+    counts_str = ", ".join(f"{count} {status}" for status, count in sorted(new_status_counts.items()))
+    print_datestr(f"{len(changed)} CFS component(s) changed status ({counts_str});"
+                  f" {len(comp_status.pending)} still 'pending'")
+
+
 def main() -> None:
     """
     Parses the command line arguments, does the stuff.
 
     Arguments:
+    [--min-interval <seconds>] [--max-interval <seconds>]
     <component xname 1> [<comp xname 2>] ...
     """
     parser = argparse.ArgumentParser(
         description="Monitors CFS status of components until none are pending")
+    parser.add_argument("--min-interval", type=args.positive_float,
+                        default=DEFAULT_MIN_POLL_INTERVAL_SECONDS,
+                        help="Minimum number of seconds between CFS queries "
+                             f"(default: {DEFAULT_MIN_POLL_INTERVAL_SECONDS})")
+    parser.add_argument("--max-interval", type=args.positive_float,
+                        default=DEFAULT_MAX_POLL_INTERVAL_SECONDS,
+                        help="Maximum number of seconds between CFS queries, while no component "
+                             f"statuses are changing (default: {DEFAULT_MAX_POLL_INTERVAL_SECONDS})")
     parser.add_argument("cfs_component", nargs='+', help="CFS component to monitor")
     parsed_args = parser.parse_args()
 
     print_datestr("Querying CFS for component statuses")
     comp_status = ComponentStatus(parsed_args.cfs_component)
-    count=0
+    interval = PollInterval(parsed_args.min_interval, parsed_args.max_interval)
+    last_pending_report = None
     while not comp_status.done:
-        if count % 10 == 0:
-            num_pending = len(comp_status.pending)
-            pending_list_str = " ".join(comp_status.pending)
-            print_datestr(f"Number of CFS components still 'pending' is {num_pending}:"
-                          f" {pending_list_str}")
-        time.sleep(1)
-        count+=1
-        comp_status.update()
+        now = time.monotonic()
+        if last_pending_report is None or now - last_pending_report >= PENDING_REPORT_INTERVAL_SECONDS:
+            print_pending(comp_status)
+            last_pending_report = now
+        time.sleep(interval.seconds)
+        changed = comp_status.update()
+        if changed:
+            summarize_changes(comp_status, changed)
+        interval.update(bool(changed))
     if not comp_status.success:
         err_exit("Not all components successfully configured")
     print_datestr("SUCCESS")
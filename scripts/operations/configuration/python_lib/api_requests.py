@@ -26,6 +26,7 @@
 import base64
 import copy
 import logging
+import threading
 import time
 import traceback
 from typing import Callable, Container, Tuple, Union
@@ -42,10 +43,24 @@ ADMIN_CLIENT_SECRET_NAMESPACE = "default"
 API_GW_BASE_URL = "https://api-gw-service-nmn.local"
 AUTH_TOKEN_URL = f"{API_GW_BASE_URL}/keycloak/realms/shasta/protocol/openid-connect/token"
 
+# A cached API token is not used if it will expire within this many seconds
+API_TOKEN_EXPIRY_MARGIN_SECONDS = 60
+
 # For type hints
 ApiResponse = requests.models.Response
 
 
+class _ApiTokenCache:
+    """
+    The most recently obtained API token, shared by all threads, so that a new token is
+    only requested from keycloak when the cached one is about to expire
+    """
+    lock = threading.Lock()
+    token: Union[str, None] = None
+    # time.monotonic() value after which the cached token should no longer be used
+    expiry: float = 0.0
+
+
 def log_error_raise_exception(msg: str, parent_exception: Exception = None) -> None:
     """
     1) If a parent exception is passed in, make a debug log entry with its stack trace.
@@ -106,14 +121,29 @@ def get_full_api_token(k8s_client: k8s.CoreV1API = None) -> Tuple[str, JsonDict]
 
 def get_api_token(k8s_client: k8s.CoreV1API = None) -> str:
     """
-    Return the token needed for API calls
+    Return the token needed for API calls. The token is cached and reused until it is close to
+    expiring.
     """
-    _, resp_json = get_full_api_token(k8s_client)
-    try:
-        return resp_json["access_token"]
-    except (KeyError, TypeError) as exc:
-        log_error_raise_exception(
-            "Keycloak API token request response in unexpected format", exc)
+    with _ApiTokenCache.lock:
+        if _ApiTokenCache.token is not None and time.monotonic() < _ApiTokenCache.expiry:
+            return _ApiTokenCache.token
+        request_time = time.monotonic()
+        _, resp_json = get_full_api_token(k8s_client)
+        try:
+            token = resp_json["access_token"]
+        except (KeyError, TypeError) as exc:
+            log_error_raise_exception(
+                "Keycloak API token request response in unexpected format", exc)
+        try:
+            expires_in = float(resp_json["expires_in"])
+        except (KeyError, TypeError, ValueError):
+            # Without an expiration time, do not reuse the token
+            logging.debug("No expiration time in keycloak API token response; not caching token")
+            _ApiTokenCache.token = None
+            return token
+        _ApiTokenCache.token = token
+        _ApiTokenCache.expiry = request_time + expires_in - API_TOKEN_EXPIRY_MARGIN_SECONDS
+        return token
 
 
 def make_api_request_with_retries(request_method: Callable, url: str, add_api_token: bool = False,
@@ -31,6 +31,7 @@ import os
 from typing import Callable, List
 
 from . import common
+from . import throttle
 
 TEXT_FILE_TYPE = argparse.FileType('rt', encoding="utf-8")
 
@@ -72,6 +73,33 @@ def readable_file_with_ext(filepath_string: str, ext: str) -> str:
     return readable_file(filepath_string)
 
 
+def bandwidth(bandwidth_string: str) -> int:
+    """
+    Validates that the string is a bandwidth, as accepted by throttle.parse_bandwidth.
+    If so, returns the bandwidth in bytes per second.
+    Raises an ArgumentTypeError if not.
+    """
+    try:
+        return throttle.parse_bandwidth(bandwidth_string)
+    except common.ScriptException as exc:
+        raise argparse.ArgumentTypeError(f"{exc}")
+
+
+def positive_float(float_string: str) -> float:
+    """
+    Validates that the string is a positive number.
+    If so, returns it as a float.
+    Raises an ArgumentTypeError if not.
+    """
+    try:
+        value = float(float_string)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Not a number: '{float_string}'")
+    if value <= 0:
+        raise argparse.ArgumentTypeError(f"Must be positive: '{float_string}'")
+    return value
+
+
 def get_text_file_contents(file_name: str,
                            value_validator: Callable = None) -> str:
     """
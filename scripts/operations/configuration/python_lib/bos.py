@@ -24,7 +24,7 @@
 
 """Shared Python function library: BOS"""
 
-from typing import Dict, List, NamedTuple, Union
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple, TypeVar, Union
 
 from . import api_requests
 from . import common
@@ -53,6 +53,9 @@ BosOptions = Dict[str, Union[bool, int, str]]
 # Tenant value can be None or a string
 Tenant = Union[None, str]
 
+# Maximum number of tenants queried concurrently
+MAX_CONCURRENT_TENANT_REQUESTS = 8
+
 
 class NameTenantTuple(NamedTuple):
     """
@@ -208,6 +211,33 @@ BOS_V2_SESSIONS_URL = f"{BOS_V2_BASE_URL}/sessions"
 BOS_V2_TEMPLATES_URL = f"{BOS_V2_BASE_URL}/sessiontemplates"
 
 
+BosObjectType = TypeVar('BosObjectType', bound=BosTemplateOrSession)
+
+def iter_by_tenant(list_function: Callable[[Tenant], List[BosObjectType]],
+                   tenants: Iterable[Tenant]) -> Iterator[Tuple[Tenant, List[BosObjectType]]]:
+    """
+    Calls the list function for each of the specified tenants concurrently (see
+    common.iter_concurrently), and yields (tenant, list of objects) tuples, in the order in which
+    the tenant requests complete.
+    A request with no tenant lists the objects of every tenant, so the results are filtered
+    to only include objects belonging to the tenant in question.
+    """
+    def list_for_tenant(tenant: Tenant) -> Tuple[Tenant, List[BosObjectType]]:
+        return tenant, [ obj for obj in list_function(tenant) if obj.tenant == tenant ]
+    return common.iter_concurrently(list_for_tenant, dict.fromkeys(tenants),
+                                    MAX_CONCURRENT_TENANT_REQUESTS)
+
+def merge_tenant_lists(list_function: Callable[[Tenant], List[BosObjectType]],
+                       tenants: Iterable[Tenant]) -> List[BosObjectType]:
+    """
+    Returns a single list of the objects from all of the specified tenants,
+    listed concurrently (see iter_by_tenant)
+    """
+    merged = []
+    for _, objects in iter_by_tenant(list_function, tenants):
+        merged.extend(objects)
+    return merged
+
 def tenant_header(tenant: Tenant) -> dict:
     if tenant:
         return { "Cray-Tenant-Name": tenant }
@@ -265,10 +295,31 @@ def delete_session(session_id: BosSessionUniqueId) -> None:
     request_kwargs["expected_status_codes"] = {204}
     api_requests.delete_retry_validate(**request_kwargs)
 
-def list_sessions(tenant: Tenant = None) -> List[BosSession]:
+def delete_sessions(tenant: Tenant = None, status: Union[str, None] = None) -> None:
+    """
+    Uses the BOS bulk delete endpoint to delete multiple sessions (for the specified tenant,
+    if any). If a status is specified, only sessions with that status are deleted. Otherwise,
+    BOS only deletes completed sessions.
+    """
+    request_kwargs = {"url": BOS_V2_SESSIONS_URL,
+                      "add_api_token": True,
+                      "expected_status_codes": {204}}
+    if status:
+        request_kwargs["params"] = { "status": status }
+    headers = tenant_header(tenant)
+    if headers:
+        request_kwargs["headers"] = headers
+    api_requests.delete_retry_validate(**request_kwargs)
+
+def list_sessions(tenant: Tenant = None,
+                  tenants: Union[Iterable[Tenant], None] = None) -> List[BosSession]:
     """
     Queries BOS for a list of all sessions, and returns that list.
+    If a list of tenants is specified, only the sessions belonging to those tenants
+    are returned (see iter_sessions_by_tenant).
     """
+    if tenants is not None:
+        return merge_tenant_lists(list_sessions, tenants)
     request_kwargs = {"url": BOS_V2_SESSIONS_URL,
                       "add_api_token": True,
                       "expected_status_codes": {200}}
@@ -277,6 +328,13 @@ def list_sessions(tenant: Tenant = None) -> List[BosSession]:
     return [ BosSession(session)
              for session in api_requests.get_retry_validate_return_json(**request_kwargs) ]
 
+def iter_sessions_by_tenant(tenants: Iterable[Tenant]) -> Iterator[Tuple[Tenant, List[BosSession]]]:
+    """
+    Lists the sessions of each of the specified tenants (None meaning no tenant) concurrently,
+    and yields (tenant, list of sessions) tuples as each tenant's listing completes.
+    """
+    return iter_by_tenant(list_sessions, tenants)
+
 # BOS session template functions
 
 def delete_session_template(template_id: BosSessionTemplateUniqueId) -> None:
@@ -287,10 +345,42 @@ def delete_session_template(template_id: BosSessionTemplateUniqueId) -> None:
     request_kwargs["expected_status_codes"] = {204}
     api_requests.delete_retry_validate(**request_kwargs)
 
-def list_session_templates(tenant: Tenant = None) -> List[BosSessionTemplate]:
+def __template_write_request_kwargs(template: BosSessionTemplate) -> dict:
+    # As of CSM 1.6, there should only be BOS v2
+    if template.version != 2:
+        raise BosError(f"Invalid BOS version: {template.version}; cannot write template "
+                       f"{template.unique_id}")
+    request_kwargs = v2_template_request_kwargs_base(template.unique_id)
+    request_kwargs["expected_status_codes"] = {200}
+    request_kwargs["json"] = template.contents
+    return request_kwargs
+
+def create_session_template(template: BosSessionTemplate) -> BosSessionTemplate:
+    """
+    Creates (or replaces) the specified session template, for its tenant (if any).
+    Returns the session template as created by BOS.
+    """
+    request_kwargs = __template_write_request_kwargs(template)
+    return BosSessionTemplate(api_requests.put_retry_validate_return_json(**request_kwargs))
+
+def update_session_template(template: BosSessionTemplate) -> BosSessionTemplate:
+    """
+    Updates the existing session template with the same name and tenant as the specified one,
+    setting the fields in the specified template.
+    Returns the updated session template.
+    """
+    request_kwargs = __template_write_request_kwargs(template)
+    return BosSessionTemplate(api_requests.patch_retry_validate_return_json(**request_kwargs))
+
+def list_session_templates(tenant: Tenant = None,
+                           tenants: Union[Iterable[Tenant], None] = None) -> List[BosSessionTemplate]:
     """
     Queries BOS for a list of all session templates, and returns that list.
+    If a list of tenants is specified, only the session templates belonging to those tenants
+    are returned (see iter_session_templates_by_tenant).
     """
+    if tenants is not None:
+        return merge_tenant_lists(list_session_templates, tenants)
     request_kwargs = {"url": BOS_V2_TEMPLATES_URL,
                       "add_api_token": True,
                       "expected_status_codes": {200}}
@@ -298,3 +388,11 @@ def list_session_templates(tenant: Tenant = None) -> List[BosSessionTemplate]:
         request_kwargs["headers"] = { "Cray-Tenant-Name": tenant }
     return [ BosSessionTemplate(template)
              for template in api_requests.get_retry_validate_return_json(**request_kwargs) ]
+
+def iter_session_templates_by_tenant(
+        tenants: Iterable[Tenant]) -> Iterator[Tuple[Tenant, List[BosSessionTemplate]]]:
+    """
+    Lists the session templates of each of the specified tenants (None meaning no tenant)
+    concurrently, and yields (tenant, list of templates) tuples as each tenant's listing completes.
+    """
+    return iter_by_tenant(list_session_templates, tenants)
@@ -27,7 +27,7 @@ import traceback
 
 import logging
 
-from typing import Dict, List, Union
+from typing import Dict, Iterable, List, Union
 
 from . import api_requests
 from . import common
@@ -36,6 +36,11 @@ from .types import JSONDecodeError
 BSS_BASE_URL = f"{api_requests.API_GW_BASE_URL}/apis/bss"
 BSS_BOOTPARAMS_URL = f"{BSS_BASE_URL}/boot/v1/bootparameters"
 
+# When looking up at most this many xnames, only their bootparameters are requested from BSS.
+# For more xnames than this, all bootparameters are requested and indexed locally, since a
+# single query with a very long host list is slow for BSS to process.
+MAX_HOSTS_PER_QUERY = 100
+
 
 def log_error_raise_exception(msg: str, parent_exception: Union[Exception, None] = None) -> None:
     """
@@ -113,28 +118,122 @@ def get_bootparameters(xname_list: Union[List[str], None] = None,
     return bootparams_list
 
 
-def get_bootparameters_map(xname_list: List[str]) -> Dict[str, dict]:
+class BootparametersIndex:
+    """
+    Index of a list of BSS bootparameters entries, built in one pass, allowing an entry to be
+    looked up by any of its hosts, MAC addresses, or NIDs. If more than one entry lists the same
+    host, MAC, or NID, the first such entry is indexed.
+    """
+
+    def __init__(self, bootparams_list: Iterable[dict]):
+        self.__by_host: Dict[str, dict] = {}
+        self.__by_mac: Dict[str, dict] = {}
+        self.__by_nid: Dict[int, dict] = {}
+        for bootparam in bootparams_list:
+            try:
+                for host in bootparam.get("hosts") or []:
+                    self.__by_host.setdefault(host, bootparam)
+                for mac in bootparam.get("macs") or []:
+                    self.__by_mac.setdefault(mac.lower(), bootparam)
+                for nid in bootparam.get("nids") or []:
+                    self.__by_nid.setdefault(int(nid), bootparam)
+            except (AttributeError, TypeError, ValueError) as exc:
+                log_error_raise_exception("BSS bootparameters entry has unexpected format", exc)
+
+    # Use a string for the type hint in the case where the type is not yet defined.
+    # https://peps.python.org/pep-0484/#forward-references
+    @classmethod
+    def from_bss(cls, xname_list: Union[List[str], None] = None) -> "BootparametersIndex":
+        """
+        Queries BSS for the bootparameters of the specified xnames (or all bootparameters, if no
+        xnames are specified), and returns an index of them
+        """
+        return cls(get_bootparameters(xname_list=xname_list, expected_to_exist=False))
+
+    @property
+    def hosts(self) -> List[str]:
+        """
+        Returns a list of all hosts in the index
+        """
+        return list(self.__by_host)
+
+    def by_host(self, host: str) -> Union[dict, None]:
+        """
+        Returns the bootparameters entry for the specified host, or None if there is none
+        """
+        return self.__by_host.get(host)
+
+    def by_mac(self, mac: str) -> Union[dict, None]:
+        """
+        Returns the bootparameters entry for the specified MAC address (case-insensitive),
+        or None if there is none
+        """
+        return self.__by_mac.get(mac.lower())
+
+    def by_nid(self, nid: int) -> Union[dict, None]:
+        """
+        Returns the bootparameters entry for the specified NID, or None if there is none
+        """
+        return self.__by_nid.get(int(nid))
+
+    def host_map(self, xname_list: Iterable[str]) -> Dict[str, dict]:
+        """
+        Returns a dictionary mapping each of the specified xnames which is in the index
+        to its bootparameters entry
+        """
+        return { xname: self.__by_host[xname] for xname in xname_list if xname in self.__by_host }
+
+
+def get_bootparameters_map(xname_list: List[str],
+                           index: Union[BootparametersIndex, None] = None) -> Dict[str, dict]:
     """
     Queries BSS for all bootparameters for the specified xnames. Returns a dictionary mapping
     every xname to its corresponding bootparameters. An exception is raised if bootparameters
     are not found for any of the xnames. common.ScriptException is raised on error.
+
+    If an index is specified, it is used instead of querying BSS. Otherwise, if there are few
+    xnames, only their bootparameters are requested; if there are many, all bootparameters
+    are requested and indexed.
     """
-    bootparams_list = get_bootparameters(xname_list=xname_list, expected_to_exist=True)
-    bootparams_map = {}
-    for xname in xname_list:
-        for bootparam in bootparams_list:
-            # Not protecting the following with try...except because that is handled inside
-            # get_bootparameters()
-            if xname in bootparam["hosts"]:
-                bootparams_map[xname] = bootparam
-                break
-
-    if len(bootparams_map) != len(xname_list):
-        log_error_raise_exception(f"Number of xnames {len(xname_list)} does not match corresponding"
-                                  f" number of BSS bootparameters {len(bootparams_map)}")
+    if index is None:
+        if len(xname_list) <= MAX_HOSTS_PER_QUERY:
+            # get_bootparameters raises an exception if any of the xnames are not found
+            index = BootparametersIndex(get_bootparameters(xname_list=xname_list,
+                                                           expected_to_exist=True))
+        else:
+            index = BootparametersIndex.from_bss()
+    bootparams_map = index.host_map(xname_list)
+
+    missing_xnames = set(xname_list).difference(bootparams_map)
+    if missing_xnames:
+        missing_xnames_str = ", ".join(sorted(list(missing_xnames)))
+        log_error_raise_exception("One or more queried xnames were not found in BSS"
+                                  f" bootparameters: {missing_xnames_str}")
     return bootparams_map
 
 
+def put_bootparameters(bootparam: dict) -> None:
+    """
+    Creates or replaces the specified bootparameters entry in BSS.
+    common.ScriptException is raised on error.
+    """
+    request_kwargs = {"url": BSS_BOOTPARAMS_URL, "add_api_token": True,
+                      "expected_status_codes": 200, "json": bootparam}
+    api_requests.put_retry_validate(**request_kwargs)
+
+
+def delete_bootparameters(bootparam: dict) -> None:
+    """
+    Deletes the bootparameters for the hosts, MACs, and NIDs in the specified entry from BSS.
+    common.ScriptException is raised on error.
+    """
+    request_json = { field: bootparam[field] for field in ("hosts", "macs", "nids")
+                     if bootparam.get(field) }
+    request_kwargs = {"url": BSS_BOOTPARAMS_URL, "add_api_token": True,
+                      "expected_status_codes": 200, "json": request_json}
+    api_requests.delete_retry_validate(**request_kwargs)
+
+
 def update_bootparameters_artifacts(xname_list: List[str], kernel: str, initrd: str,
                                     rootfs: str) -> None:
     """
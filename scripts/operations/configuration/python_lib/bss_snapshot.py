@@ -0,0 +1,213 @@
+#
+# MIT License
+#
+# (C) Copyright 2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""Shared Python function library: BSS bootparameters snapshots"""
+
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+from typing import Dict, List, NamedTuple, Set, Union
+
+from . import bss
+from . import common
+
+# Maximum number of BSS requests made concurrently during a restore
+MAX_CONCURRENT_REQUESTS = 16
+
+# The fields of a bootparameters entry which identify the nodes it applies to
+BOOTPARAMS_ID_FIELDS = ("hosts", "macs", "nids")
+
+# The first bytes of every gzip file
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Mapping from entry key (see entry_key) to bootparameters entry
+BootparametersEntryMap = Dict[str, dict]
+
+
+def entry_key(bootparam: dict) -> str:
+    """
+    Returns a string which identifies the bootparameters entry: its sorted, comma-separated hosts.
+    Entries without hosts are identified by their MACs or, failing that, their NIDs.
+    """
+    for field, prefix in (("hosts", ""), ("macs", "mac:"), ("nids", "nid:")):
+        values = bootparam.get(field)
+        if values:
+            return prefix + ",".join(sorted(str(value) for value in values))
+    raise common.ScriptException(f"BSS bootparameters entry has no hosts, MACs, or NIDs: {bootparam}")
+
+
+def entry_hash(bootparam: dict) -> str:
+    """
+    Returns a hash of the contents of the bootparameters entry, which does not depend on the
+    order of its keys
+    """
+    return hashlib.sha256(
+        json.dumps(bootparam, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class BssSnapshot:
+    """
+    A point-in-time copy of BSS bootparameters, indexed by entry key, with the hash of each
+    entry computed once.
+
+    Snapshot files are gzip-compressed JSON lists of bootparameters entries -- the same format
+    as the output of "cray bss bootparameters list --format json", just compressed. Uncompressed
+    files in that format can also be loaded.
+    """
+
+    def __init__(self, bootparams_list: List[dict]):
+        self.entries: BootparametersEntryMap = {}
+        for bootparam in bootparams_list:
+            key = entry_key(bootparam)
+            if key in self.entries:
+                raise common.ScriptException(f"Multiple BSS bootparameters entries for '{key}'")
+            self.entries[key] = bootparam
+        self.hashes: Dict[str, str] = { key: entry_hash(bootparam)
+                                        for key, bootparam in self.entries.items() }
+
+    # Use a string for the type hint in the case where the type is not yet defined.
+    # https://peps.python.org/pep-0484/#forward-references
+    @classmethod
+    def from_bss(cls) -> "BssSnapshot":
+        """
+        Returns a snapshot of the current BSS bootparameters
+        """
+        logging.info("Reading bootparameters from BSS")
+        return cls(bss.get_bootparameters())
+
+    @classmethod
+    def load(cls, filepath: str) -> "BssSnapshot":
+        """
+        Loads a snapshot from the specified (compressed or uncompressed) file
+        """
+        logging.info("Reading BSS snapshot from '%s'", filepath)
+        try:
+            with open(filepath, "rb") as snapfile:
+                compressed = snapfile.read(len(GZIP_MAGIC)) == GZIP_MAGIC
+            open_function = gzip.open if compressed else open
+            with open_function(filepath, "rt") as snapfile:
+                bootparams_list = json.load(snapfile)
+        except (OSError, ValueError) as exc:
+            raise common.ScriptException(f"Error reading BSS snapshot '{filepath}': {exc}") from exc
+        common.expected_format(bootparams_list, f"BSS snapshot '{filepath}'", list)
+        return cls(bootparams_list)
+
+    def save(self, filepath: str) -> None:
+        """
+        Writes the snapshot to the specified file, compressed
+        """
+        logging.info("Writing BSS snapshot of %d entries to '%s'", len(self.entries), filepath)
+        with gzip.open(filepath, "wt") as snapfile:
+            json.dump(list(self.entries.values()), snapfile)
+
+
+def default_snapshot_filename() -> str:
+    """
+    Returns a timestamped file name for a snapshot
+    """
+    return datetime.datetime.now().strftime("bss-snapshot-%Y%m%d%H%M%S.json.gz")
+
+
+class BssDiff(NamedTuple):
+    """
+    The differences between two BSS snapshots, as lists of entry keys
+    """
+    # Entries only in the new snapshot
+    added: List[str]
+    # Entries only in the old snapshot
+    removed: List[str]
+    # Entries in both snapshots, with different contents
+    changed: List[str]
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+def diff_snapshots(old: BssSnapshot, new: BssSnapshot) -> BssDiff:
+    """
+    Compares the snapshots, using the entry hashes to find changed entries
+    """
+    return BssDiff(added=sorted(new.entries.keys() - old.entries.keys()),
+                   removed=sorted(old.entries.keys() - new.entries.keys()),
+                   changed=sorted(key for key in old.entries.keys() & new.entries.keys()
+                                  if old.hashes[key] != new.hashes[key]))
+
+
+def __ids_in_entries(bootparams_list: List[dict]) -> Dict[str, Set[Union[str, int]]]:
+    """
+    Returns the sets of hosts, MACs, and NIDs of the bootparameters entries
+    """
+    return { field: { value for bootparam in bootparams_list for value in bootparam.get(field) or [] }
+             for field in BOOTPARAMS_ID_FIELDS }
+
+
+def __ids_to_delete(bootparam: dict, ids_to_keep: Dict[str, Set[Union[str, int]]]) -> Union[dict, None]:
+    """
+    Returns the hosts, MACs, and NIDs of the bootparameters entry which are not in ids_to_keep
+    (in the form taken by bss.delete_bootparameters), or None if there are none.
+    """
+    ids_to_delete = {}
+    for field in BOOTPARAMS_ID_FIELDS:
+        values = [ value for value in bootparam.get(field) or [] if value not in ids_to_keep[field] ]
+        if values:
+            ids_to_delete[field] = values
+    return ids_to_delete or None
+
+
+def restore_snapshot(snapshot: BssSnapshot, current: Union[BssSnapshot, None] = None,
+                     delete_added: bool = False, dry_run: bool = False) -> BssDiff:
+    """
+    Restores BSS to match the snapshot, by writing (concurrently) only those entries which were
+    removed or changed since the snapshot was taken. Entries added since the snapshot are deleted
+    only if delete_added is True, and then only their hosts, MACs, and NIDs which are not in the
+    snapshot. If no current snapshot is specified, one is taken from BSS.
+    If dry_run is True, no changes are made.
+    Returns the differences between the current state (old) and the snapshot (new).
+    """
+    if current is None:
+        current = BssSnapshot.from_bss()
+    diff = diff_snapshots(old=current, new=snapshot)
+    # Entries in the snapshot but not in BSS were "added" relative to the current state.
+    to_write = [ snapshot.entries[key] for key in diff.added + diff.changed ]
+    to_delete = []
+    if delete_added and diff.removed:
+        # BSS deletes by host, MAC, and NID. If the entries have been grouped differently since
+        # the snapshot was taken, an entry only in BSS can share some of them with an entry being
+        # restored, so only those which are not in the snapshot are deleted.
+        snapshot_ids = __ids_in_entries(list(snapshot.entries.values()))
+        for key in diff.removed:
+            ids_to_delete = __ids_to_delete(current.entries[key], snapshot_ids)
+            if ids_to_delete is not None:
+                to_delete.append(ids_to_delete)
+    logging.info("BSS restore: %d entries to write, %d to delete, %d entries only in BSS%s",
+                 len(to_write), len(to_delete), len(diff.removed),
+                 " (DRY RUN)" if dry_run else "")
+    if dry_run:
+        return diff
+    common.run_concurrently(bss.put_bootparameters, to_write, MAX_CONCURRENT_REQUESTS)
+    common.run_concurrently(bss.delete_bootparameters, to_delete, MAX_CONCURRENT_REQUESTS)
+    logging.info("BSS restore complete")
+    return diff
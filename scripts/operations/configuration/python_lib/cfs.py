@@ -23,10 +23,13 @@
 #
 """Shared Python function library: CFS"""
 
+import itertools
+import queue
+import threading
 import traceback
 import logging
 
-from typing import Dict, List, Union
+from typing import Dict, Iterator, List, NamedTuple, Union
 
 from . import api_requests
 from . import common
@@ -65,25 +68,132 @@ def log_error_raise_exception(msg: str, parent_exception: Union[Exception, None]
 # CFS component functions
 
 
-def __list_and_merge(object_field_name: str, url: str,
-                     params: Union[JsonDict, None]=None) -> List[JsonObject]:
+# When iterating over a paginated CFS list endpoint, this is the maximum number of pages which
+# are fetched ahead of the caller
+DEFAULT_PAGE_READ_AHEAD = 4
+
+
+# Maximum length of the comma-separated list of component IDs in a single request. Longer lists
+# are split up, to keep request URLs within the limits of the API gateway.
+MAX_IDS_LENGTH = 4096
+
+# Maximum number of requests made concurrently when a request is split up
+MAX_CONCURRENT_REQUESTS = 8
+
+
+class _PageFetchError(NamedTuple):
+    """
+    Passes an exception from the page fetching thread to the iterating thread
+    """
+    error: Exception
+
+
+def __fetch_pages(object_field_name: str, request_kwargs: JsonDict, params: Union[JsonDict, None],
+                  page_queue: "queue.Queue[Union[List[JsonObject], _PageFetchError, None]]",
+                  stop_event: threading.Event) -> None:
     """
-    For paginated CFS list endpoints, this repeatedly queries them until all items
-    are found, then returns the list.
+    Fetches pages from a paginated CFS list endpoint, putting the list of items from each page
+    onto the page queue, followed by None once the last page has been fetched. Each page request
+    needs the 'next' parameters from the previous response, so pages are fetched in order; the
+    bounded queue limits how far ahead of the consumer this gets. If stop_event is set, stops early.
+    """
+    def put(item) -> bool:
+        while not stop_event.is_set():
+            try:
+                page_queue.put(item, timeout=1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    try:
+        if params is None:
+            resp_json = api_requests.get_retry_validate_return_json(**request_kwargs)
+        else:
+            resp_json = api_requests.get_retry_validate_return_json(params=params, **request_kwargs)
+        if not put(resp_json[object_field_name]):
+            return
+        while resp_json["next"] is not None:
+            resp_json = api_requests.get_retry_validate_return_json(params=resp_json["next"],
+                                                                    **request_kwargs)
+            if not put(resp_json[object_field_name]):
+                return
+    except Exception as exc:
+        put(_PageFetchError(error=exc))
+        return
+    put(None)
+
+
+def __iter_list(object_field_name: str, url: str, params: Union[JsonDict, None]=None,
+                read_ahead: int=DEFAULT_PAGE_READ_AHEAD) -> Iterator[JsonObject]:
+    """
+    For paginated CFS list endpoints, yields the items from each page as it arrives.
+    The pages are fetched by a background thread, up to read_ahead pages ahead of the caller,
+    so the caller's processing of one page overlaps with the fetching of the following ones.
     """
     request_kwargs = { "url": url,
                        "add_api_token": True,
                        "expected_status_codes": {200} }
-    if params is None:
-        resp_json = api_requests.get_retry_validate_return_json(**request_kwargs)
-    else:
-        resp_json = api_requests.get_retry_validate_return_json(params=params, **request_kwargs)
-    obj_list = resp_json[object_field_name]
-    while resp_json["next"] is not None:
-        resp_json = api_requests.get_retry_validate_return_json(params=resp_json["next"],
-                                                                **request_kwargs)
-        obj_list.extend(resp_json[object_field_name])
-    return obj_list
+    page_queue = queue.Queue(maxsize=max(read_ahead, 1))
+    stop_event = threading.Event()
+    fetcher = threading.Thread(target=__fetch_pages, name=f"cfs-{object_field_name}-pages", daemon=True,
+                               args=(object_field_name, request_kwargs, params, page_queue, stop_event))
+    fetcher.start()
+    try:
+        while True:
+            page = page_queue.get()
+            if page is None:
+                return
+            if isinstance(page, _PageFetchError):
+                raise page.error
+            yield from page
+    finally:
+        # In case the caller stopped iterating early
+        stop_event.set()
+
+
+def chunk_ids(id_list: Union[List[str], str], max_length: int=MAX_IDS_LENGTH) -> List[str]:
+    """
+    Splits a list of IDs (or a comma-separated string of IDs) into comma-separated strings,
+    each of which is no longer than max_length (unless a single ID is longer than that).
+    Always returns at least one (possibly empty) string.
+    """
+    if isinstance(id_list, str):
+        id_list = id_list.split(",") if id_list else []
+    chunks = []
+    current_chunk = []
+    current_length = 0
+    for comp_id in id_list:
+        # Add 1 for the comma separator
+        if current_chunk and current_length + 1 + len(comp_id) > max_length:
+            chunks.append(",".join(current_chunk))
+            current_chunk = []
+            current_length = 0
+        current_length += len(comp_id) + (1 if current_chunk else 0)
+        current_chunk.append(comp_id)
+    if current_chunk or not chunks:
+        chunks.append(",".join(current_chunk))
+    return chunks
+
+
+def iter_components(id_list: Union[None, List[str], str]=None) -> Iterator[JsonDict]:
+    """
+    Queries CFS for all components (or just those in id_list, if specified), and yields them
+    as the pages of results arrive.
+    Long ID lists are split into chunks (see chunk_ids), which are queried concurrently (see
+    common.run_concurrently).
+    """
+    if id_list is None:
+        return __iter_list("components", CFS_V3_COMPS_URL)
+    id_chunks = chunk_ids(id_list)
+    if len(id_chunks) == 1:
+        return __iter_list("components", CFS_V3_COMPS_URL, params={ "ids": id_chunks[0] })
+    logging.debug("Querying CFS for %d components in %d chunks",
+                  sum(len(ids.split(",")) for ids in id_chunks), len(id_chunks))
+    def list_chunk(ids: str) -> List[JsonDict]:
+        return list(__iter_list("components", CFS_V3_COMPS_URL, params={ "ids": ids }))
+    return itertools.chain.from_iterable(
+        common.run_concurrently(list_chunk, id_chunks, MAX_CONCURRENT_REQUESTS))
 
 
 def list_components(id_list: Union[None, List[str], str]=None) -> List[JsonDict]:
@@ -92,11 +202,7 @@ def list_components(id_list: Union[None, List[str], str]=None) -> List[JsonDict]
     If an id_list is specified, query CFS for just those components.
     Merges paged responses together
     """
-    if id_list is None:
-        params = None
-    else:
-        params = { "ids": id_list if isinstance(id_list, str) else ",".join(id_list) }
-    return __list_and_merge("components", CFS_V3_COMPS_URL, params=params)
+    return list(iter_components(id_list))
 
 
 def update_component(comp_id: str, **update_data: JsonObject) -> JsonObject:
@@ -125,14 +231,26 @@ def update_components_by_ids(comp_ids: List[str], update_data: JsonObject) -> Js
     """
     Perform a bulk component update on the specified component ID list, with the specified
     update data.
-    """
-    # Even though it does not follow convention for patch operations,
-    # the status code when successful is 200
-    request_kwargs = {"url": CFS_V3_COMPS_URL,
-                      "add_api_token": True,
-                      "expected_status_codes": {200},
-                      "json": {"patch": update_data, "filters": {"ids": ",".join(comp_ids)}}}
-    return api_requests.patch_retry_validate_return_json(**request_kwargs)
+    Long ID lists are split into chunks (see chunk_ids), which are updated concurrently (see
+    common.run_concurrently). The response contains the merged list of updated component IDs.
+    """
+    def update_chunk(ids: str) -> JsonObject:
+        # Even though it does not follow convention for patch operations,
+        # the status code when successful is 200
+        request_kwargs = {"url": CFS_V3_COMPS_URL,
+                          "add_api_token": True,
+                          "expected_status_codes": {200},
+                          "json": {"patch": update_data, "filters": {"ids": ids}}}
+        return api_requests.patch_retry_validate_return_json(**request_kwargs)
+
+    id_chunks = chunk_ids(comp_ids)
+    if len(id_chunks) == 1:
+        return update_chunk(id_chunks[0])
+    logging.debug("Updating %d CFS components in %d chunks", len(comp_ids), len(id_chunks))
+    updated_comp_ids = []
+    for resp in common.run_concurrently(update_chunk, id_chunks, MAX_CONCURRENT_REQUESTS):
+        updated_comp_ids.extend(resp["component_ids"])
+    return { "component_ids": updated_comp_ids }
 
 
 # CFS configuration functions
@@ -194,11 +312,18 @@ def delete_configuration(config_name: str, expected_to_exist: bool = True) -> No
     api_requests.delete_retry_validate(**request_kwargs)
 
 
+def iter_configurations() -> Iterator[JsonObject]:
+    """
+    Queries CFS for all configurations, and yields them as the pages of results arrive.
+    """
+    return __iter_list("configurations", CFS_V3_CONFIGS_URL)
+
+
 def list_configurations() -> List[JsonObject]:
     """
     Queries CFS to list all configurations, and returns the list.
     """
-    return __list_and_merge("configurations", CFS_V3_CONFIGS_URL)
+    return list(iter_configurations())
 
 
 # CFS options functions
@@ -305,19 +430,33 @@ def get_session(session_name: str, expected_to_exist: bool = True) -> Union[Json
         log_error_raise_exception("Response from CFS has unexpected format", exc)
     return json_object
 
+def iter_sessions() -> Iterator[JsonObject]:
+    """
+    Queries CFS for all sessions, and yields them as the pages of results arrive.
+    """
+    return __iter_list("sessions", CFS_V3_SESSIONS_URL)
+
+
 def list_sessions() -> List[JsonObject]:
     """
     Queries CFS to list all sessions, and returns the list.
     """
-    return __list_and_merge("sessions", CFS_V3_SESSIONS_URL)
+    return list(iter_sessions())
 
 # CFS sources functions
 
+def iter_sources() -> Iterator[JsonObject]:
+    """
+    Queries CFS for all sources, and yields them as the pages of results arrive.
+    """
+    return __iter_list("sources", CFS_V3_SOURCES_URL)
+
+
 def list_sources() -> List[JsonObject]:
     """
     Queries CFS to list all sources, and returns the list.
     """
-    return __list_and_merge("sources", CFS_V3_SOURCES_URL)
+    return list(iter_sources())
 
 # CFS versions functions
 
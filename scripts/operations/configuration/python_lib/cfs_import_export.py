@@ -23,7 +23,10 @@
 #
 """Shared Python function library: CFS import/export"""
 
-from typing import Callable, List, NamedTuple
+import copy
+import hashlib
+import json
+from typing import Callable, Iterator, List, NamedTuple, Union
 
 from . import cfs
 from . import common
@@ -32,6 +35,12 @@ from .types import JsonDict
 
 _BAD_COMPONENT_MD = 'troubleshooting/known_issues/CFS_Component_With_0_Length_ID.md'
 
+# Configuration fields which are set by CFS and cannot be specified when creating a configuration
+CONFIG_READ_ONLY_FIELDS = ( 'name', 'last_updated' )
+
+# Component fields which make up its desired state, as set by the CFS import
+COMPONENT_DESIRED_STATE_FIELDS = ( 'desired_config', )
+
 
 def remove_components_with_empty_ids(components: List[JsonDict]) -> List[JsonDict]:
     """
@@ -54,6 +63,72 @@ def list_cfs_components() -> List[JsonDict]:
     return remove_components_with_empty_ids(cfs.list_components())
 
 
+def iter_cfs_components() -> Iterator[JsonDict]:
+    """
+    Like list_cfs_components, but yields the components as the pages of results arrive
+    """
+    num_skipped = 0
+    for comp in cfs.iter_components():
+        if comp["id"]:
+            yield comp
+        else:
+            num_skipped += 1
+    if num_skipped > 0:
+        common.print_warn(f"Skipping {num_skipped} component(s) with empty ID field "
+                          f"(see CSM documentation: {_BAD_COMPONENT_MD}")
+
+
+def scrub_layer(layer: JsonDict) -> None:
+    """
+    Check if the layer contains both "branch" and "commit" fields. It is not legal to
+    specify both for a layer when creating a configuration. In these cases, we remove the
+    "commit" field when recreating the layer, as it will be automatically populated by CFS.
+    The alternative (omitting the "branch" field) means that information is lost, since the
+    "branch" field is only present if it is specified when creating the configuration.
+    """
+    if "commit" in layer and "branch" in layer:
+        del layer["commit"]
+
+
+def scrub_configuration(config_data: JsonDict) -> None:
+    """
+    Modify the configuration data (as returned by the CFS API) so that it can be used to
+    create the configuration in CFS.
+    """
+    for layer in config_data["layers"]:
+        scrub_layer(layer)
+    # If an additional inventory layer is present, the same procedure must be done for it
+    if "additional_inventory" in config_data:
+        scrub_layer(config_data["additional_inventory"])
+    for field in CONFIG_READ_ONLY_FIELDS:
+        config_data.pop(field, None)
+
+
+def content_hash(data: JsonDict) -> str:
+    """
+    Returns a hash of the JSON data which does not depend on the order of dictionary keys
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+def configuration_content_hash(config_data: JsonDict) -> str:
+    """
+    Returns a hash of the content of a CFS configuration -- that is, of the fields that would be
+    used to create it. Two configurations with the same hash would be created identically.
+    The configuration data is not modified.
+    """
+    config_content = copy.deepcopy(config_data)
+    scrub_configuration(config_content)
+    return content_hash(config_content)
+
+
+def component_desired_state_hash(comp_data: JsonDict) -> str:
+    """
+    Returns a hash of the desired state of a CFS component (see COMPONENT_DESIRED_STATE_FIELDS)
+    """
+    return content_hash({ field: comp_data.get(field) for field in COMPONENT_DESIRED_STATE_FIELDS })
+
+
 class CfsResourceTypeData(NamedTuple):
     """
     Data needed for import/export work for a given CFS resource type
@@ -61,19 +136,26 @@ class CfsResourceTypeData(NamedTuple):
     """
     list_function: Callable
     json_file_name: str
+    # For resource types which are lists, a function which yields the resources
+    # as they are received from CFS
+    iter_function: Union[Callable[[], Iterator[JsonDict]], None] = None
 
 
 CFS_RESOURCE_TYPES = {
     "components":     CfsResourceTypeData(list_function=list_cfs_components,
-                                          json_file_name="components.json"),
+                                          json_file_name="components.json",
+                                          iter_function=iter_cfs_components),
     "configurations": CfsResourceTypeData(list_function=cfs.list_configurations,
-                                          json_file_name="configurations.json"),
+                                          json_file_name="configurations.json",
+                                          iter_function=cfs.iter_configurations),
     "options":        CfsResourceTypeData(list_function=cfs.list_options,
                                           json_file_name="options.json"),
     "sessions":       CfsResourceTypeData(list_function=cfs.list_sessions,
-                                          json_file_name="sessions.json"),
+                                          json_file_name="sessions.json",
+                                          iter_function=cfs.iter_sessions),
     "sources":        CfsResourceTypeData(list_function=cfs.list_sources,
-                                          json_file_name="sources.json"),
+                                          json_file_name="sources.json",
+                                          iter_function=cfs.iter_sources),
     "versions":       CfsResourceTypeData(list_function=cfs.list_versions,
                                           json_file_name="versions.json")
 }
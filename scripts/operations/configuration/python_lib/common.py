@@ -23,19 +23,24 @@
 #
 """Shared Python function library: basic functions"""
 
+import concurrent.futures
 import logging
 import os
 import shutil
 import subprocess
 import sys
+import threading
 import time
 import traceback
 
 from contextlib import contextmanager
-from typing import Any, List, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Union
 
 WAIT_SECONDS_BETWEEN_COMMAND_RETRIES=2
 
+# Records whether the current thread is a run_concurrently or iter_concurrently worker
+concurrent_worker_data = threading.local()
+
 class ScriptException(Exception):
     """
     Generic script exception class
@@ -211,16 +216,22 @@ def validate_file_readable(filepath: str) -> None:
     if not os.access(filepath, os.R_OK):
         raise ScriptException(f"File exists but is not readable: '{filepath}'")
 
-def run_command(command: List[str], num_retries: int=0, timeout: Union[int, None]=None) -> bytes:
+def run_command(command: List[str], num_retries: int=0, timeout: Union[int, None]=None,
+                env: Union[Dict[str, str], None]=None) -> bytes:
     """
     Runs the specified command and returns the output.
     If num_retries is non-0, if the command fails, it will be retried up to the
     specified number of times.
+    If env is specified, the command is run with those environment variables set (in addition
+    to the current environment).
     """
+    if env is not None:
+        env = { **os.environ, **env }
     while True:
         logging.debug(command)
         try:
-            cmd_result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
+            cmd_result = subprocess.run(command, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout,
+                                        env=env)
             logging.debug("stdout: %s", cmd_result.stdout)
             logging.debug("stderr: %s", cmd_result.stderr)
             return cmd_result.stdout
@@ -239,3 +250,71 @@ def run_command(command: List[str], num_retries: int=0, timeout: Union[int, None
         logging.debug("Retrying command after %d seconds (%d retries remaining)", WAIT_SECONDS_BETWEEN_COMMAND_RETRIES, num_retries)
         time.sleep(WAIT_SECONDS_BETWEEN_COMMAND_RETRIES)
         num_retries-=1
+
+
+def run_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int) -> List[Any]:
+    """
+    Calls func on each of the items, using up to max_workers threads, and returns a list of the
+    results, in the same order as the items. If any of the calls raise an exception, the first
+    such exception (in item order) is raised after all of the calls have finished.
+
+    If this is called from within one of the threads of another run_concurrently call, the calls
+    are made one at a time in the current thread. Otherwise, nested calls would multiply the
+    number of concurrent requests well beyond either of their limits.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if getattr(concurrent_worker_data, "active", False):
+        results = []
+        first_exception = None
+        for item in items:
+            try:
+                results.append(func(item))
+            except Exception as exc:
+                results.append(None)
+                if first_exception is None:
+                    first_exception = exc
+        if first_exception is not None:
+            raise first_exception
+        return results
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [ executor.submit(__concurrent_worker, func, item) for item in items ]
+    return [ future.result() for future in futures ]
+
+
+def iter_concurrently(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int) -> Iterator[Any]:
+    """
+    Calls func on each of the items, using up to max_workers threads, and yields the results in
+    the order in which the calls complete, as soon as each one does. If a call raises an exception,
+    it is raised in place of its result, once the calls which have already started have finished.
+
+    As with run_concurrently, if this is called from within one of the threads of a run_concurrently
+    or iter_concurrently call, the calls are made (and their results yielded) one at a time in the
+    current thread.
+    """
+    items = list(items)
+    if not items:
+        return
+    if getattr(concurrent_worker_data, "active", False):
+        for item in items:
+            yield func(item)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [ executor.submit(__concurrent_worker, func, item) for item in items ]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def __concurrent_worker(func: Callable[[Any], Any], item: Any) -> Any:
+    """
+    Calls func on the item in a run_concurrently or iter_concurrently thread, marking the thread
+    as a worker while it does
+    """
+    concurrent_worker_data.active = True
+    try:
+        return func(item)
+    finally:
+        concurrent_worker_data.active = False
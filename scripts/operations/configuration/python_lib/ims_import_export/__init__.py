@@ -29,3 +29,5 @@ from .exported_data import ExportedData
 from .import_options import ImportOptions
 from .ims_export import do_export, estimate_export_size
 from .ims_import import IMPORT_FUNCTIONS, ImsPodImportToolPath, expand_tarfile, get_ims_pod_name
+from .s3_helper import configure_transfer_throttle
+from .s3_transfer_progress import DEFAULT_REPORT_INTERVAL_SECONDS, configure_transfer_progress
@@ -75,6 +75,8 @@ from .s3_helper import S3TransferRequest, create_s3_artifacts
 # ims.deleted field may map to None, for cases where deleted IMS objects not backed up
 # product_catalog field may map to None or be absent, for cases where its S3 links were not backed up
 # s3 field may map to None, for cases where only IMS data is backed up
+# Multiple S3 artifacts with identical contents may have the same relpath (the file is only exported once,
+# and on import it is uploaded to each of the S3 artifacts which refer to it)
 #
 # bos, bss, and product_catalog fields are only populated if the s3 field is also populated
 
@@ -23,6 +23,7 @@
 #
 """Shared Python function library: IMS import/export"""
 
+import hashlib
 import json
 import logging
 import os
@@ -140,7 +141,8 @@ class S3Data(NamedTuple):
 
         # For all other links, download them and describe them
         for s3_url, relpath in download_s3_artifacts(options.outdir,
-                                                     options.undownloaded_s3_urls).items():
+                                                     options.undownloaded_s3_urls,
+                                                     s3_buckets=options.s3_buckets).items():
             describe = s3.describe_artifact(s3_url, num_retries=3, timeout=90)
             options.s3_artifacts[s3_url] = { "relpath": relpath, "describe": describe }
 
@@ -176,9 +178,11 @@ class S3Data(NamedTuple):
     @property
     def downloaded_artifact_relpaths(self) -> List[str]:
         """
-        Return the relative paths to all downloaded S3 artifacts
+        Return the relative paths to all downloaded S3 artifacts.
+        Artifacts with identical contents share a single downloaded file, so each path
+        is only listed once.
         """
-        return [artifact_data["relpath"] for artifact_data in self.artifacts.values()]
+        return list(dict.fromkeys(artifact_data["relpath"] for artifact_data in self.artifacts.values()))
 
 
     def downloaded_artifact_relpath(self, s3_url: s3.S3Url) -> str:
@@ -259,6 +263,7 @@ def estimate_required_space(all_s3_urls: S3UrlSet, undownloaded_s3_urls: S3UrlSe
                             base_size_in_bytes: int, s3_buckets: S3BucketListings,
                             create_tarfile: bool) -> Tuple[int, int]:
     largest_size, overall_size, additional_size = [ base_size_in_bytes ] * 3
+    seen_content_ids = set()
     for s3_link in all_s3_urls:
         try:
             artifact_size = s3_buckets[s3_link.bucket].get_artifact_size(s3_link)
@@ -266,6 +271,13 @@ def estimate_required_space(all_s3_urls: S3UrlSet, undownloaded_s3_urls: S3UrlSe
             msg = f"Artifact key {s3_link.key} not found in listing of S3 bucket {s3_link.bucket}"
             logging.error(msg)
             raise common.ScriptException(msg) from exc
+        if s3_link in undownloaded_s3_urls:
+            # Artifacts with identical contents will only be downloaded once
+            content_id = artifact_content_id(s3_buckets, s3_link)
+            if content_id is not None:
+                if content_id in seen_content_ids:
+                    continue
+                seen_content_ids.add(content_id)
         largest_size = max(artifact_size, largest_size)
         overall_size += artifact_size
         if s3_link in undownloaded_s3_urls:
@@ -311,23 +323,110 @@ def generate_artifact_local_path(outdir: str, s3_url: s3.S3Url) -> Tuple[str, st
     return artifact_file_path, os.path.join(artifact_subdir, artifact_basename)
 
 
-def download_s3_artifacts(outdir: str, s3_urls: Iterable[s3.S3Url]) -> Dict[s3.S3Url, str]:
+ArtifactContentId = Tuple[str, int]
+
+def artifact_content_id(s3_buckets: S3BucketListings, s3_url: s3.S3Url) -> Union[ArtifactContentId, None]:
+    """
+    Returns the (ETag, size) of the artifact from the S3 bucket listings. Artifacts with the same
+    ETag and size have the same contents. Returns None if this cannot be determined.
+    """
+    try:
+        artifact = s3_buckets[s3_url.bucket].get_artifact(s3_url)
+    except (KeyError, S3ArtifactNotFound):
+        return None
+    etag = artifact.get("ETag")
+    if not etag:
+        return None
+    return etag, artifact["Size"]
+
+
+def file_sha256(filepath: str) -> str:
+    """
+    Returns the SHA-256 hex digest of the contents of the specified file
+    """
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as dfile:
+        for chunk in iter(lambda: dfile.read(1024*1024), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def dedupe_downloaded_files(outdir: str, s3_urls: Iterable[s3.S3Url],
+                            url_relpath_map: Dict[s3.S3Url, str]) -> None:
+    """
+    For the specified downloaded artifacts, compare the content hashes of their files. For any
+    files with identical contents, delete all but one of them and update url_relpath_map so
+    that all of the associated S3 URLs refer to the remaining file.
+    """
+    relpaths_by_hash = {}
+    for s3_url in s3_urls:
+        relpath = url_relpath_map[s3_url]
+        filepath = os.path.join(outdir, relpath)
+        content_hash = (os.path.getsize(filepath), file_sha256(filepath))
+        try:
+            existing_relpath = relpaths_by_hash[content_hash]
+        except KeyError:
+            relpaths_by_hash[content_hash] = relpath
+            continue
+        logging.debug("%s has the same contents as '%s'; removing duplicate file '%s'", s3_url,
+                      existing_relpath, relpath)
+        os.remove(filepath)
+        url_relpath_map[s3_url] = existing_relpath
+
+
+def download_s3_artifacts(outdir: str, s3_urls: Iterable[s3.S3Url],
+                          s3_buckets: Union[S3BucketListings, None] = None) -> Dict[s3.S3Url, str]:
     """
     Downloads the specified S3 URLs to a subdirectory of the specified artifact directory.
-    Returns a mapping from each S3 URL to the relative path of the downloaded artifact in outdir
+    Returns a mapping from each S3 URL to the relative path of the downloaded artifact in outdir.
+
+    If S3 bucket listings are specified, the artifact sizes are taken from them (for progress reporting),
+    and artifacts with identical contents (based on their ETags and sizes) are only downloaded once. In
+    that case, all of their S3 URLs are mapped to the same relative path. Artifacts whose ETags are
+    not known are compared by content hash after being downloaded.
     """
     s3_download_requests = []
     url_relpath_map = {}
+    # Mapping from content IDs to the first S3 URL found with that content ID
+    content_id_urls = {}
+    unidentified_s3_urls = []
+    num_duplicates, duplicate_bytes = 0, 0
     for s3_url in s3_urls:
+        if s3_buckets is not None:
+            content_id = artifact_content_id(s3_buckets, s3_url)
+            if content_id is None:
+                unidentified_s3_urls.append(s3_url)
+            elif content_id in content_id_urls:
+                logging.debug("%s has the same contents as %s; it will not be downloaded again",
+                              s3_url, content_id_urls[content_id])
+                url_relpath_map[s3_url] = url_relpath_map[content_id_urls[content_id]]
+                num_duplicates += 1
+                duplicate_bytes += content_id[1]
+                continue
+            else:
+                content_id_urls[content_id] = s3_url
         artifact_file_path, artifact_file_relpath = generate_artifact_local_path(outdir, s3_url)
         url_relpath_map[s3_url] = artifact_file_relpath
         logging.debug("Add %s to list of required S3 downloads", s3_url)
-        s3_download_requests.append(S3TransferRequest(url=s3_url, filepath=artifact_file_path))
-
+        size_bytes = None
+        if s3_buckets is not None:
+            try:
+                size_bytes = s3_buckets[s3_url.bucket].get_artifact_size(s3_url)
+            except (KeyError, S3ArtifactNotFound):
+                # It will be looked up before the download starts
+                pass
+        s3_download_requests.append(S3TransferRequest(url=s3_url, filepath=artifact_file_path,
+                                                      size_bytes=size_bytes))
+
+    if num_duplicates:
+        logging.info("Skipping download of %d artifacts (%s) whose contents duplicate other artifacts",
+                     num_duplicates, common.sizeof_fmt(duplicate_bytes))
     if s3_download_requests:
         logging.info("Starting parallel S3 downloads for %d artifacts", len(s3_download_requests))
         parallel_download_s3_artifacts(s3_download_requests)
         logging.info("Parallel S3 download complete")
     else:
         logging.debug("Nothing to download from S3")
+    if len(unidentified_s3_urls) > 1:
+        dedupe_downloaded_files(outdir, unidentified_s3_urls, url_relpath_map)
     return url_relpath_map
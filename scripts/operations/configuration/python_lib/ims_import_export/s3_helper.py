@@ -24,26 +24,40 @@
 """Shared Python function library: Parallelize S3 transfers"""
 
 import logging
+import os
 import queue
 import threading
-from typing import Callable, Iterable, List, NamedTuple, Union
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Union
 
-from python_lib.s3 import S3Url, create_artifact, get_artifact
+import botocore.exceptions
+
+from python_lib import common
+from python_lib.throttle import TransferLimits, TransferThrottle
+from python_lib.s3 import S3Client, S3Url
 from python_lib.types import JsonDict
 
 from .exceptions import ImsImportExportError
+from .s3_transfer_progress import ObjectTransferProgress, S3TransferProgress
 
 DEFAULT_NUM_UPLOAD_WORKERS=12
 
 # Downloads to the USB drive do not appear to benefit from parallel downloads
 DEFAULT_NUM_DOWNLOAD_WORKERS=1
 
+DOWNLOAD_NUM_RETRIES=3
+
+UPLOAD_NUM_RETRIES=5
+
 class S3TransferRequest(NamedTuple):
     """
-    A request that can be used to specify an upload or download to be performed
+    A request that can be used to specify an upload or download to be performed.
+    If size_bytes is not specified, it is looked up before the transfer begins
+    (it is only used for progress reporting).
     """
     url: S3Url
     filepath: str
+    size_bytes: Union[int, None] = None
 
 class S3TransferError(NamedTuple):
     """
@@ -54,7 +68,7 @@ class S3TransferError(NamedTuple):
 
 class S3TransferResult(NamedTuple):
     """
-    For uploads, the response field will be a JsonDict.
+    For uploads, the response field will be the S3 description (JsonDict) of the new artifact.
     No data is returned from S3 on successful downloads, so
     in that case, the field will be None.
     """
@@ -62,17 +76,96 @@ class S3TransferResult(NamedTuple):
     response: Union[JsonDict, None]
 
 
-def do_s3_upload(transfer_request: S3TransferRequest) -> JsonDict:
-    logging.info("Starting S3 upload of %s", transfer_request.url)
-    return create_artifact(transfer_request.url, transfer_request.filepath, num_retries=5, timeout=1800)
+# Limits shared by all S3 transfer workers (unlimited unless configure_transfer_throttle is called)
+transfer_throttle = TransferThrottle()
+
+def configure_transfer_throttle(max_bytes_per_second: Union[int, None] = None,
+                                max_requests_per_second: Union[float, None] = None,
+                                limits_file: Union[str, None] = None) -> None:
+    """
+    Sets the bandwidth and request rate limits applied across all S3 transfer workers.
+    If a limits file is specified, the limits are reloaded from it whenever it changes, so that
+    they can be adjusted while transfers are running (see TransferLimits.load_from_file for its format).
+    """
+    global transfer_throttle
+    transfer_throttle = TransferThrottle(limits=TransferLimits(max_bytes_per_second=max_bytes_per_second,
+                                                               max_requests_per_second=max_requests_per_second),
+                                         limits_file=limits_file)
+
+
+# Each worker thread uses its own boto3 S3 client
+thread_local_data = threading.local()
+
+def get_thread_s3_client(refresh: bool = False) -> S3Client:
+    """
+    Returns the S3 client for the current thread, creating it if needed (or if refresh is True)
+    """
+    if refresh or getattr(thread_local_data, "s3_client", None) is None:
+        thread_local_data.s3_client = S3Client()
+    return thread_local_data.s3_client
+
+
+def do_s3_transfer_with_retries(transfer_request: S3TransferRequest, progress: ObjectTransferProgress,
+                                transfer: Callable[[S3Client, Callable[[int], None]], Union[JsonDict, None]],
+                                description: str, num_retries: int) -> Union[JsonDict, None]:
+    """
+    Calls the transfer function with the thread's boto3 S3 client and a callback which reports
+    progress and applies the bandwidth limit as each chunk of data is transferred. Failed
+    transfers are retried with a new client.
+    """
+    def callback(num_bytes: int) -> None:
+        transfer_throttle.throttle_bytes(num_bytes)
+        progress.add_bytes(num_bytes)
+
+    logging.info("Starting S3 %s of %s", description, transfer_request.url)
+    s3_client = get_thread_s3_client()
+    while True:
+        transfer_throttle.throttle_request()
+        try:
+            return transfer(s3_client, callback)
+        except (botocore.exceptions.BotoCoreError, botocore.exceptions.ClientError) as exc:
+            logging.warning("Error with S3 %s of %s: %s", description, transfer_request.url, exc)
+            if num_retries == 0:
+                raise
+        progress.reset()
+        logging.debug("Retrying %s after %d seconds (%d retries remaining)", description,
+                      common.WAIT_SECONDS_BETWEEN_COMMAND_RETRIES, num_retries)
+        time.sleep(common.WAIT_SECONDS_BETWEEN_COMMAND_RETRIES)
+        num_retries-=1
+        # The failure may have been caused by expired credentials, so get a new client
+        s3_client = get_thread_s3_client(refresh=True)
+
+
+def do_s3_upload(transfer_request: S3TransferRequest, progress: ObjectTransferProgress) -> JsonDict:
+    """
+    Uploads are done using boto3, so that progress is reported (and throttling is applied)
+    as the data is sent.
+    """
+    s3_url = transfer_request.url
+    return do_s3_transfer_with_retries(
+        transfer_request, progress,
+        lambda s3_client, callback: s3_client.upload_artifact(s3_url.bucket, s3_url.key,
+                                                              transfer_request.filepath,
+                                                              callback=callback),
+        "upload", UPLOAD_NUM_RETRIES)
 
 
-def do_s3_download(transfer_request: S3TransferRequest) -> None:
-    logging.info("Starting S3 download of %s", transfer_request.url)
-    get_artifact(transfer_request.url, transfer_request.filepath, num_retries=3, timeout=1800)
+def do_s3_download(transfer_request: S3TransferRequest, progress: ObjectTransferProgress) -> None:
+    """
+    Downloads are done using boto3, so that progress is reported (and throttling is applied)
+    as the data arrives.
+    """
+    s3_url = transfer_request.url
+    do_s3_transfer_with_retries(
+        transfer_request, progress,
+        lambda s3_client, callback: s3_client.download_artifact(s3_url.bucket, s3_url.key,
+                                                                transfer_request.filepath,
+                                                                callback=callback),
+        "download", DOWNLOAD_NUM_RETRIES)
 
 
 def s3_transfer_worker(do_transfer: Callable,
+                       progress: S3TransferProgress,
                        work_queue: "queue.Queue[S3TransferRequest]",
                        result_queue: "queue.Queue[S3TransferResult]",
                        error_queue: "queue.Queue[S3TransferError]") -> None:
@@ -81,18 +174,22 @@ def s3_transfer_worker(do_transfer: Callable,
     pop an item off the work_queue, call the transfer function on it, and put
     the result into the result_queue. If there is an error, put it in the error_queue.
     """
+    worker_name = threading.current_thread().name
     # Abort if anyone has hit a problem
     while error_queue.empty():
         try:
             transfer_request = work_queue.get_nowait()
         except queue.Empty:
             return
+        object_progress = progress.object_started(worker_name, transfer_request.url)
         try:
-            response = do_transfer(transfer_request)
+            response = do_transfer(transfer_request, object_progress)
         except Exception as exc:
+            progress.object_finished(object_progress, success=False)
             logging.exception("Error with S3 transfer of %s", transfer_request)
             error_queue.put_nowait(S3TransferError(request=transfer_request, error=exc))
             return
+        progress.object_finished(object_progress, success=True)
         logging.debug("Putting result of %s upload onto result_queue", transfer_request)
         try:
             result_queue.put_nowait(S3TransferResult(request=transfer_request, response=response))
@@ -102,9 +199,34 @@ def s3_transfer_worker(do_transfer: Callable,
             return
 
 
+def upload_sizes(s3_transfer_requests: Iterable[S3TransferRequest]) -> Dict[S3Url, int]:
+    """
+    Returns a map from the S3 URL of each upload request to the size of the file to be uploaded
+    """
+    return { request.url: request.size_bytes if request.size_bytes is not None
+                          else os.path.getsize(request.filepath)
+             for request in s3_transfer_requests }
+
+
+def download_sizes(s3_transfer_requests: Iterable[S3TransferRequest]) -> Dict[S3Url, int]:
+    """
+    Returns a map from the S3 URL of each download request to the size of the artifact to be
+    downloaded. Sizes which were not specified in the requests are looked up in S3.
+    """
+    sizes = {}
+    for request in s3_transfer_requests:
+        if request.size_bytes is not None:
+            sizes[request.url] = request.size_bytes
+            continue
+        logging.debug("Looking up size of %s", request.url)
+        sizes[request.url] = get_thread_s3_client().artifact_size(request.url.bucket, request.url.key)
+    return sizes
+
+
 def transfer_s3_artifacts(s3_transfer_requests: Iterable[S3TransferRequest],
                           do_transfer: Callable,
-                          num_workers: int) -> List[S3TransferResult]:
+                          num_workers: int,
+                          progress: S3TransferProgress) -> List[S3TransferResult]:
     work_queue = queue.Queue()
     error_queue = queue.Queue()
     result_queue = queue.Queue()
@@ -115,15 +237,18 @@ def transfer_s3_artifacts(s3_transfer_requests: Iterable[S3TransferRequest],
                       len(s3_transfer_requests), num_workers, len(s3_transfer_requests))
         num_workers = len(s3_transfer_requests)
     logging.debug("Creating %d worker threads to perform S3 transfers", num_workers)
-    worker_kwargs = { "do_transfer": do_transfer, "error_queue": error_queue, "result_queue": result_queue, "work_queue": work_queue }
-    workers = [ threading.Thread(target=s3_transfer_worker, kwargs=worker_kwargs) for _ in range(num_workers) ]
-    logging.debug("Starting worker threads")
-    for worker in workers:
-        worker.start()
-    logging.debug("Waiting for all worker threads to complete")
-    for worker in workers:
-        worker.join()
-    logging.debug("All worker threads joined")
+    worker_kwargs = { "do_transfer": do_transfer, "error_queue": error_queue, "result_queue": result_queue,
+                      "work_queue": work_queue, "progress": progress }
+    workers = [ threading.Thread(target=s3_transfer_worker, kwargs=worker_kwargs, name=f"worker{i}")
+                for i in range(num_workers) ]
+    with progress:
+        logging.debug("Starting worker threads")
+        for worker in workers:
+            worker.start()
+        logging.debug("Waiting for all worker threads to complete")
+        for worker in workers:
+            worker.join()
+        logging.debug("All worker threads joined")
     if not error_queue.empty():
         raise ImsImportExportError("At least one error happened during S3 transfer")
     s3_transfer_results = []
@@ -143,7 +268,9 @@ def create_s3_artifacts(s3_upload_requests: Iterable[S3TransferRequest],
     if not num_workers:
         num_workers = DEFAULT_NUM_UPLOAD_WORKERS
         logging.debug("Defaulting to %d worker threads", num_workers)
-    return transfer_s3_artifacts(s3_transfer_requests=s3_upload_requests, do_transfer=do_s3_upload, num_workers=num_workers)
+    progress = S3TransferProgress(description="S3 upload", sizes=upload_sizes(s3_upload_requests))
+    return transfer_s3_artifacts(s3_transfer_requests=s3_upload_requests, do_transfer=do_s3_upload,
+                                 num_workers=num_workers, progress=progress)
 
 
 def download_s3_artifacts(s3_download_requests: Iterable[S3TransferRequest],
@@ -155,4 +282,6 @@ def download_s3_artifacts(s3_download_requests: Iterable[S3TransferRequest],
     if not num_workers:
         num_workers = DEFAULT_NUM_DOWNLOAD_WORKERS
         logging.debug("Defaulting to %d worker threads", num_workers)
-    transfer_s3_artifacts(s3_transfer_requests=s3_download_requests, do_transfer=do_s3_download, num_workers=num_workers)
+    progress = S3TransferProgress(description="S3 download", sizes=download_sizes(s3_download_requests))
+    transfer_s3_artifacts(s3_transfer_requests=s3_download_requests, do_transfer=do_s3_download,
+                          num_workers=num_workers, progress=progress)
@@ -0,0 +1,307 @@
+#
+# MIT License
+#
+# (C) Copyright 2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""Shared Python function library: Progress reporting for parallel S3 transfers"""
+
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Union
+
+from python_lib import common
+from python_lib.s3 import S3Url
+from python_lib.types import JsonDict
+
+DEFAULT_REPORT_INTERVAL_SECONDS=15
+
+
+class TransferProgressSettings:
+    """
+    Process-wide settings for S3 transfer progress reporting. The scripts set these once
+    at startup; the transfer functions read them each time a parallel transfer is started.
+    """
+    report_interval_seconds: float = DEFAULT_REPORT_INTERVAL_SECONDS
+    summary_dir: Union[str, None] = None
+
+
+def configure_transfer_progress(report_interval_seconds: Union[float, None] = None,
+                                summary_dir: Union[str, None] = None) -> None:
+    """
+    Sets how often progress of parallel S3 transfers is logged, and the directory into which
+    a JSON summary is written at the end of each parallel transfer (if None, the summary is only
+    written to the log).
+    """
+    if report_interval_seconds is not None:
+        if report_interval_seconds <= 0:
+            raise common.ScriptException(
+                f"Progress report interval must be positive, not {report_interval_seconds}")
+        TransferProgressSettings.report_interval_seconds = report_interval_seconds
+    TransferProgressSettings.summary_dir = summary_dir
+
+
+def mb_per_sec(num_bytes: int, seconds: float) -> float:
+    """
+    Returns the transfer rate in megabytes per second
+    """
+    if seconds <= 0:
+        return 0.0
+    return num_bytes / seconds / (1024*1024)
+
+
+def format_eta(seconds: Union[float, None]) -> str:
+    """
+    Returns the estimated time remaining as an H:MM:SS string, or "unknown"
+    """
+    if seconds is None:
+        return "unknown"
+    return str(datetime.timedelta(seconds=int(seconds)))
+
+
+class ObjectTransferProgress:
+    """
+    Tracks the bytes transferred for a single S3 object by a single worker.
+    Its add_bytes method is suitable for use as a boto3 transfer callback.
+    """
+
+    def __init__(self, overall: "S3TransferProgress", worker_name: str, url: S3Url, size_bytes: int):
+        self.__overall = overall
+        self.worker_name = worker_name
+        self.url = url
+        self.size_bytes = size_bytes
+        self.bytes_counted = 0
+        self.start_time = time.monotonic()
+
+    def add_bytes(self, num_bytes: int) -> None:
+        """
+        Record that the specified number of additional bytes have been transferred for this object
+        """
+        self.__overall.add_bytes(self, num_bytes)
+
+    def reset(self) -> None:
+        """
+        Called when a transfer attempt fails and will be retried. Any bytes counted for the failed
+        attempt are removed from the totals.
+        """
+        self.__overall.reset_object(self)
+
+
+class WorkerStats:
+    """
+    Cumulative statistics for one transfer worker thread
+    """
+
+    def __init__(self):
+        self.bytes_transferred = 0
+        self.objects_completed = 0
+        self.busy_seconds = 0.0
+
+    def jsondict(self, in_flight_seconds: float = 0.0) -> JsonDict:
+        """
+        Return a JSON dict representation of this object
+        """
+        busy_seconds = self.busy_seconds + in_flight_seconds
+        return { "bytes_transferred": self.bytes_transferred,
+                 "objects_completed": self.objects_completed,
+                 "busy_seconds": round(busy_seconds, 3),
+                 "mb_per_second": round(mb_per_sec(self.bytes_transferred, busy_seconds), 3) }
+
+
+class S3TransferProgress:
+    """
+    Aggregates the progress of all workers in a parallel S3 transfer, periodically logs it
+    (at most once per report interval), and produces a summary when the transfer is done.
+
+    Uploads and downloads both report bytes as they are transferred. Any bytes of an object which
+    were not reported along the way are credited when it completes.
+    """
+
+    def __init__(self, description: str, sizes: Dict[S3Url, int],
+                 report_interval_seconds: Union[float, None] = None):
+        self.description = description
+        self.total_bytes = sum(sizes.values())
+        self.total_objects = len(sizes)
+        if report_interval_seconds is None:
+            report_interval_seconds = TransferProgressSettings.report_interval_seconds
+        self.report_interval_seconds = report_interval_seconds
+        self.bytes_transferred = 0
+        self.objects_completed = 0
+        self.objects_failed = 0
+        self.retries = 0
+        self.__sizes = sizes
+        self.__lock = threading.Lock()
+        self.__in_flight: Dict[S3Url, ObjectTransferProgress] = {}
+        self.__workers: Dict[str, WorkerStats] = {}
+        self.__started = datetime.datetime.now()
+        self.__start_time = time.monotonic()
+        self.__end_time: Union[float, None] = None
+        self.__stop_event = threading.Event()
+        self.__reporter = threading.Thread(target=self.__report_loop, name="s3-progress-reporter",
+                                           daemon=True)
+
+    def __enter__(self) -> "S3TransferProgress":
+        self.__reporter.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb) -> None:
+        self.__end_time = time.monotonic()
+        self.__stop_event.set()
+        self.__reporter.join()
+        self.report()
+        self.write_summary()
+
+    def __report_loop(self) -> None:
+        while not self.__stop_event.wait(self.report_interval_seconds):
+            self.report()
+
+    @property
+    def elapsed_seconds(self) -> float:
+        end_time = self.__end_time if self.__end_time is not None else time.monotonic()
+        return end_time - self.__start_time
+
+    def object_started(self, worker_name: str, url: S3Url) -> ObjectTransferProgress:
+        """
+        Record that the specified worker has begun transferring the specified object, and return
+        the ObjectTransferProgress used to track it
+        """
+        obj = ObjectTransferProgress(overall=self, worker_name=worker_name, url=url,
+                                     size_bytes=self.__sizes.get(url, 0))
+        with self.__lock:
+            self.__workers.setdefault(worker_name, WorkerStats())
+            self.__in_flight[url] = obj
+        return obj
+
+    def add_bytes(self, obj: ObjectTransferProgress, num_bytes: int) -> None:
+        """
+        Record additional bytes transferred for the specified object
+        """
+        with self.__lock:
+            obj.bytes_counted += num_bytes
+            self.bytes_transferred += num_bytes
+            self.__workers[obj.worker_name].bytes_transferred += num_bytes
+
+    def reset_object(self, obj: ObjectTransferProgress) -> None:
+        """
+        Remove the bytes counted so far for the specified object, because its transfer is being retried
+        """
+        with self.__lock:
+            self.bytes_transferred -= obj.bytes_counted
+            self.__workers[obj.worker_name].bytes_transferred -= obj.bytes_counted
+            obj.bytes_counted = 0
+            self.retries += 1
+
+    def object_finished(self, obj: ObjectTransferProgress, success: bool) -> None:
+        """
+        Record that the transfer of the specified object has ended. If it succeeded, any bytes
+        of the object which were not reported along the way are credited now.
+        """
+        with self.__lock:
+            self.__in_flight.pop(obj.url, None)
+            worker = self.__workers[obj.worker_name]
+            worker.busy_seconds += time.monotonic() - obj.start_time
+            if not success:
+                self.objects_failed += 1
+                return
+            uncounted = obj.size_bytes - obj.bytes_counted
+            if uncounted > 0:
+                obj.bytes_counted += uncounted
+                self.bytes_transferred += uncounted
+                worker.bytes_transferred += uncounted
+            worker.objects_completed += 1
+            self.objects_completed += 1
+
+    def eta_seconds(self) -> Union[float, None]:
+        """
+        Returns the estimated number of seconds until the transfer is complete, based on the overall
+        transfer rate so far. Returns None if no estimate can be made yet.
+        """
+        elapsed = self.elapsed_seconds
+        if self.bytes_transferred <= 0 or elapsed <= 0:
+            return None
+        remaining = max(self.total_bytes - self.bytes_transferred, 0)
+        return remaining / (self.bytes_transferred / elapsed)
+
+    def report(self) -> None:
+        """
+        Log the current aggregate progress of the transfer, and the rate of each worker
+        """
+        with self.__lock:
+            pct = 100.0 * self.bytes_transferred / self.total_bytes if self.total_bytes else 100.0
+            logging.info("%s: %s of %s (%.1f%%), %d of %d objects done, %d in flight, "
+                         "%.2f MB/s overall, ETA %s", self.description,
+                         common.sizeof_fmt(self.bytes_transferred), common.sizeof_fmt(self.total_bytes),
+                         pct, self.objects_completed, self.total_objects, len(self.__in_flight),
+                         mb_per_sec(self.bytes_transferred, self.elapsed_seconds),
+                         format_eta(self.eta_seconds()))
+            worker_rates = self.__worker_jsondicts()
+        if len(worker_rates) > 1:
+            logging.info("%s: per-worker MB/s: %s", self.description,
+                         ", ".join(f"{name}={stats['mb_per_second']:.2f}"
+                                   for name, stats in sorted(worker_rates.items())))
+
+    def __worker_jsondicts(self) -> Dict[str, JsonDict]:
+        """
+        Must be called with the lock held
+        """
+        now = time.monotonic()
+        in_flight_seconds = { obj.worker_name: now - obj.start_time for obj in self.__in_flight.values() }
+        return { name: stats.jsondict(in_flight_seconds.get(name, 0.0))
+                 for name, stats in self.__workers.items() }
+
+    @property
+    def summary(self) -> JsonDict:
+        """
+        Return a JSON dict summarizing the transfer
+        """
+        with self.__lock:
+            elapsed = self.elapsed_seconds
+            return { "description": self.description,
+                     "started": self.__started.strftime("%Y%m%d%H%M%S.%f"),
+                     "elapsed_seconds": round(elapsed, 3),
+                     "total_bytes": self.total_bytes,
+                     "bytes_transferred": self.bytes_transferred,
+                     "total_objects": self.total_objects,
+                     "objects_completed": self.objects_completed,
+                     "objects_failed": self.objects_failed,
+                     "objects_in_flight": [ str(url) for url in self.__in_flight ],
+                     "retries": self.retries,
+                     "mb_per_second": round(mb_per_sec(self.bytes_transferred, elapsed), 3),
+                     "workers": self.__worker_jsondicts() }
+
+    def write_summary(self) -> None:
+        """
+        Write the transfer summary to a JSON file in the configured summary directory.
+        If no directory is configured, it is only recorded in the log.
+        """
+        summary = self.summary
+        logging.debug("%s summary: %s", self.description, summary)
+        if TransferProgressSettings.summary_dir is None:
+            return
+        slug = "-".join(self.description.lower().split())
+        summary_file = os.path.join(TransferProgressSettings.summary_dir,
+                                    f"{slug}-{summary['started']}.json")
+        logging.info("Writing %s summary to '%s'", self.description, summary_file)
+        with open(summary_file, "wt") as sfile:
+            json.dump(summary, sfile, indent=2)
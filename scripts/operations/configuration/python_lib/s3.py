@@ -26,7 +26,7 @@
 import datetime
 import json
 import logging
-from typing import Dict, List, Set
+from typing import Callable, Dict, List, Set, Union
 from urllib.parse import urlparse
 import warnings
 
@@ -98,7 +98,8 @@ class S3Client:
         logging.debug("Getting boto3 S3 client")
         with warnings.catch_warnings():
             warnings.filterwarnings('ignore', category=boto3.compat.PythonDeprecationWarning)
-            self.s3_cli = boto3.client('s3', **client_kwargs)
+            # Each client gets its own session, because boto3 sessions are not thread safe
+            self.s3_cli = boto3.session.Session().client('s3', **client_kwargs)
 
 
     def list_artifacts(self, bucket_name: str) -> list:
@@ -154,6 +155,36 @@ class S3Client:
         return True
 
 
+    def artifact_size(self, bucket_name: str, key: str) -> int:
+        """
+        Returns the size in bytes of the specified artifact
+        """
+        return self.s3_cli.head_object(Bucket=bucket_name, Key=key)["ContentLength"]
+
+
+    def download_artifact(self, bucket_name: str, key: str, target_path: str,
+                          callback: Union[Callable[[int], None], None] = None) -> None:
+        """
+        Downloads the specified artifact to the specified path.
+        If a callback is specified, it is periodically called with the number of bytes
+        downloaded since the previous call.
+        """
+        logging.debug("Downloading s3://%s/%s to '%s'", bucket_name, key, target_path)
+        self.s3_cli.download_file(Bucket=bucket_name, Key=key, Filename=target_path, Callback=callback)
+
+
+    def upload_artifact(self, bucket_name: str, key: str, source_path: str,
+                        callback: Union[Callable[[int], None], None] = None) -> JsonDict:
+        """
+        Uploads the specified file to the specified artifact, and returns the S3 description
+        of the new artifact. If a callback is specified, it is periodically called with the number
+        of bytes uploaded since the previous call.
+        """
+        logging.debug("Uploading '%s' to s3://%s/%s", source_path, bucket_name, key)
+        self.s3_cli.upload_file(Filename=source_path, Bucket=bucket_name, Key=key, Callback=callback)
+        return self.s3_cli.head_object(Bucket=bucket_name, Key=key)
+
+
 def create_artifact(s3_url: S3Url, source_path: str, **run_command_kwargs) -> JsonDict:
     """
     Uploads the specified S3 artifact from the specified path
@@ -0,0 +1,251 @@
+#
+# MIT License
+#
+# (C) Copyright 2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""Shared Python function library: transfer rate limiting"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import NamedTuple, Union
+
+from . import common
+
+# Multipliers for the suffixes accepted by parse_bandwidth
+BANDWIDTH_SUFFIXES = { "": 1, "K": 1024, "M": 1024**2, "G": 1024**3 }
+
+# How often (at most) the limits file is checked for changes
+LIMITS_FILE_CHECK_INTERVAL_SECONDS=5
+
+
+def parse_bandwidth(bandwidth_string: str) -> int:
+    """
+    Parses a bandwidth string into a number of bytes per second. The string is a positive
+    number, optionally followed by K, M, or G (powers of 1024), and optionally followed by B/s.
+    For example: 500000, 800K, 50M, 1.5G, 50MB/s
+    Raises a ScriptException if the string is not valid.
+    """
+    value = bandwidth_string.strip().upper()
+    if value.endswith("B/S"):
+        value = value[:-3]
+    suffix = value[-1:] if value[-1:] in BANDWIDTH_SUFFIXES else ""
+    if suffix:
+        value = value[:-1]
+    try:
+        bytes_per_second = int(float(value) * BANDWIDTH_SUFFIXES[suffix])
+    except ValueError as exc:
+        raise common.ScriptException(f"Invalid bandwidth: '{bandwidth_string}'") from exc
+    if bytes_per_second <= 0:
+        raise common.ScriptException(f"Bandwidth must be positive: '{bandwidth_string}'")
+    return bytes_per_second
+
+
+class TransferLimits(NamedTuple):
+    """
+    Limits to apply to transfers. None means unlimited.
+    """
+    max_bytes_per_second: Union[int, None] = None
+    max_requests_per_second: Union[float, None] = None
+
+    # Use a string for the type hint in the case where the type is not yet defined.
+    # https://peps.python.org/pep-0484/#forward-references
+    @classmethod
+    def load_from_file(cls, filepath: str,
+                       defaults: Union["TransferLimits", None] = None) -> "TransferLimits":
+        """
+        Reads the limits from a JSON file with the following (optional) fields:
+        {
+          "max_bandwidth": <bandwidth string, as accepted by parse_bandwidth>,
+          "max_requests_per_second": <positive number>
+        }
+        A null field means unlimited. An absent field keeps its value from defaults, if specified
+        (otherwise it also means unlimited).
+        """
+        with open(filepath, "rt") as limits_file:
+            limits_json = json.load(limits_file)
+        common.expected_format(limits_json, f"Transfer limits file '{filepath}'", dict)
+        if defaults is None:
+            defaults = cls()
+        max_bandwidth = limits_json.get("max_bandwidth")
+        max_rps = limits_json.get("max_requests_per_second", defaults.max_requests_per_second)
+        if max_rps is not None and (isinstance(max_rps, bool) or not isinstance(max_rps, (int, float))):
+            raise common.ScriptException(
+                f"max_requests_per_second must be a number in transfer limits file '{filepath}'")
+        if max_rps is not None and max_rps <= 0:
+            raise common.ScriptException(
+                f"max_requests_per_second must be positive in transfer limits file '{filepath}'")
+        if "max_bandwidth" not in limits_json:
+            max_bytes_per_second = defaults.max_bytes_per_second
+        elif max_bandwidth is None:
+            max_bytes_per_second = None
+        else:
+            max_bytes_per_second = parse_bandwidth(str(max_bandwidth))
+        return cls(max_bytes_per_second=max_bytes_per_second, max_requests_per_second=max_rps)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens are added at the specified rate, up to the bucket capacity
+    (one second's worth of tokens). Consuming more tokens than are available puts the bucket into
+    debt, and the caller sleeps until the debt would be repaid; later callers queue up behind it.
+    A rate of None means unlimited. The rate may be changed at any time.
+    """
+
+    def __init__(self, rate: Union[float, None] = None):
+        self.__lock = threading.Lock()
+        self.__rate = rate
+        self.__tokens = 0.0 if rate is None else float(rate)
+        self.__last_refill = time.monotonic()
+
+    @property
+    def rate(self) -> Union[float, None]:
+        return self.__rate
+
+    def set_rate(self, rate: Union[float, None]) -> None:
+        """
+        Change the rate at which tokens are added to the bucket
+        """
+        with self.__lock:
+            self.__refill()
+            self.__rate = rate
+            if rate is None:
+                self.__tokens = 0.0
+            else:
+                self.__tokens = min(self.__tokens, float(rate))
+
+    def __refill(self) -> None:
+        """
+        Must be called with the lock held
+        """
+        now = time.monotonic()
+        if self.__rate is not None:
+            self.__tokens = min(self.__tokens + (now - self.__last_refill) * self.__rate,
+                                float(self.__rate))
+        self.__last_refill = now
+
+    def consume(self, num_tokens: float) -> None:
+        """
+        Take the specified number of tokens from the bucket, sleeping as long as needed
+        to stay within the rate
+        """
+        with self.__lock:
+            if self.__rate is None:
+                return
+            self.__refill()
+            self.__tokens -= num_tokens
+            if self.__tokens >= 0:
+                return
+            wait_seconds = -self.__tokens / self.__rate
+        time.sleep(wait_seconds)
+
+
+class TransferThrottle:
+    """
+    Applies bandwidth and request rate limits across all of the threads that share it.
+
+    If a limits file is specified, then whenever it is found to have been modified, the limits
+    are reloaded from it. This allows the limits to be changed while transfers are running.
+    Limits which are not in the file keep the values they were given when the throttle was created.
+    """
+
+    def __init__(self, limits: Union[TransferLimits, None] = None,
+                 limits_file: Union[str, None] = None):
+        self.__limits = TransferLimits() if limits is None else limits
+        # The limits the file is applied over
+        self.__initial_limits = self.__limits
+        self.__bytes_bucket = TokenBucket(self.__limits.max_bytes_per_second)
+        self.__requests_bucket = TokenBucket(self.__limits.max_requests_per_second)
+        self.__limits_file = limits_file
+        self.__limits_file_mtime = None
+        self.__next_limits_file_check = 0.0
+        self.__lock = threading.Lock()
+        if limits_file is not None:
+            self.check_limits_file()
+
+    @property
+    def limits(self) -> TransferLimits:
+        return self.__limits
+
+    @property
+    def limits_file(self) -> Union[str, None]:
+        return self.__limits_file
+
+    def set_limits(self, limits: TransferLimits) -> None:
+        """
+        Change the limits being applied
+        """
+        if limits == self.__limits:
+            return
+        logging.info("Transfer limits: bandwidth=%s, requests per second=%s",
+                     "unlimited" if limits.max_bytes_per_second is None
+                     else f"{common.sizeof_fmt(limits.max_bytes_per_second)}/s",
+                     "unlimited" if limits.max_requests_per_second is None
+                     else limits.max_requests_per_second)
+        self.__limits = limits
+        self.__bytes_bucket.set_rate(limits.max_bytes_per_second)
+        self.__requests_bucket.set_rate(limits.max_requests_per_second)
+
+    def check_limits_file(self) -> None:
+        """
+        If there is a limits file and it has been modified since it was last read, reload the limits
+        from it. If the file cannot be read or is not valid, a warning is logged and the current limits
+        remain in effect.
+        """
+        if self.__limits_file is None:
+            return
+        with self.__lock:
+            now = time.monotonic()
+            if now < self.__next_limits_file_check:
+                return
+            self.__next_limits_file_check = now + LIMITS_FILE_CHECK_INTERVAL_SECONDS
+            try:
+                mtime = os.path.getmtime(self.__limits_file)
+            except OSError:
+                # Not existing is fine -- the current limits remain in effect
+                return
+            if mtime == self.__limits_file_mtime:
+                return
+            self.__limits_file_mtime = mtime
+            logging.debug("Loading transfer limits from '%s'", self.__limits_file)
+            try:
+                limits = TransferLimits.load_from_file(self.__limits_file, defaults=self.__initial_limits)
+            except (OSError, ValueError, common.ScriptException) as exc:
+                logging.warning("Ignoring invalid transfer limits file '%s': %s", self.__limits_file, exc)
+                return
+            self.set_limits(limits)
+
+    def throttle_bytes(self, num_bytes: int) -> None:
+        """
+        Called with the number of bytes about to be (or just) transferred. Sleeps as needed to
+        stay within the bandwidth limit.
+        """
+        self.check_limits_file()
+        self.__bytes_bucket.consume(num_bytes)
+
+    def throttle_request(self) -> None:
+        """
+        Called before making a request. Sleeps as needed to stay within the request rate limit.
+        """
+        self.check_limits_file()
+        self.__requests_bucket.consume(1)
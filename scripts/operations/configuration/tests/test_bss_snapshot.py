@@ -0,0 +1,92 @@
+#
+# MIT License
+#
+# (C) Copyright 2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""Shared Python function library: BSS bootparameters snapshots"""
+"""
+Tests of python_lib.bss_snapshot
+
+Run from scripts/operations/configuration with: python3 -m unittest discover tests
+"""
+
+import unittest
+from typing import Dict
+from unittest import mock
+
+from python_lib import bss_snapshot
+from python_lib.bss_snapshot import BssSnapshot
+
+
+class FakeBss:
+    """
+    Bootparameters per host, updated the way BSS updates them: a PUT sets the bootparameters of
+    every host in the entry, and a DELETE removes them for every host in the request.
+    """
+
+    def __init__(self, snapshot: BssSnapshot):
+        self.params_by_host: Dict[str, str] = {}
+        for bootparam in snapshot.entries.values():
+            self.put_bootparameters(bootparam)
+
+    def put_bootparameters(self, bootparam: dict) -> None:
+        for host in bootparam["hosts"]:
+            self.params_by_host[host] = bootparam["params"]
+
+    def delete_bootparameters(self, bootparam: dict) -> None:
+        for host in bootparam.get("hosts", []):
+            self.params_by_host.pop(host, None)
+
+
+class RestoreSnapshotTest(unittest.TestCase):
+
+    def restore(self, snapshot: BssSnapshot, current: BssSnapshot) -> FakeBss:
+        fake_bss = FakeBss(current)
+        with mock.patch.object(bss_snapshot.bss, "put_bootparameters", fake_bss.put_bootparameters), \
+             mock.patch.object(bss_snapshot.bss, "delete_bootparameters", fake_bss.delete_bootparameters):
+            bss_snapshot.restore_snapshot(snapshot, current=current, delete_added=True)
+        return fake_bss
+
+    def test_regrouped_entry_is_restored(self):
+        """
+        x1 and x2 shared an entry in the snapshot, and were split into separate entries since.
+        Deleting the added x1 entry must not delete the restored bootparameters of x1.
+        """
+        snapshot = BssSnapshot([ {"hosts": ["x1", "x2"], "params": "old"},
+                                 {"hosts": ["x3"], "params": "old"} ])
+        current = BssSnapshot([ {"hosts": ["x1"], "params": "new"},
+                                {"hosts": ["x2", "x4"], "params": "new"},
+                                {"hosts": ["x3"], "params": "old"} ])
+
+        fake_bss = self.restore(snapshot, current)
+        self.assertEqual(fake_bss.params_by_host, {"x1": "old", "x2": "old", "x3": "old"})
+
+    def test_added_entry_is_deleted(self):
+        snapshot = BssSnapshot([ {"hosts": ["x1"], "params": "old"} ])
+        current = BssSnapshot([ {"hosts": ["x1"], "params": "new"},
+                                {"hosts": ["x2"], "params": "new"} ])
+
+        fake_bss = self.restore(snapshot, current)
+        self.assertEqual(fake_bss.params_by_host, {"x1": "old"})
+
+
+if __name__ == "__main__":
+    unittest.main()
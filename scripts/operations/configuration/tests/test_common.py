@@ -0,0 +1,65 @@
+#
+# MIT License
+#
+# (C) Copyright 2022-2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""Shared Python function library: basic functions"""
+"""
+Tests of the concurrency helpers in python_lib.common
+
+Run from scripts/operations/configuration with: python3 -m unittest discover tests
+"""
+
+import threading
+import unittest
+
+from python_lib import common
+
+
+class IterConcurrentlyTest(unittest.TestCase):
+
+    def test_results_are_yielded_as_they_complete(self):
+        """
+        The first result must be yielded while the other call is still running
+        """
+        release = threading.Event()
+
+        def func(item: str) -> str:
+            if item == "slow":
+                self.assertTrue(release.wait(timeout=10))
+            return item
+
+        results = common.iter_concurrently(func, ["slow", "fast"], 2)
+        self.assertEqual(next(results), "fast")
+        release.set()
+        self.assertEqual(list(results), ["slow"])
+
+    def test_nested_calls_run_in_the_worker_thread(self):
+        def func(item: int) -> list:
+            return [ threading.get_ident() == outer_thread
+                     for outer_thread in common.iter_concurrently(
+                         lambda _: threading.get_ident(), [item, item], 2) ]
+
+        self.assertEqual(common.run_concurrently(func, [1, 2], 2), [[True, True], [True, True]])
+
+
+if __name__ == "__main__":
+    unittest.main()
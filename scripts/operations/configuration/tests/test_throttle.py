@@ -0,0 +1,73 @@
+#
+# MIT License
+#
+# (C) Copyright 2024 Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+#
+"""Shared Python function library: transfer rate limiting"""
+"""
+Tests of python_lib.throttle
+
+Run from scripts/operations/configuration with: python3 -m unittest discover tests
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from python_lib import common
+from python_lib.throttle import TransferLimits, TransferThrottle
+
+
+class LimitsFileTest(unittest.TestCase):
+
+    def setUp(self):
+        limits_fd, self.limits_file = tempfile.mkstemp(suffix=".json")
+        os.close(limits_fd)
+        self.addCleanup(os.remove, self.limits_file)
+
+    def write_limits_file(self, limits_json) -> None:
+        with open(self.limits_file, "wt") as limits_file:
+            json.dump(limits_json, limits_file)
+
+    def test_file_fields_are_merged_over_initial_limits(self):
+        self.write_limits_file({"max_bandwidth": "1K"})
+        throttle = TransferThrottle(limits=TransferLimits(max_bytes_per_second=5,
+                                                          max_requests_per_second=3),
+                                    limits_file=self.limits_file)
+        self.assertEqual(throttle.limits, TransferLimits(max_bytes_per_second=1024,
+                                                         max_requests_per_second=3))
+
+    def test_null_field_means_unlimited(self):
+        self.write_limits_file({"max_requests_per_second": None})
+        limits = TransferLimits.load_from_file(
+            self.limits_file, defaults=TransferLimits(max_bytes_per_second=5, max_requests_per_second=3))
+        self.assertEqual(limits, TransferLimits(max_bytes_per_second=5, max_requests_per_second=None))
+
+    def test_invalid_rate(self):
+        for rate in ["5", True, [1], 0]:
+            self.write_limits_file({"max_requests_per_second": rate})
+            with self.assertRaises(common.ScriptException):
+                TransferLimits.load_from_file(self.limits_file)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -45,6 +45,7 @@ from sls_utils.Managers import NetworkManager
 from sls_utils.Networks import Subnet as SLSSubnet
 from sls_utils.Reservations import Reservation as IPReservation
 from sls_utils import ipam
+from sls_utils.diff import describe_changes, diff_networks, snapshot_networks, updated_network_names
 
 # Global variables for service URLs. These get set in main.
 BSS_URL = None
@@ -649,6 +650,7 @@ class State:
         # System information
         self.global_bootparameters = None
         self.sls_networks = None
+        self.sls_networks_original = None
 
         self.use_existing_ip_addresses = None
         self.log_directory = log_directory
@@ -1054,9 +1056,22 @@ class State:
                     }
                 )
 
+        # Only PUT the networks whose SLS data actually changed
+        changes = diff_networks(
+            {network_name: self.sls_networks_original[network_name] for network_name in self.ncn_ips},
+            {network_name: self.sls_networks[network_name] for network_name in self.ncn_ips},
+        )
+        for line in describe_changes(changes):
+            print(f"    {line}")
+
+        for network_name in self.ncn_ips:
+            if network_name not in changes.get("changed", {}):
+                print(f"No changes to the {network_name} network, skipping SLS update")
+
+        for network_name in updated_network_names(changes):
             print(f"Updating {network_name} network in SLS with updated IP reservations")
             if self.perform_changes:
-                action = http_put(session, f'{SLS_URL}/networks/{network_name}', payload=sls_network.to_sls())
+                action = http_put(session, f'{SLS_URL}/networks/{network_name}', payload=self.sls_networks[network_name].to_sls())
                 if action["error"] is not None:
                     action_log(action, f'Error failed to update {network_name} in SLS')
                     print_action(action)
@@ -1166,6 +1181,7 @@ def allocate_ips_command(session: requests.Session, args, state: State):
     validate_sls = False
     action, sls_networks = get_sls_networks(session, validate=validate_sls)
     state.sls_networks = sls_networks
+    state.sls_networks_original = snapshot_networks(sls_networks)
 
     #
     # Determine NCN IPs
@@ -1501,6 +1517,7 @@ def ncn_data_command(session: requests.Session, args, state: State):
     validate_sls = False
     action, sls_networks = get_sls_networks(session, validate=validate_sls)
     state.sls_networks = sls_networks
+    state.sls_networks_original = snapshot_networks(sls_networks)
 
     #
     # Determine NCN IPs
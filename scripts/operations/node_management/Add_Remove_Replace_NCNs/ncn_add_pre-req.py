@@ -440,13 +440,21 @@ def add_ncn_network_update(add_ncn_count, network_list, api_header, sls_networks
     for network in networks_data:
         network_update = []
         network_update.append(networks_data[network])
+        network_has_changes = False
         for i in range(len(network_update[0]['ExtraProperties']['Subnets'])):
             if 'Bootstrap' in network_update[0]['ExtraProperties']['Subnets'][i]['FullName']:
                 log.info('Checking for boot strap network')
                 log.info(f"Network: {network_update[0]['Name']} dhcp_start: {network_update[0]['ExtraProperties']['Subnets'][i]['DHCPStart']}")
+                if network_update[0]['ExtraProperties']['Subnets'][i]['DHCPStart'] != new_ip_dhcp_pool_start[network]:
+                    network_has_changes = True
                 network_update[0]['ExtraProperties']['Subnets'][i]['DHCPStart'] = new_ip_dhcp_pool_start[network]
                 log.info(f"Network: {network_update[0]['Name']} dhcp_end: {network_update[0]['ExtraProperties']['Subnets'][i]['DHCPStart']}")
 
+        if not network_has_changes:
+            # Only PUT the networks whose DHCP pool actually moved
+            log.info(f'No changes to the {network} network, skipping SLS update')
+            continue
+
         # update sls data
         # place holder print out
         log.info(f"sls_network_update = put_api_request('/apis/sls/v1/networks/' + {network}, {api_header}, {json.dumps(network_update[0])}")
@@ -21,17 +21,68 @@
 # OTHER DEALINGS IN THE SOFTWARE.
 """Classes for management of SLS Networks and Subnets."""
 from collections import defaultdict
+import copy
 import ipaddress
 
+from .radix import Watched
 from .Reservations import Reservation
 
+
+def _sls_equal(sls_data, other_sls_data):
+    """Whether two SLS data structures are equal and are written out the same way.
+
+    Unlike ==, values of different types are never equal, so that 1 and 1.0 or True differ.
+
+    Args:
+        sls_data: SLS data structure
+        other_sls_data: SLS data structure to compare it to
+
+    Returns:
+        equal (bool): True if the SLS data structures are the same
+    """
+    if sls_data is other_sls_data:
+        return True
+    if type(sls_data) is not type(other_sls_data):
+        return False
+    if isinstance(sls_data, dict):
+        return sls_data.keys() == other_sls_data.keys() and all(
+            _sls_equal(value, other_sls_data[key]) for key, value in sls_data.items()
+        )
+    if isinstance(sls_data, list):
+        return len(sls_data) == len(other_sls_data) and all(
+            map(_sls_equal, sls_data, other_sls_data),
+        )
+    return sls_data == other_sls_data
+
 # A Subnet is a Network inside a Network CIDR range.
 # A Subnet has IP reservations, a network does not
 # https://mypy.readthedocs.io/en/stable/cheat_sheet_py3.html
 
 
-class Network:
-    """Represent a Network from and SLS data structure."""
+class Network(Watched):
+    """Represent a Network from and SLS data structure.
+
+    Networks loaded from SLS data keep that data: their Subnets are only parsed when first
+    needed, and to_sls() returns the original data for as long as it is exactly what the
+    Network serializes to.  Anything else in it, such as LastUpdated fields or a stale VlanRange,
+    is not kept.
+
+    Indexes watching a Network (see sls_utils.Managers) are told it may have changed when its
+    address is set and whenever its Subnets are got through subnets(), since they may be changed
+    through the returned dict.
+    """
+
+    __slots__ = (
+        "_name",
+        "_full_name",
+        "_ipv4_address",
+        "_sls_data",
+        "__type",
+        "__mtu",
+        "__subnets",
+        "__sls_subnets",
+        "__bgp_asns",
+    )
 
     def __init__(self, name, network_type, ipv4_address):
         """Create a Network.
@@ -48,8 +99,11 @@ class Network:
         self.__type = network_type
         self.__mtu = None
         self.__subnets = defaultdict()
+        self.__sls_subnets = None  # Unparsed SLS Subnets, if __subnets is None
         self.__bgp_asns = [None, None]  # [MyASN, PeerASN]
 
+        self._sls_data = None  # SLS data the object was loaded from, until it is changed
+
     @classmethod
     def network_from_sls_data(cls, sls_data):
         """Construct Network and any data-associated Subnets from SLS data.
@@ -61,44 +115,77 @@ class Network:
             cls: Network object constructed from the SLS data structure
         """
         # "Promote" any ExtraProperties in Networks to ease initialization.
-        if sls_data.get("ExtraProperties"):
-            for key, value in sls_data["ExtraProperties"].items():
-                sls_data[key] = value
-            del sls_data["ExtraProperties"]
+        # The SLS data itself is left as it is, so that to_sls() can return it.
+        properties = dict(sls_data)
+        properties.update(properties.pop("ExtraProperties", None) or {})
 
         # Cover specialty network(s)
-        if sls_data.get("Name") == "BICAN":
+        if properties.get("Name") == "BICAN":
             sls_network = BicanNetwork(
-                default_route_network_name=sls_data.get("SystemDefaultRoute", "CMN"),
+                default_route_network_name=properties.get("SystemDefaultRoute", "CMN"),
             )
         else:
             # Cover regular networks
             sls_network = cls(
-                name=sls_data.get("Name"),
-                network_type=sls_data.get("Type"),
-                ipv4_address=sls_data.get("CIDR"),
+                name=properties.get("Name"),
+                network_type=properties.get("Type"),
+                ipv4_address=properties.get("CIDR"),
             )
 
-        sls_network.full_name(sls_data.get("FullName"))
+        sls_network.full_name(properties.get("FullName"))
 
         # Check that the CIDR is in the IPRange, if IPRange exists.
-        ipv4_range = sls_data.get("IPRanges")
+        ipv4_range = properties.get("IPRanges")
         if ipv4_range and len(ipv4_range) > 0:
             temp_address = ipaddress.IPv4Interface(ipv4_range[0])
             if temp_address != sls_network.ipv4_address():
                 print(f"WARNING: CIDR not in IPRanges from input {sls_network.name()}.")
 
-        sls_network.mtu(sls_data.get("MTU"))
-
-        subnets = sls_data.get("Subnets", defaultdict())
-        for subnet in subnets:
-            new_subnet = Subnet.subnet_from_sls_data(subnet)
-            sls_network.subnets().update({new_subnet.name(): new_subnet})
+        sls_network.mtu(properties.get("MTU"))
+        sls_network.bgp(properties.get("MyASN", None), properties.get("PeerASN"))
 
-        sls_network.bgp(sls_data.get("MyASN", None), sls_data.get("PeerASN"))
+        # Subnets are parsed on first access
+        sls_network.__subnets = None
+        sls_network.__sls_subnets = list(properties.get("Subnets") or [])
+        sls_network._sls_data = sls_data
 
         return sls_network
 
+    def copy(self):
+        """Copy the Network without an SLS round trip.
+
+        Addresses are immutable and shared rather than re-parsed.  Subnets and Reservations which
+        have not been parsed yet stay unparsed, sharing the original SLS data until first accessed.
+        Parsed ones are copied, so changing the copy never changes the original.
+
+        Returns:
+            copy (sls_utils.Network): A copy of the Network, of the same class
+        """
+        new_network = self.__class__.__new__(self.__class__)
+        self._copy_into(new_network)
+        return new_network
+
+    def _copy_into(self, new_network):
+        """Set the attributes of a new, uninitialized object to copies of those of this one.
+
+        Args:
+            new_network (sls_utils.Network): Object created with __new__ to copy into
+        """
+        new_network._name = self._name
+        new_network._full_name = self._full_name
+        new_network._ipv4_address = self._ipv4_address
+        new_network._sls_data = self._sls_data
+        new_network.__type = self.__type
+        new_network.__mtu = self.__mtu
+        new_network.__bgp_asns = list(self.__bgp_asns)
+        new_network.__sls_subnets = self.__sls_subnets
+        if self.__subnets is None:
+            new_network.__subnets = None
+        else:
+            new_network.__subnets = defaultdict()
+            for subnet_name, subnet in self.__subnets.items():
+                new_network.__subnets[subnet_name] = subnet.copy()
+
     def name(self, network_name=None):
         """Short name of the network.
 
@@ -110,6 +197,7 @@ class Network:
         """
         if network_name is not None:
             self._name = network_name
+            self._sls_data = None
         return self._name
 
     def full_name(self, network_name=None):
@@ -123,6 +211,7 @@ class Network:
         """
         if network_name is not None:
             self._full_name = network_name
+            self._sls_data = None
         return self._full_name
 
     def ipv4_address(self, network_address=None):
@@ -136,6 +225,8 @@ class Network:
         """
         if network_address is not None:
             self._ipv4_address = ipaddress.IPv4Interface(network_address)
+            self._sls_data = None
+            self._changed()
         return self._ipv4_address
 
     def ipv4_network(self):
@@ -157,6 +248,7 @@ class Network:
         """
         if network_mtu is not None:
             self.__mtu = network_mtu
+            self._sls_data = None
         return self.__mtu
 
     def type(self, network_type=None):
@@ -170,6 +262,7 @@ class Network:
         """
         if network_type is not None:
             self.__type = network_type
+            self._sls_data = None
         return self.__type
 
     def subnets(self, network_subnets=None):
@@ -183,6 +276,28 @@ class Network:
         """
         if network_subnets is not None:
             self.__subnets = network_subnets
+            self.__sls_subnets = None
+            self._sls_data = None
+        # The subnets may be changed through the returned dict
+        self._changed()
+        return self._parsed_subnets()
+
+    def _parsed_subnets(self):
+        """Return the subnets, parsing them if they were not parsed yet, for reading only.
+
+        Unlike subnets(), this does not tell indexes that the subnets may have changed.  Subnets
+        parsed here are watched by the indexes watching the Network.
+
+        Returns:
+            subnets: A dict of subnets in the network
+        """
+        if self.__subnets is None:
+            self.__subnets = defaultdict()
+            for sls_subnet in self.__sls_subnets:
+                new_subnet = Subnet.subnet_from_sls_data(sls_subnet)
+                new_subnet.watch_like(self)
+                self.__subnets.update({new_subnet.name(): new_subnet})
+            self.__sls_subnets = None
         return self.__subnets
 
     def bgp(self, my_bgp_asn=None, peer_bgp_asn=None):
@@ -197,20 +312,38 @@ class Network:
         """
         if my_bgp_asn is not None:
             self.__bgp_asns[0] = my_bgp_asn
+            self._sls_data = None
         if peer_bgp_asn is not None:
             self.__bgp_asns[1] = peer_bgp_asn
+            self._sls_data = None
         return self.__bgp_asns
 
     def to_sls(self):
         """Serialize the Network to SLS Networks format.
 
+        The SLS data the Network was loaded from is returned if it is exactly the same as the
+        serialized Network, which also covers changes made through the dicts and lists returned
+        by the getters.
+
+        Returns:
+            sls: SLS data structure for the network
+        """
+        sls = self._build_sls()
+        if self._sls_data is not None and _sls_equal(self._sls_data, sls):
+            return self._sls_data
+        self._sls_data = None
+        return sls
+
+    def _build_sls(self):
+        """Build the SLS data structure of the Network from its attributes.
+
         Returns:
             sls: SLS data structure for the network
         """
-        subnets = [x.to_sls() for x in self.__subnets.values()]
+        subnets = [x.to_sls() for x in self._parsed_subnets().values()]
+        vlans_list = list(dict.fromkeys([x.vlan() for x in self._parsed_subnets().values()]))
         # TODO:  Is the VlanRange a list of used or a min/max?
         # x vlans = [min(vlans_list), max(vlans_list)]
-        vlans_list = list(dict.fromkeys([x.vlan() for x in self.__subnets.values()]))
         vlans = vlans_list
         sls = {
             "Name": self._name,
@@ -235,6 +368,8 @@ class Network:
 class BicanNetwork(Network):
     """A customized BICAN Network."""
 
+    __slots__ = ("__system_default_route",)
+
     def __init__(self, default_route_network_name="CMN"):
         """Create a new BICAN network.
 
@@ -250,6 +385,15 @@ class BicanNetwork(Network):
         self.__system_default_route = default_route_network_name
         self.mtu(network_mtu=9000)
 
+    def _copy_into(self, new_network):
+        """Set the attributes of a new, uninitialized object to copies of those of this one.
+
+        Args:
+            new_network (sls_utils.BicanNetwork): Object created with __new__ to copy into
+        """
+        super()._copy_into(new_network)
+        new_network.__system_default_route = self.__system_default_route
+
     def system_default_route(self, default_route_network_name):
         """Retrieve or set the default route network name.
 
@@ -261,21 +405,39 @@ class BicanNetwork(Network):
         """
         if default_route_network_name in ["CMN", "CAN", "CHN"]:
             self.__system_default_route = default_route_network_name
+            self._sls_data = None
         return self.__system_default_route
 
-    def to_sls(self):
-        """Serialize the Network to SLS Networks format.
+    def _build_sls(self):
+        """Build the SLS data structure of the BICAN Network from its attributes.
 
         Returns:
             sls: BICAN SLS Network structure
         """
-        sls = super().to_sls()
+        sls = super()._build_sls()
         sls["ExtraProperties"]["SystemDefaultRoute"] = self.__system_default_route
         return sls
 
 
 class Subnet(Network):
-    """Subnets are Networks with extra metadata: DHCP info, IP reservations, etc..."""
+    """Subnets are Networks with extra metadata: DHCP info, IP reservations, etc...
+
+    Subnets loaded from SLS data parse their Reservations on first access, and to_sls() returns
+    the original data for as long as it is exactly what the Subnet serializes to.  Indexes watching
+    a Subnet are told it may have changed whenever its Reservations are got through reservations().
+    """
+
+    __slots__ = (
+        "__ipv4_gateway",
+        "__vlan",
+        "__ipv4_dhcp_start_address",
+        "__ipv4_dhcp_end_address",
+        "__ipv4_reservation_start_address",
+        "__ipv4_reservation_end_address",
+        "__pool_name",
+        "__reservations",
+        "__sls_reservations",
+    )
 
     def __init__(self, name, ipv4_address, ipv4_gateway, vlan):
         """Create a new Subnet.
@@ -295,6 +457,7 @@ class Subnet(Network):
         self.__ipv4_reservation_end_address = None
         self.__pool_name = None
         self.__reservations = {}
+        self.__sls_reservations = None  # Unparsed SLS IPReservations, if __reservations is None
 
     @classmethod
     def subnet_from_sls_data(cls, sls_data):
@@ -350,21 +513,35 @@ class Subnet(Network):
         if pool_name is not None:
             sls_subnet.metallb_pool_name(pool_name)
 
-        reservations = sls_data.get("IPReservations", {})
-        for reservation in reservations:
-            sls_subnet.reservations().update(
-                {
-                    reservation.get("Name"): Reservation(
-                        name=reservation.get("Name"),
-                        ipv4_address=reservation.get("IPAddress"),
-                        aliases=list(reservation.get("Aliases", [])),
-                        comment=reservation.get("Comment"),
-                    ),
-                },
-            )
+        # Reservations are parsed on first access
+        sls_subnet.__reservations = None
+        sls_subnet.__sls_reservations = list(sls_data.get("IPReservations") or [])
+        sls_subnet._sls_data = sls_data
 
         return sls_subnet
 
+    def _copy_into(self, new_subnet):
+        """Set the attributes of a new, uninitialized object to copies of those of this one.
+
+        Args:
+            new_subnet (sls_utils.Subnet): Object created with __new__ to copy into
+        """
+        super()._copy_into(new_subnet)
+        new_subnet.__ipv4_gateway = self.__ipv4_gateway
+        new_subnet.__vlan = self.__vlan
+        new_subnet.__ipv4_dhcp_start_address = self.__ipv4_dhcp_start_address
+        new_subnet.__ipv4_dhcp_end_address = self.__ipv4_dhcp_end_address
+        new_subnet.__ipv4_reservation_start_address = self.__ipv4_reservation_start_address
+        new_subnet.__ipv4_reservation_end_address = self.__ipv4_reservation_end_address
+        new_subnet.__pool_name = self.__pool_name
+        new_subnet.__sls_reservations = self.__sls_reservations
+        if self.__reservations is None:
+            new_subnet.__reservations = None
+        else:
+            new_subnet.__reservations = copy.copy(self.__reservations)
+            for reservation_name, reservation in self.__reservations.items():
+                new_subnet.__reservations[reservation_name] = reservation.copy()
+
     def vlan(self, subnet_vlan=None):
         """VLAN of the subnet.
 
@@ -376,6 +553,7 @@ class Subnet(Network):
         """
         if subnet_vlan is not None:
             self.__vlan = subnet_vlan
+            self._sls_data = None
         return self.__vlan
 
     def ipv4_gateway(self, subnet_ipv4_gateway=None):
@@ -389,6 +567,7 @@ class Subnet(Network):
         """
         if subnet_ipv4_gateway is not None:
             self.__ipv4_gateway = subnet_ipv4_gateway
+            self._sls_data = None
         return self.__ipv4_gateway
 
     def dhcp_start_address(self, subnet_dhcp_start_address=None):
@@ -404,6 +583,7 @@ class Subnet(Network):
             self.__ipv4_dhcp_start_address = ipaddress.IPv4Address(
                 subnet_dhcp_start_address,
             )
+            self._sls_data = None
         return self.__ipv4_dhcp_start_address
 
     def dhcp_end_address(self, subnet_dhcp_end_address=None):
@@ -419,6 +599,7 @@ class Subnet(Network):
             self.__ipv4_dhcp_end_address = ipaddress.IPv4Address(
                 subnet_dhcp_end_address,
             )
+            self._sls_data = None
         return self.__ipv4_dhcp_end_address
 
     def reservation_start_address(self, reservation_start=None):
@@ -434,6 +615,7 @@ class Subnet(Network):
             self.__ipv4_reservation_start_address = ipaddress.IPv4Address(
                 reservation_start,
             )
+            self._sls_data = None
         return self.__ipv4_reservation_start_address
 
     def reservation_end_address(self, reservation_end=None):
@@ -447,6 +629,7 @@ class Subnet(Network):
         """
         if reservation_end is not None:
             self.__ipv4_reservation_end_address = ipaddress.IPv4Address(reservation_end)
+            self._sls_data = None
         return self.__ipv4_reservation_end_address
 
     def metallb_pool_name(self, pool_name=None):
@@ -460,6 +643,7 @@ class Subnet(Network):
         """
         if pool_name is not None:
             self.__pool_name = pool_name
+            self._sls_data = None
         return self.__pool_name
 
     def reservations(self, subnet_reservations=None):
@@ -473,10 +657,47 @@ class Subnet(Network):
         """
         if subnet_reservations is not None:
             self.__reservations = subnet_reservations
+            self.__sls_reservations = None
+            self._sls_data = None
+        # The reservations may be changed through the returned dict
+        self._changed()
+        return self._parsed_reservations()
+
+    def _parsed_reservations(self):
+        """Return the reservations, parsing them if they were not parsed yet, for reading only.
+
+        Unlike reservations(), this does not tell indexes that the reservations may have changed.
+        Reservations parsed here are watched by the indexes watching the Subnet.
+
+        Returns:
+            reservations (dict): Reservations of the subnet by name
+        """
+        if self.__reservations is None:
+            self.__reservations = {}
+            for sls_reservation in self.__sls_reservations:
+                reservation = Reservation.reservation_from_sls_data(sls_reservation)
+                reservation.watch_like(self)
+                self.__reservations.update({sls_reservation.get("Name"): reservation})
+            self.__sls_reservations = None
         return self.__reservations
 
-    def to_sls(self):
-        """Return SLS JSON for each Subnet.
+    def _reservation_ipv4_addresses(self):
+        """Return the name and IPv4 address of each reservation, for indexing.
+
+        Reservations which were not parsed yet are left unparsed, and their address is the one in
+        the SLS data.
+
+        Returns:
+            addresses (list): (name, IPv4 address, sls_utils.Reservation or None if not parsed)
+                tuples
+        """
+        if self.__reservations is None:
+            sls_reservations = {x.get("Name"): x for x in self.__sls_reservations}
+            return [(name, x.get("IPAddress"), None) for name, x in sls_reservations.items()]
+        return [(name, x.ipv4_address(), x) for name, x in self.__reservations.items()]
+
+    def _build_sls(self):
+        """Build the SLS data structure of the Subnet from its attributes.
 
         Returns:
             sls: SLS subnet data structure
@@ -509,9 +730,18 @@ class Subnet(Network):
         if self.__pool_name is not None:
             sls.update({"MetalLBPoolName": self.__pool_name})
 
-        if self.__reservations:
-            reservations = {
-                "IPReservations": [x.to_sls() for x in self.__reservations.values()],
-            }
-            sls.update(reservations)
+        if self.__reservations is None:
+            # Reservations which were never parsed are only parsed if they are not already
+            # in the form Reservation.to_sls() gives them.  Like parsing, keep one per name.
+            sls_reservations = {x.get("Name"): x for x in self.__sls_reservations}
+            reservations = [
+                x
+                if Reservation.sls_is_canonical(x)
+                else Reservation.reservation_from_sls_data(x).to_sls()
+                for x in sls_reservations.values()
+            ]
+        else:
+            reservations = [x.to_sls() for x in self.__reservations.values()]
+        if reservations:
+            sls.update({"IPReservations": reservations})
         return sls
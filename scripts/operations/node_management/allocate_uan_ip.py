@@ -61,6 +61,7 @@ from add_management_ncn import(
     delete_hsm_inventory_ethernet_interfaces,
 )
 from sls_utils.Reservations import Reservation as IPReservation
+from sls_utils.diff import describe_changes, diff_networks, snapshot_networks, updated_network_names
 
 # Global variables for service URLs. These get set in main.
 HSM_URL = None
@@ -69,6 +70,28 @@ SLS_URL = None
 #
 # UAN IP Allocation functions
 #
+def update_sls_networks(session: requests.Session, args, sls_networks_original: dict, sls_networks, network_names):
+    # Only PUT the networks whose SLS data actually changed
+    changes = diff_networks(
+        {network_name: sls_networks_original[network_name] for network_name in network_names},
+        {network_name: sls_networks[network_name] for network_name in network_names},
+    )
+    for line in describe_changes(changes):
+        print(f"    {line}")
+
+    for network_name in updated_network_names(changes):
+        print(f"Updating {network_name} network in SLS with updated IP reservations")
+        if args.perform_changes:
+            action = http_put(session, f'{SLS_URL}/networks/{network_name}', payload=sls_networks[network_name].to_sls())
+            if action["error"] is not None:
+                action_log(action, f'Error failed to update {network_name} in SLS')
+                print_action(action)
+                sys.exit(1)
+            print_action(action)
+        else:
+            print("Skipping due to dry run!")
+
+
 def allocate_uan_ip_cmd(session: requests.Session, args):
     print("Performing validation checks against SLS")
 
@@ -105,6 +128,7 @@ def allocate_uan_ip_cmd(session: requests.Session, args):
     # Retrieve all Network data from SLS
     validate_sls = False
     action, sls_networks = get_sls_networks(session, validate=validate_sls)
+    sls_networks_original = snapshot_networks(sls_networks)
 
     # For each network allocate an IP address for the UAN
     allocated_ips = {}
@@ -251,16 +275,7 @@ def allocate_uan_ip_cmd(session: requests.Session, args):
             }
         )
 
-        print(f"Updating {network_name} network in SLS with updated IP reservations")
-        if args.perform_changes:
-            action = http_put(session, f'{SLS_URL}/networks/{network_name}', payload=sls_network.to_sls())
-            if action["error"] is not None:
-                action_log(action, f'Error failed to update {network_name} in SLS')
-                print_action(action)
-                sys.exit(1)
-            print_action(action)
-        else:
-            print("Skipping due to dry run!")
+    update_sls_networks(session, args, sls_networks_original, sls_networks, allocated_ips)
 
     print('')
     print(f'IP Addresses have been allocated for {args.xname} ({alias}) and been added to SLS')
@@ -305,6 +320,7 @@ def deallocate_uan_ip_cmd(session: requests.Session, args):
     # Retrieve all Network data from SLS
     validate_sls = False
     action, sls_networks = get_sls_networks(session, validate=validate_sls)
+    sls_networks_original = snapshot_networks(sls_networks)
 
     modified_networks = []
     for network_name in ["CAN", "CHN"]:
@@ -345,19 +361,7 @@ def deallocate_uan_ip_cmd(session: requests.Session, args):
     #
     # Update SLS networking for the new UAN
     #
-    for network_name in modified_networks:
-        sls_network = sls_networks[network_name]
-
-        print(f"Updating {network_name} network in SLS with updated IP reservations")
-        if args.perform_changes:
-            action = http_put(session, f'{SLS_URL}/networks/{network_name}', payload=sls_network.to_sls())
-            if action["error"] is not None:
-                action_log(action, f'Error failed to update {network_name} in SLS')
-                print_action(action)
-                sys.exit(1)
-            print_action(action)
-        else:
-            print("Skipping due to dry run!")
+    update_sls_networks(session, args, sls_networks_original, sls_networks, modified_networks)
 
 #
 # Main
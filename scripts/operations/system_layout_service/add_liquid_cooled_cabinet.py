@@ -27,23 +27,36 @@ import json
 import re
 import netaddr
 
-def find_next_available_subnet(sls_network):
-    name = sls_network["Name"]
+def find_next_available_subnet(sls_network, prefixlen=22):
     network_subnet = netaddr.IPNetwork(sls_network["ExtraProperties"]["CIDR"])
 
-    existing_subnets = netaddr.IPSet()
+    existing_subnets = []
     for sls_subnet in sls_network["ExtraProperties"]["Subnets"]:
         subnet_name = sls_subnet["Name"]
         subnet_cidr = sls_subnet["CIDR"]
         print("  Found existing subnet {} with CIDR {}".format(subnet_name, subnet_cidr))
-        existing_subnets.add(subnet_cidr)
-
-    for available_subnet in list(network_subnet.subnet(22)):
-        if available_subnet not in existing_subnets:
-            print("  {} Available for use.".format(available_subnet))
-            return available_subnet
-
-    return None
+        existing_subnets.append(netaddr.IPNetwork(subnet_cidr))
+
+    if network_subnet.prefixlen > prefixlen:
+        return None
+
+    # Sweep the existing subnets in address order, bumping the candidate block past each one it
+    # overlaps, instead of enumerating every block in the network
+    block_size = 2 ** (32 - prefixlen)
+    candidate = network_subnet.first
+    for existing_subnet in sorted(existing_subnets, key=lambda subnet: subnet.first):
+        if existing_subnet.first > candidate + block_size - 1:
+            break
+        if existing_subnet.last >= candidate:
+            # Round up to the next block boundary
+            candidate = -(-(existing_subnet.last + 1) // block_size) * block_size
+
+    if candidate + block_size - 1 > network_subnet.last:
+        return None
+
+    available_subnet = netaddr.IPNetwork("{}/{}".format(netaddr.IPAddress(candidate), prefixlen))
+    print("  {} Available for use.".format(available_subnet))
+    return available_subnet
 
 def build_network(name, full_name, cidr, vlan_range):
     return {
@@ -26,7 +26,7 @@ import sys
 
 import click
 from sls_utils.ipam import (
-    free_ipv4_addresses,
+    allocate_many,
     free_ipv4_subnets,
     hosts_from_prefixlength,
     last_free_ipv4_address,
@@ -393,7 +393,7 @@ def create_chn_network(networks, chn_data, number_of_chn_edge_switches):
     # Clone CAN subnets for structure
     for can_subnet in networks.get("CAN").subnets().values():
         chn.subnets().update(
-            {can_subnet.name(): Subnet.subnet_from_sls_data(can_subnet.to_sls())},
+            {can_subnet.name(): can_subnet.copy()},
         )
 
     # Clean up subnet naming
@@ -434,7 +434,7 @@ def create_chn_network(networks, chn_data, number_of_chn_edge_switches):
     bootstrap.ipv4_address(f"{hold_ipv4.network_address}/{hold_ipv4.prefixlen+1}")
 
     dhcp_start = next_free_ipv4_address(bootstrap)
-    dhcp_end = sorted(free_ipv4_addresses(bootstrap))[-1]
+    dhcp_end = last_free_ipv4_address(bootstrap)
     click.echo(f"    Updating DHCP start-end IPv4 addresses {dhcp_start}-{dhcp_end}")
     bootstrap.dhcp_start_address(dhcp_start)
     bootstrap.dhcp_end_address(dhcp_end)
@@ -664,7 +664,7 @@ def clone_subnet_and_pivot(
         #
         # Clone the old subnet and change naming
         #
-        new_subnet = Subnet.subnet_from_sls_data(old_subnet.to_sls())
+        new_subnet = old_subnet.copy()
         if old_subnet.full_name().find("HMN") != -1:
             new_subnet.full_name(
                 old_subnet.full_name().replace("HMN", f"{destination_network_name}"),
@@ -779,26 +779,27 @@ def clone_subnet_and_pivot(
             click.echo(
                 f"        Adding IPs for {len(old_reservations.values())} Reservations",
             )
-            for old in old_reservations.values():
-                try:
-                    new_subnet.reservations().update(
-                        {
-                            old.name(): Reservation(
-                                old.name(),
-                                next_free_ipv4_address(new_subnet),
-                                list(old.aliases()),
-                                old.comment(),
-                            ),
-                        },
-                    )
-                except IndexError:
-                    click.secho(
-                        "        HALTING: Insufficient IPv4 addresses to create Reservations "
-                        f"- {devices} devices in a subnet supporting {total_hosts_in_prefixlen} devices.\n"
-                        "             Expert mode --<can|cmn>-subnet-override must be used to change this behavior.",
-                        fg="bright_yellow",
-                    )
-                    exit(1)
+            try:
+                new_ipv4_addresses = allocate_many(new_subnet, len(old_reservations))
+            except IndexError:
+                click.secho(
+                    "        HALTING: Insufficient IPv4 addresses to create Reservations "
+                    f"- {devices} devices in a subnet supporting {total_hosts_in_prefixlen} devices.\n"
+                    "             Expert mode --<can|cmn>-subnet-override must be used to change this behavior.",
+                    fg="bright_yellow",
+                )
+                exit(1)
+            for old, new_ipv4_address in zip(old_reservations.values(), new_ipv4_addresses):
+                new_subnet.reservations().update(
+                    {
+                        old.name(): Reservation(
+                            old.name(),
+                            new_ipv4_address,
+                            list(old.aliases()),
+                            old.comment(),
+                        ),
+                    },
+                )
 
             # DHCP Ranges to appropriate networks
             try:
@@ -864,7 +865,7 @@ def update_nmn_uai_macvlan_dhcp_ranges(networks):
         x.ipv4_address() for x in uai_macvlan_subnet.reservations().values()
     ]
     dhcp_start = max(reservations) + 1
-    dhcp_end = sorted(free_ipv4_addresses(uai_macvlan_subnet))[-1]
+    dhcp_end = last_free_ipv4_address(uai_macvlan_subnet)
     uai_macvlan_subnet.reservation_start_address(dhcp_start)
     uai_macvlan_subnet.reservation_end_address(dhcp_end)
 
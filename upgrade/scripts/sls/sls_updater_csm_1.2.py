@@ -21,9 +21,12 @@
 # ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
 # OTHER DEALINGS IN THE SOFTWARE.
 """Upgrade an SLS file from any CSM 1.0.x version to CSM 1.2 idempotently."""
+import hashlib
 import ipaddress
 import json
+import os
 import sys
+import time
 
 import click
 from csm_1_2_upgrade.sls_updates import convert_can_ips
@@ -39,6 +42,8 @@ from csm_1_2_upgrade.sls_updates import remove_can_static_pool
 from csm_1_2_upgrade.sls_updates import remove_kube_api_reservations
 from csm_1_2_upgrade.sls_updates import sls_and_input_data_checks
 from csm_1_2_upgrade.sls_updates import update_nmn_uai_macvlan_dhcp_ranges
+from sls_utils.diff import diff_networks
+from sls_utils.json_utils import write_sls_document
 from sls_utils.Managers import NetworkManager
 
 
@@ -56,9 +61,104 @@ help = """Upgrade a system SLS file from CSM 1.0 to CSM 1.2.
    10. Remove unused user networks (CAN or CHN) if requested [--retain-unused-user-network to keep].\n
    11. Create the new BICAN "toggle" network.\n
    12. Correct Unbound IP addresses in HMNLB and NMNLB.\n
+
+    Each step is timed.  With --checkpoint-file the SLS state is saved after every step, and a
+    rerun with the same input file and options resumes after the last completed step.\n
 """
 
 
+def checkpoint_fingerprint(sls_text, options):
+    """Identify the input file and options a checkpoint was taken with.
+
+    Args:
+        sls_text (str): Contents of the SLS input file
+        options (dict): Command line options which affect the upgrade
+
+    Returns:
+        fingerprint (str): SHA-256 hex digest of the input and options
+    """
+    digest = hashlib.sha256(sls_text.encode())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def load_checkpoint(checkpoint_file, fingerprint):
+    """Load a checkpoint taken with the same input file and options.
+
+    Args:
+        checkpoint_file (str): Name of the checkpoint file
+        fingerprint (str): Fingerprint of the current input file and options
+
+    Returns:
+        checkpoint (dict|None): Completed step names and SLS state, or None to start from the beginning
+    """
+    if not os.path.exists(checkpoint_file):
+        return None
+    try:
+        with open(checkpoint_file, "r") as file:
+            checkpoint = json.load(file)
+    except (OSError, json.JSONDecodeError, UnicodeDecodeError) as err:
+        click.secho(
+            f"    WARNING: Ignoring unreadable checkpoint {checkpoint_file}: {err}",
+            fg="bright_yellow",
+        )
+        return None
+    if checkpoint.get("fingerprint") != fingerprint:
+        click.secho(
+            f"    WARNING: Ignoring checkpoint {checkpoint_file} taken with a different input file or options.",
+            fg="bright_yellow",
+        )
+        return None
+    return checkpoint
+
+
+def save_checkpoint(checkpoint_file, fingerprint, completed_steps, networks, sls_json):
+    """Atomically save the SLS state after a step.
+
+    The networks are saved without schema validation, since the data between steps is not
+    necessarily a complete CSM 1.2 SLS.
+
+    Args:
+        checkpoint_file (str): Name of the checkpoint file
+        fingerprint (str): Fingerprint of the current input file and options
+        completed_steps (list): Names of the steps completed so far
+        networks (sls_utils.Managers.NetworkManager): Dictionary of SLS networks
+        sls_json (dict): SLS data, of which the Networks are replaced
+    """
+    sls_state = dict(sls_json)
+    sls_state["Networks"] = {name: network.to_sls() for name, network in networks.items()}
+    checkpoint = {
+        "fingerprint": fingerprint,
+        "completed_steps": completed_steps,
+        "sls": sls_state,
+    }
+    temp_file = f"{checkpoint_file}.tmp"
+    with open(temp_file, "w") as file:
+        json.dump(checkpoint, file)
+    os.replace(temp_file, checkpoint_file)
+
+
+def remove_unused_user_networks(networks, bican_user_network_name):
+    """Remove the user networks (CAN and/or CHN) not selected for the BICAN.
+
+    NEVER REMOVE THE HSN!!!
+
+    Args:
+        networks (sls_utils.Managers.NetworkManager): Dictionary of SLS networks
+        bican_user_network_name (str): Name of the BiCAN user network [CAN, CHN, HSN]
+    """
+    if bican_user_network_name == "CAN":
+        click.secho("Removing unused CHN (if it exists) as requested", fg="bright_white")
+        networks.pop("CHN", None)
+    if bican_user_network_name == "CHN":
+        click.secho("Removing unused CAN (if it exists) as requested", fg="bright_white")
+        networks.pop("CAN", None)
+    if bican_user_network_name == "HSN":
+        click.secho("Removing unused CAN and CHN (if they exist) as requested", fg="bright_white")
+        networks.pop("CAN", None)
+        networks.pop("CHN", None)
+
+
 @click.command(help=help)
 @click.option(
     "--sls-input-file",
@@ -187,6 +287,22 @@ help = """Upgrade a system SLS file from CSM 1.0 to CSM 1.2.
     type=click.IntRange(0, 2),
     show_default=True,
 )
+@click.option(
+    "--checkpoint-file",
+    required=False,
+    help="Save the SLS state to this file after each step, and resume from it if it was saved "
+    "with the same input file and options.  Removed once the output file is written.",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+)
+@click.option(
+    "--sls-diff-file",
+    required=False,
+    help="Also write the changes made to the SLS Networks to this JSON file, as "
+    "sls_utils.diff.diff_networks gives them.",
+    type=click.File("w"),
+    default=None,
+)
 @click.pass_context
 def main(
     ctx,
@@ -204,6 +320,8 @@ def main(
     cmn_subnet_override,
     number_of_chn_edge_switches,
     retain_unused_user_network,
+    checkpoint_file,
+    sls_diff_file,
 ):
     """Upgrade a system SLS file from CSM 1.0 to CSM 1.2.
 
@@ -223,128 +341,208 @@ def main(
         cmn_subnet_override (str, ipaddress.IPv4Network): Manually override CMN subnetting
         number_of_chn_edge_switches (str): Flat to override default edge switch (Arista usually) qty of 2
         retain_unused_user_network (flag): Flag to remove unused user network (e.g. remove CAN if CHN)
+        checkpoint_file (str|None): Name of the file to save and resume the SLS state after each step
+        sls_diff_file (file|None): File to write the changes made to the SLS Networks to
 
     """
     click.secho("Loading SLS JSON file.", fg="bright_white")
     try:
-        sls_json = json.load(sls_input_file)
+        sls_text = sls_input_file.read()
+        sls_json = json.loads(sls_text)
     except (json.JSONDecodeError, UnicodeDecodeError):
         click.secho(
             f"The file {sls_input_file.name} is not valid JSON.",
             fg="red",
         )
         sys.exit(1)
-
-    click.secho(
-        "Extracting existing Networks from SLS file and schema validating.",
-        fg="bright_white",
-    )
-    networks = NetworkManager(sls_json["Networks"])
-    hardware = sls_json["Hardware"]
-
-    #
-    # Perform SLS and input data checks.
-    #
-    sls_and_input_data_checks(
-        networks,
-        bican_user_network_name,
-        customer_access_network,
-        customer_highspeed_network,
-        can_subnet_override,
-        cmn_subnet_override,
-    )
-
-    #
-    # Migrate switch names
-    #   (not order dependent)
-    migrate_switch_names(networks, hardware)
+    # Networks of the input file, to diff against even when resuming from a checkpoint
+    original_networks = sls_json["Networks"]
 
     #
-    # Remove api-gw aliases from HMNLB reservations
-    #   (not order dependent)
-    remove_api_gw_from_hmnlb_reservations(networks)
-
+    # Upgrade steps, in order.  Each takes the networks and hardware.
     #
-    # Correct Unbound IPv4 addresses in HMNLB and NMNLB reservations
-    #   (not order dependent)
-    correct_unbound_dns_address(networks)
-
-    #
-    # Clone (existing) CAN network to CMN
-    #   (ORDER DEPENDENT!!!)
-    #   Use CAN as a template and create the CMN (leaves CAN in-place)
-    #   On any pre-CSM-1.2 system there WILL/MUST be a CAN in SLS
-    migrate_can_to_cmn(
-        networks,
-        preserve=preserve_existing_subnet_for_cmn,
-        overrides=cmn_subnet_override,
-    )
-
-    #
-    # Remove CAN static pool
-    #   (ORDER DEPENDENT!!!)
-    #   Must be run after CMN, but before CHN.
-    remove_can_static_pool(networks)
-
+    steps = [
+        #
+        # Perform SLS and input data checks.
+        (
+            "Check SLS and input data",
+            lambda networks, hardware: sls_and_input_data_checks(
+                networks,
+                bican_user_network_name,
+                customer_access_network,
+                customer_highspeed_network,
+                can_subnet_override,
+                cmn_subnet_override,
+            ),
+        ),
+        #
+        # Migrate switch names
+        #   (not order dependent)
+        ("Migrate switch names", migrate_switch_names),
+        #
+        # Remove api-gw aliases from HMNLB reservations
+        #   (not order dependent)
+        (
+            "Remove api-gateway from HMNLB reservations",
+            lambda networks, hardware: remove_api_gw_from_hmnlb_reservations(networks),
+        ),
+        #
+        # Correct Unbound IPv4 addresses in HMNLB and NMNLB reservations
+        #   (not order dependent)
+        (
+            "Correct Unbound DNS addresses",
+            lambda networks, hardware: correct_unbound_dns_address(networks),
+        ),
+        #
+        # Clone (existing) CAN network to CMN
+        #   (ORDER DEPENDENT!!!)
+        #   Use CAN as a template and create the CMN (leaves CAN in-place)
+        #   On any pre-CSM-1.2 system there WILL/MUST be a CAN in SLS
+        (
+            "Migrate CAN to CMN",
+            lambda networks, hardware: migrate_can_to_cmn(
+                networks,
+                preserve=preserve_existing_subnet_for_cmn,
+                overrides=cmn_subnet_override,
+            ),
+        ),
+        #
+        # Remove CAN static pool
+        #   (ORDER DEPENDENT!!!)
+        #   Must be run after CMN, but before CHN.
+        (
+            "Remove CAN static pool",
+            lambda networks, hardware: remove_can_static_pool(networks),
+        ),
+        #
+        # Remove kube-api reservations from all networks except NMN.
+        (
+            "Remove kubeapi-vip reservations",
+            lambda networks, hardware: remove_kube_api_reservations(networks),
+        ),
+        #
+        # Create (new) CHN network
+        #   (not order dependent)
+        (
+            "Create CHN network",
+            lambda networks, hardware: create_chn_network(
+                networks,
+                customer_highspeed_network,
+                number_of_chn_edge_switches,
+            ),
+        ),
+        #
+        # Re-IP the (existing) CAN network
+        #   (ORDER DEPENDENT!!! - Must be run after CMN creation)
+        (
+            "Convert CAN IPs",
+            lambda networks, hardware: convert_can_ips(
+                networks,
+                customer_access_network,
+                overrides=can_subnet_override,
+            ),
+        ),
+        #
+        # Add BGP peering data to CMN and NMN
+        #   (ORDER DEPENDENT!!! - Must be run after CMN creation)
+        (
+            "Create MetalLB pools and ASNs",
+            lambda networks, hardware: create_metallb_pools_and_asns(
+                networks,
+                bgp_asn,
+                bgp_chn_asn,
+                bgp_cmn_asn,
+                bgp_nmn_asn,
+            ),
+        ),
+        #
+        # Update uai_macvlan dhcp ranges in the NMN network.
+        #   (not order dependent)
+        (
+            "Update NMN uai_macvlan DHCP ranges",
+            lambda networks, hardware: update_nmn_uai_macvlan_dhcp_ranges(networks),
+        ),
+        #
+        # Rename uai_macvlan_bridge reservation to uai_nmn_blackhole
+        #   (not order dependent)
+        (
+            "Rename uai_macvlan_bridge reservation",
+            lambda networks, hardware: rename_uai_bridge_reservation(networks),
+        ),
+    ]
     #
-    # Remove kube-api reservations from all networks except NMN.
-    remove_kube_api_reservations(networks)
-
+    # Remove superfluous user network if requested
+    #   (ORDER DEPENDENT!!! - Must be run at end)
+    #   NEVER REMOVE THE HSN!!!
+    if retain_unused_user_network:
+        steps.append(
+            (
+                "Remove unused user networks",
+                lambda networks, hardware: remove_unused_user_networks(
+                    networks,
+                    bican_user_network_name,
+                ),
+            ),
+        )
     #
-    # Create (new) CHN network
+    # Create BICAN network
     #   (not order dependent)
-    create_chn_network(
-        networks,
-        customer_highspeed_network,
-        number_of_chn_edge_switches,
+    steps.append(
+        (
+            "Create BICAN network",
+            lambda networks, hardware: create_bican_network(
+                networks,
+                default_route_network_name=bican_user_network_name,
+            ),
+        ),
     )
 
-    #
-    # Re-IP the (existing) CAN network
-    #   (ORDER DEPENDENT!!! - Must be run after CMN creation)
-    convert_can_ips(networks, customer_access_network, overrides=can_subnet_override)
+    completed_steps = []
+    if checkpoint_file:
+        options = {
+            name: value
+            for name, value in ctx.params.items()
+            if name
+            not in ("sls_input_file", "sls_output_file", "checkpoint_file", "sls_diff_file")
+        }
+        fingerprint = checkpoint_fingerprint(sls_text, options)
+        checkpoint = load_checkpoint(checkpoint_file, fingerprint)
+        if checkpoint is not None:
+            completed_steps = checkpoint["completed_steps"]
+            sls_json = checkpoint["sls"]
+            click.secho(
+                f"Resuming from checkpoint {checkpoint_file} after: {completed_steps}",
+                fg="bright_white",
+            )
 
-    #
-    # Add BGP peering data to CMN and NMN
-    #   (ORDER DEPENDENT!!! - Must be run after CMN creation)
-    create_metallb_pools_and_asns(
-        networks,
-        bgp_asn,
-        bgp_chn_asn,
-        bgp_cmn_asn,
-        bgp_nmn_asn,
+    click.secho(
+        "Extracting existing Networks from SLS file and schema validating.",
+        fg="bright_white",
     )
+    networks = NetworkManager(sls_json["Networks"], validate=not completed_steps)
+    hardware = sls_json["Hardware"]
 
-    #
-    # Update uai_macvlan dhcp ranges in the NMN network.
-    #   (not order dependent)
-    update_nmn_uai_macvlan_dhcp_ranges(networks)
+    step_times = []
+    for step_name, step in steps:
+        if step_name in completed_steps:
+            step_times.append((step_name, None))
+            continue
 
-    #
-    # Rename uai_macvlan_bridge reservation to uai_nmn_blackhole
-    #   (not order dependent)
-    rename_uai_bridge_reservation(networks)
+        start = time.monotonic()
+        step(networks, hardware)
+        step_times.append((step_name, time.monotonic() - start))
+        click.echo(f"    {step_name} took {step_times[-1][1]:.2f}s")
 
-    #
-    # Remove superfluous user network if requested
-    #   (ORDER DEPENDENT!!! - Must be run at end)
-    #   NEVER REMOVE THE HSN!!!
-    if retain_unused_user_network:
-        if bican_user_network_name == "CAN":
-            click.secho("Removing unused CHN (if it exists) as requested", fg="bright_white")
-            networks.pop("CHN", None)
-        if bican_user_network_name == "CHN":
-            click.secho("Removing unused CAN (if it exists) as requested", fg="bright_white")
-            networks.pop("CAN", None)
-        if bican_user_network_name == "HSN":
-            click.secho("Removing unused CAN and CHN (if they exist) as requested", fg="bright_white")
-            networks.pop("CAN", None)
-            networks.pop("CHN", None)
+        if checkpoint_file:
+            completed_steps.append(step_name)
+            save_checkpoint(checkpoint_file, fingerprint, completed_steps, networks, sls_json)
 
-    #
-    # Create BICAN network
-    #   (not order dependent)
-    create_bican_network(networks, default_route_network_name=bican_user_network_name)
+    click.secho("Step times:", fg="bright_white")
+    for step_name, seconds in step_times:
+        if seconds is None:
+            click.echo(f"    {step_name:<45} (from checkpoint)")
+        else:
+            click.echo(f"    {step_name:<45} {seconds:8.2f}s")
 
     click.secho(
         f"Writing CSM 1.2 upgraded and schema validated SLS file to {sls_output_file.name}",
@@ -352,10 +550,18 @@ def main(
     )
 
     if sls_output_file:
-        sls_json.pop("Networks")
-        sls_json.update({"Networks": networks.to_sls()})
-        new_json = json.dumps(sls_json, indent=2, sort_keys=True)
-        click.echo(new_json, file=sls_output_file)
+        write_sls_document(sls_json, sls_output_file, networks=networks)
+
+    if sls_diff_file:
+        click.secho(
+            f"Writing the changes to the SLS Networks to {sls_diff_file.name}",
+            fg="bright_white",
+        )
+        changes = diff_networks(original_networks, networks)
+        click.echo(json.dumps(changes, indent=2, sort_keys=True), file=sls_diff_file)
+
+    if checkpoint_file and os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
 
 
 if __name__ == "__main__":
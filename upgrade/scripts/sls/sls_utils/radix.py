@@ -0,0 +1,255 @@
+# MIT License
+#
+# (C) Copyright [2024] Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+"""Prefix trie (radix) index of IPv4 networks, and telling an index its objects changed."""
+import ipaddress
+
+
+class _TrieNode:
+    """One bit of prefix in the trie: two children and the entries whose prefix ends here."""
+
+    __slots__ = ("children", "entries")
+
+    def __init__(self):
+        """Create an empty node."""
+        self.children = [None, None]
+        self.entries = {}
+
+
+class IPv4PrefixTrie:
+    """Binary prefix trie mapping IPv4 networks to keyed values.
+
+    Each network is stored at the depth of its prefix length, so inserting, removing and finding
+    the networks which contain an address are all O(prefix length).  Several values may be stored
+    under the same network as long as their keys differ.
+    """
+
+    def __init__(self):
+        """Create an empty trie."""
+        self.__root = _TrieNode()
+        self.__len = 0
+
+    def __len__(self):
+        """Return the number of entries in the trie."""
+        return self.__len
+
+    @staticmethod
+    def __network(ipv4_network):
+        """Return a network as an ipaddress.IPv4Network, without parsing it again if it is one.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network
+
+        Returns:
+            ipv4_network (ipaddress.IPv4Network): The network
+        """
+        if isinstance(ipv4_network, ipaddress.IPv4Network):
+            return ipv4_network
+        return ipaddress.IPv4Network(ipv4_network)
+
+    @staticmethod
+    def __bits(ipv4_network):
+        """Return the prefix bits of a network, most significant first.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network
+
+        Returns:
+            bits (list): The prefix bits of the network
+        """
+        ipv4_network = IPv4PrefixTrie.__network(ipv4_network)
+        address = int(ipv4_network.network_address)
+        return [(address >> shift) & 1 for shift in range(31, 31 - ipv4_network.prefixlen, -1)]
+
+    def __find(self, ipv4_network):
+        """Return the node for a network, or None if there is none.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network
+
+        Returns:
+            node (_TrieNode): The node for the network or None
+        """
+        node = self.__root
+        for bit in self.__bits(ipv4_network):
+            node = node.children[bit]
+            if node is None:
+                return None
+        return node
+
+    def insert(self, ipv4_network, key, value):
+        """Add a value for a network, replacing any existing value with the same key.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network
+            key: Hashable key distinguishing values stored under the same network
+            value: The value to store
+        """
+        ipv4_network = self.__network(ipv4_network)
+        node = self.__root
+        for bit in self.__bits(ipv4_network):
+            child = node.children[bit]
+            if child is None:
+                child = node.children[bit] = _TrieNode()
+            node = child
+        if key not in node.entries:
+            self.__len += 1
+        node.entries[key] = (ipv4_network, value)
+
+    def remove(self, ipv4_network, key):
+        """Remove the value for a network and key, pruning any nodes left empty.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network
+            key: The key the value was inserted with
+
+        Raises:
+            KeyError: If there is no such entry
+        """
+        bits = self.__bits(ipv4_network)
+        path = [self.__root]
+        for bit in bits:
+            node = path[-1].children[bit]
+            if node is None:
+                raise KeyError(key)
+            path.append(node)
+        del path[-1].entries[key]
+        self.__len -= 1
+
+        while len(path) > 1:
+            node = path.pop()
+            if node.entries or node.children != [None, None]:
+                break
+            path[-1].children[bits[len(path) - 1]] = None
+
+    def exact(self, ipv4_network):
+        """Return the entries stored under exactly this network.
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network
+
+        Returns:
+            entries (list): (ipaddress.IPv4Network, value) tuples in insertion order
+        """
+        node = self.__find(ipv4_network)
+        if node is None:
+            return []
+        return list(node.entries.values())
+
+    def matches(self, ipv4_address):
+        """Return the entries of every network containing an address, longest prefix first.
+
+        Args:
+            ipv4_address (ipaddress.IPv4Address|str): The address
+
+        Returns:
+            entries (list): (ipaddress.IPv4Network, value) tuples
+        """
+        ipv4_address = int(ipaddress.IPv4Address(ipv4_address))
+        found = []
+        node = self.__root
+        depth = 0
+        while node is not None:
+            found.append(node)
+            if depth == 32:
+                break
+            node = node.children[(ipv4_address >> (31 - depth)) & 1]
+            depth += 1
+        return [entry for node in reversed(found) for entry in node.entries.values()]
+
+    def overlapping(self, ipv4_network):
+        """Return the entries of every network which overlaps a network.
+
+        These are the networks containing it (found along the path to it) and the networks it
+        contains (the subtree below it).
+
+        Args:
+            ipv4_network (ipaddress.IPv4Network|str): The network
+
+        Returns:
+            entries (list): (ipaddress.IPv4Network, value) tuples, outermost networks first
+        """
+        found = []
+        node = self.__root
+        for bit in self.__bits(ipv4_network):
+            found.extend(node.entries.values())
+            node = node.children[bit]
+            if node is None:
+                return found
+
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            found.extend(node.entries.values())
+            stack.extend(child for child in reversed(node.children) if child is not None)
+        return found
+
+
+class Watched:
+    """Mixin for objects in an index, which tell the index when they may have changed.
+
+    An index watches an object with a set and a key.  Whenever the object may have changed, the key
+    is added to the set, and the index updates its entries for the key before its next lookup.
+    Objects created with __new__ (copies) are not watched.
+    """
+
+    __slots__ = ("_watchers",)
+
+    def watch(self, changed, key):
+        """Add a key to a set whenever this object may have changed.
+
+        Args:
+            changed (set): Keys of an index which need to be updated
+            key: Key of the index entries for this object
+        """
+        watchers = getattr(self, "_watchers", None)
+        if watchers is None:
+            watchers = self._watchers = {}
+        watchers.setdefault(id(changed), (changed, set()))[1].add(key)
+
+    def unwatch(self, changed, key):
+        """Stop adding a key to a set when this object changes.
+
+        Args:
+            changed (set): Keys of an index which need to be updated
+            key: Key of the index entries for this object
+        """
+        watchers = getattr(self, "_watchers", None)
+        if watchers and id(changed) in watchers:
+            keys = watchers[id(changed)][1]
+            keys.discard(key)
+            if not keys:
+                del watchers[id(changed)]
+
+    def watch_like(self, other):
+        """Be watched by the same indexes and keys as another object, such as its parent.
+
+        Args:
+            other (Watched): The object whose watchers to copy
+        """
+        for changed, keys in (getattr(other, "_watchers", None) or {}).values():
+            for key in keys:
+                self.watch(changed, key)
+
+    def _changed(self):
+        """Tell the indexes watching this object that it may have changed."""
+        for changed, keys in (getattr(self, "_watchers", None) or {}).values():
+            changed.update(keys)
@@ -0,0 +1,166 @@
+# MIT License
+#
+# (C) Copyright [2024] Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+"""Tests of the sls_utils network diff.
+
+Run from upgrade/scripts/sls with: python3 -m unittest discover tests
+"""
+import copy
+import ipaddress
+import json
+import unittest
+
+from sls_utils.diff import diff_networks, patch_networks, snapshot_networks, updated_network_names
+from sls_utils.Managers import NetworkManager
+from sls_utils.Networks import Network, Subnet
+from sls_utils.Reservations import Reservation
+
+
+def sls_networks():
+    """Return SLS data for a network as SLS returns it, with fields the model does not keep."""
+    return {
+        "HMN": {
+            "Name": "HMN",
+            "FullName": "Hardware Management Network",
+            "IPRanges": ["10.254.0.0/17"],
+            "Type": "ethernet",
+            "LastUpdated": 1700000000,
+            "LastUpdatedTime": "2023-11-14 22:13:20.000000 +0000 +0000",
+            "ExtraProperties": {
+                "CIDR": "10.254.0.0/17",
+                "MTU": 9000,
+                "VlanRange": [4, 5],
+                "Subnets": [
+                    {
+                        "Name": "bootstrap_dhcp",
+                        "FullName": "HMN Bootstrap DHCP Subnet",
+                        "CIDR": "10.254.0.0/24",
+                        "Gateway": "10.254.0.1",
+                        "VlanID": 4,
+                        "IPReservations": [
+                            {
+                                "Name": "ncn-m001-mgmt",
+                                "IPAddress": "10.254.0.4",
+                                "Aliases": ["ncn-m001-mgmt"],
+                                "Comment": "x3000c0s1b0",
+                            },
+                        ],
+                    },
+                ],
+            },
+        },
+    }
+
+
+class DiffNetworksTest(unittest.TestCase):
+    """Networks rebuilt by the model only differ from the snapshot where they were changed."""
+
+    def setUp(self):
+        self.networks = NetworkManager(sls_networks(), validate=False)
+        self.snapshot = snapshot_networks(self.networks)
+
+    def test_unchanged(self):
+        self.assertEqual(diff_networks(self.snapshot, self.networks), {})
+
+    def test_accessed_but_unchanged(self):
+        for subnet in self.networks["HMN"].subnets().values():
+            subnet.reservations()
+
+        changes = diff_networks(self.snapshot, self.networks)
+        self.assertEqual(changes, {})
+        self.assertEqual(updated_network_names(changes), [])
+
+    def test_reservation_added(self):
+        subnet = self.networks["HMN"].subnets()["bootstrap_dhcp"]
+        reservation = Reservation(
+            "ncn-w001-mgmt",
+            ipaddress.IPv4Address("10.254.0.7"),
+            ["ncn-w001-mgmt"],
+            "x3000c0s4b0",
+        )
+        subnet.reservations().update({reservation.name(): reservation})
+
+        changes = diff_networks(self.snapshot, self.networks)
+        self.assertEqual(
+            changes,
+            {
+                "changed": {
+                    "HMN": {
+                        "subnets": {
+                            "changed": {
+                                "bootstrap_dhcp": {
+                                    "reservations": {"added": [reservation.to_sls()]},
+                                },
+                            },
+                        },
+                    },
+                },
+            },
+        )
+        self.assertEqual(updated_network_names(changes), ["HMN"])
+
+
+class PatchNetworksTest(unittest.TestCase):
+    """Patching the original SLS data with the written changes gives the new networks."""
+
+    def setUp(self):
+        self.original = sls_networks()
+        hmnlb = copy.deepcopy(self.original["HMN"])
+        hmnlb.update({"Name": "HMNLB", "FullName": "HMN MetalLB"})
+        self.original["HMNLB"] = hmnlb
+        self.loaded = copy.deepcopy(self.original)
+        self.networks = NetworkManager(self.original, validate=False)
+
+    def round_trip(self):
+        changes = json.loads(json.dumps(diff_networks(self.original, self.networks)))
+        return patch_networks(self.original, changes)
+
+    def test_unchanged(self):
+        expected = {name: network.to_sls() for name, network in self.networks.items()}
+        self.assertEqual(self.round_trip(), expected)
+
+    def test_changed(self):
+        hmn = self.networks["HMN"]
+        hmn.mtu(1500)
+        reservations = hmn.subnets()["bootstrap_dhcp"].reservations()
+        del reservations["ncn-m001-mgmt"]
+        reservations["ncn-w001-mgmt"] = Reservation(
+            "ncn-w001-mgmt",
+            ipaddress.IPv4Address("10.254.0.7"),
+            ["ncn-w001-mgmt"],
+            "x3000c0s4b0",
+        )
+        hmn.subnets()["network_hardware"] = Subnet(
+            "network_hardware",
+            "10.254.1.0/24",
+            "10.254.1.1",
+            4,
+        )
+        del self.networks["HMNLB"]
+        self.networks["NMN"] = Network("NMN", "ethernet", "10.252.0.0/17")
+
+        expected = {name: network.to_sls() for name, network in self.networks.items()}
+        self.assertEqual(self.round_trip(), expected)
+        self.assertEqual(self.original, self.loaded)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# MIT License
+#
+# (C) Copyright [2024] Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+"""Tests of writing SLS documents with the sls_utils json_utils.
+
+Run from upgrade/scripts/sls with: python3 -m unittest discover tests
+"""
+import copy
+import io
+import json
+import unittest
+
+from sls_utils.json_utils import write_sls_document
+from sls_utils.Managers import NetworkManager
+
+from test_managers import sls_networks
+
+
+def sls_document():
+    """Return an SLS document with a Hardware section and the NMN and HMN networks."""
+    networks = sls_networks()
+    hmn = copy.deepcopy(networks["NMN"])
+    hmn.update({"Name": "HMN", "FullName": "Hardware Management Network"})
+    hmn["ExtraProperties"]["Subnets"][0]["IPReservations"][0]["Aliases"] = ["ncn-m001-hmn"]
+    networks["HMN"] = hmn
+    return {
+        "Hardware": {
+            "x3000c0s1b0n0": {
+                "Parent": "x3000c0s1b0",
+                "Xname": "x3000c0s1b0n0",
+                "Type": "comptype_node",
+            },
+        },
+        "Networks": networks,
+    }
+
+
+class WriteSlsDocumentTest(unittest.TestCase):
+    """write_sls_document() writes what json.dumps(indent=2, sort_keys=True) wrote."""
+
+    def write(self, sls_data):
+        output_file = io.StringIO()
+        networks = NetworkManager(sls_data["Networks"], validate=False)
+        write_sls_document(sls_data, output_file, networks=networks)
+        return output_file.getvalue()
+
+    def test_matches_json_dumps(self):
+        expected = json.dumps(sls_document(), indent=2, sort_keys=True) + "\n"
+        self.assertEqual(self.write(sls_document()), expected)
+
+    def test_loaded_networks_are_written_as_the_model_writes_them(self):
+        expected = json.dumps(sls_document(), indent=2, sort_keys=True) + "\n"
+        sls_data = sls_document()
+        for network in sls_data["Networks"].values():
+            network["LastUpdated"] = 1650000000
+            network["LastUpdatedTime"] = "2022-04-15 05:20:00.0 +0000 +0000"
+            network["ExtraProperties"]["VlanRange"] = [1, 4000]
+        self.assertEqual(self.write(sls_data), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+# MIT License
+#
+# (C) Copyright [2024] Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+"""Tests of the IPv4 index of the sls_utils Managers.
+
+Run from upgrade/scripts/sls with: python3 -m unittest discover tests
+"""
+import ipaddress
+import unittest
+from unittest import mock
+
+from sls_utils.Managers import IPv4IndexedDict, NetworkManager, SubnetManager
+from sls_utils.Networks import Subnet
+from sls_utils.Reservations import Reservation
+
+
+def sls_networks():
+    """Return SLS data for a single network with one subnet and one reservation."""
+    return {
+        "NMN": {
+            "Name": "NMN",
+            "FullName": "Node Management Network",
+            "IPRanges": ["10.252.0.0/17"],
+            "Type": "ethernet",
+            "ExtraProperties": {
+                "CIDR": "10.252.0.0/17",
+                "MTU": 9000,
+                "VlanRange": [2],
+                "Subnets": [
+                    {
+                        "Name": "bootstrap_dhcp",
+                        "FullName": "NMN Bootstrap DHCP Subnet",
+                        "CIDR": "10.252.0.0/24",
+                        "Gateway": "10.252.0.1",
+                        "VlanID": 2,
+                        "IPReservations": [
+                            {"Name": "ncn-m001", "IPAddress": "10.252.0.4"},
+                        ],
+                    },
+                ],
+            },
+        },
+    }
+
+
+def new_subnet():
+    """Return a Subnet which is not in sls_networks()."""
+    subnet = Subnet("uai_macvlan", "10.252.2.0/23", "10.252.2.1", 2)
+    subnet.reservations().update(
+        {"uai-1": Reservation("uai-1", ipaddress.IPv4Address("10.252.2.10"))},
+    )
+    return subnet
+
+
+class NetworkManagerIndexTest(unittest.TestCase):
+    """Lookups on a NetworkManager see Subnets and Reservations added in place."""
+
+    def setUp(self):
+        self.networks = NetworkManager(sls_networks(), validate=False)
+        # Build the index before anything is changed
+        self.assertIsNone(self.networks.ipv4_owner("10.252.2.10")[1])
+
+    def test_subnet_added_in_place(self):
+        network = self.networks["NMN"]
+        subnet = new_subnet()
+        network.subnets().update({subnet.name(): subnet})
+
+        owner = self.networks.ipv4_owner("10.252.2.10")
+        self.assertIs(owner[0], network)
+        self.assertIs(owner[1], subnet)
+        self.assertIs(owner[2], subnet.reservations()["uai-1"])
+        self.assertIn(
+            subnet,
+            [owner[1] for _, owner in self.networks.ipv4_overlapping("10.252.3.0/24")],
+        )
+
+    def test_reservation_added_in_place(self):
+        subnet = self.networks["NMN"].subnets()["bootstrap_dhcp"]
+        reservation = Reservation("ncn-w001", ipaddress.IPv4Address("10.252.0.7"))
+        subnet.reservations().update({"ncn-w001": reservation})
+
+        self.assertIs(self.networks.ipv4_owner("10.252.0.7")[2], reservation)
+        self.assertIn(
+            reservation,
+            [owner[2] for _, owner in self.networks.ipv4_overlapping("10.252.0.7/32")],
+        )
+
+    def test_reservation_removed_in_place(self):
+        subnet = self.networks["NMN"].subnets()["bootstrap_dhcp"]
+        del subnet.reservations()["ncn-m001"]
+
+        self.assertIsNone(self.networks.ipv4_owner("10.252.0.4")[2])
+
+    def test_reservation_address_changed(self):
+        reservation = self.networks.ipv4_owner("10.252.0.4")[2]
+        reservation.ipv4_address(ipaddress.IPv4Address("10.252.0.9"))
+
+        self.assertIs(self.networks.ipv4_owner("10.252.0.9")[2], reservation)
+        self.assertIsNone(self.networks.ipv4_owner("10.252.0.4")[2])
+
+    def test_dictionary_kept_across_lookup(self):
+        reservations = self.networks["NMN"].subnets()["bootstrap_dhcp"].reservations()
+        self.networks.ipv4_owner("10.252.0.4")
+        del reservations["ncn-m001"]
+        self.networks.reindex("NMN")
+
+        self.assertIsNone(self.networks.ipv4_owner("10.252.0.4")[2])
+
+    def test_unchanged_items_are_not_reindexed(self):
+        with mock.patch.object(self.networks, "_ipv4_entries", side_effect=AssertionError):
+            self.assertEqual(self.networks.ipv4_owner("10.252.0.4")[2].name(), "ncn-m001")
+
+
+class LookupTest(unittest.TestCase):
+    """Lookups leave the SLS data of what they do not return as it was loaded."""
+
+    def test_reservations_are_not_parsed(self):
+        sls_data = sls_networks()
+        networks = NetworkManager(sls_data, validate=False)
+        subnet = networks.ipv4_owner("10.252.0.200")[1]
+
+        self.assertIsNone(subnet._reservation_ipv4_addresses()[0][2])
+        self.assertIs(networks["NMN"].to_sls(), sls_data["NMN"])
+
+    def test_index_is_abstract(self):
+        with self.assertRaises(TypeError):
+            IPv4IndexedDict()
+
+
+class SubnetManagerIndexTest(unittest.TestCase):
+    """Lookups on a SubnetManager see Reservations added in place."""
+
+    def test_reservation_added_in_place(self):
+        sls_subnets = sls_networks()["NMN"]["ExtraProperties"]["Subnets"]
+        subnets = SubnetManager({subnet["Name"]: subnet for subnet in sls_subnets})
+        self.assertIsNone(subnets.ipv4_owner("10.252.0.7")[1])
+
+        reservation = Reservation("ncn-w001", ipaddress.IPv4Address("10.252.0.7"))
+        subnets["bootstrap_dhcp"].reservations().update({"ncn-w001": reservation})
+
+        self.assertIs(subnets.ipv4_owner("10.252.0.7")[1], reservation)
+        self.assertIn(
+            reservation,
+            [owner[1] for _, owner in subnets.ipv4_overlapping("10.252.0.0/24")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
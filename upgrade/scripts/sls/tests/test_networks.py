@@ -0,0 +1,77 @@
+# MIT License
+#
+# (C) Copyright [2024] Hewlett Packard Enterprise Development LP
+#
+# Permission is hereby granted, free of charge, to any person obtaining a
+# copy of this software and associated documentation files (the "Software"),
+# to deal in the Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish, distribute, sublicense,
+# and/or sell copies of the Software, and to permit persons to whom the
+# Software is furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included
+# in all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL
+# THE AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE,
+# ARISING FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR
+# OTHER DEALINGS IN THE SOFTWARE.
+"""Tests of the SLS serialization of the sls_utils Networks.
+
+Run from upgrade/scripts/sls with: python3 -m unittest discover tests
+"""
+import copy
+import unittest
+
+from sls_utils.Networks import Network
+
+from test_managers import sls_networks
+
+
+class NetworkToSlsTest(unittest.TestCase):
+    """to_sls() returns the loaded SLS data only while it is what the Network serializes to."""
+
+    def setUp(self):
+        self.sls_network = sls_networks()["NMN"]
+        self.network = Network.network_from_sls_data(self.sls_network)
+
+    def test_unchanged_network_returns_loaded_data(self):
+        self.network.subnets()["bootstrap_dhcp"].reservations()
+        self.assertIs(self.network.to_sls(), self.sls_network)
+
+    def test_extra_fields_are_dropped(self):
+        expected = copy.deepcopy(self.sls_network)
+        self.sls_network["LastUpdated"] = 1650000000
+        self.sls_network["LastUpdatedTime"] = "2022-04-15 05:20:00.0 +0000 +0000"
+        network = Network.network_from_sls_data(self.sls_network)
+        self.assertEqual(network.to_sls(), expected)
+
+    def test_vlan_range_is_recomputed(self):
+        expected = copy.deepcopy(self.sls_network)
+        self.sls_network["ExtraProperties"]["VlanRange"] = [1, 4000]
+        network = Network.network_from_sls_data(self.sls_network)
+        self.assertEqual(network.to_sls(), expected)
+
+    def test_reservation_is_canonicalized(self):
+        subnet = self.sls_network["ExtraProperties"]["Subnets"][0]
+        subnet["IPReservations"][0]["Aliases"] = []
+        expected = copy.deepcopy(self.sls_network)
+        del expected["ExtraProperties"]["Subnets"][0]["IPReservations"][0]["Aliases"]
+        network = Network.network_from_sls_data(self.sls_network)
+        self.assertEqual(network.to_sls(), expected)
+
+    def test_change_through_getter_is_serialized(self):
+        reservations = self.network.subnets()["bootstrap_dhcp"].reservations()
+        reservations["ncn-m001"].aliases(["ncn-m001-nmn"])
+        sls = self.network.to_sls()
+        sls_reservation = sls["ExtraProperties"]["Subnets"][0]["IPReservations"][0]
+        self.assertEqual(sls_reservation["Aliases"], ["ncn-m001-nmn"])
+        loaded_reservation = self.sls_network["ExtraProperties"]["Subnets"][0]["IPReservations"][0]
+        self.assertNotIn("Aliases", loaded_reservation)
+
+
+if __name__ == "__main__":
+    unittest.main()